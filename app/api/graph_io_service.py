@@ -0,0 +1,17 @@
+from typing import AsyncIterable, AsyncIterator, Dict, Union
+from app.graph.graph_io import export_graph, import_graph, iter_lines
+from app.graph.graph_ops import GraphOps
+
+class GraphIOService:
+    @staticmethod
+    async def export_graph(user_id: str) -> AsyncIterator[str]:
+        """NDJSON lines of the user's graph; raises LookupError if the user doesn't exist."""
+        graph_ops = GraphOps()
+        if not await graph_ops.user_exists(user_id):
+            raise LookupError(f"User {user_id} does not exist")
+        return export_graph(graph_ops.backend, user_id)
+
+    @staticmethod
+    async def import_graph(user_id: str, body: AsyncIterable[Union[bytes, str]]) -> Dict[str, int]:
+        async with GraphOps() as graph_ops:
+            return await import_graph(graph_ops.backend, user_id, iter_lines(body))
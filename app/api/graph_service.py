@@ -0,0 +1,50 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.api.job_service import JobService
+from app.graph.compaction import compact_user
+from app.graph.graph_ops import GraphOps
+from app.utils.pagination import json_array_stream
+from app.utils.models import GraphUpdateModel, JobStatus
+
+class GraphService:
+    @staticmethod
+    async def apply_update(user_id: str, graph_update: GraphUpdateModel) -> Dict[str, int]:
+        """Apply a structured graph delta; raises LookupError if the user doesn't exist."""
+        async with GraphOps() as graph_ops:
+            if not await graph_ops.user_exists(user_id):
+                raise LookupError(f"User {user_id} does not exist")
+            return await graph_ops.apply_graph_update(graph_update, user_id)
+
+    @staticmethod
+    async def start_compaction(user_id: str) -> JobStatus:
+        """Compact the user's graph as a background job; raises LookupError if the user doesn't exist."""
+        graph_ops = GraphOps()
+        if not await graph_ops.user_exists(user_id):
+            raise LookupError(f"User {user_id} does not exist")
+
+        async def work(job: JobStatus):
+            job.progress = await compact_user(graph_ops.backend, user_id)
+
+        return JobService.start("compact_graph", work)
+
+    @staticmethod
+    async def get_page(user_id: str, kind: str, cursor: Optional[str], limit: int,
+                       relation_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        A page of "nodes" or "relationships", the latter optionally of the given
+        relation types; raises LookupError for unknown users and ValueError for bad cursors.
+        """
+        graph_ops = GraphOps()
+        if not await graph_ops.user_exists(user_id):
+            raise LookupError(f"User {user_id} does not exist")
+        if kind == "nodes":
+            return await graph_ops.get_nodes_page(user_id, cursor, limit)
+        return await graph_ops.get_relationships_page(user_id, cursor, limit, relation_types)
+
+    @staticmethod
+    async def stream(user_id: str, kind: str) -> AsyncIterator[str]:
+        """All "nodes" or "relationships" as chunks of one JSON array; raises LookupError for unknown users."""
+        graph_ops = GraphOps()
+        if not await graph_ops.user_exists(user_id):
+            raise LookupError(f"User {user_id} does not exist")
+        records = graph_ops.stream_nodes(user_id) if kind == "nodes" else graph_ops.stream_relationships(user_id)
+        return json_array_stream(records)
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+from app.config import config
+from app.graph.constructor import GraphConstructor
+from app.openai.scheduler import Priority, llm_priority
+from app.utils.models import UnstructuredData
+
+logger = logging.getLogger(__name__)
+
+class UserIngestQueue:
+    """
+    Serializes graph writes per user and coalesces documents that queue up.
+
+    Each user has at most one worker task. While it is running the LLM pipeline
+    for one batch, new documents for the same user wait in the queue and are
+    then merged into a single graph update, so a burst of N ingests becomes a
+    few batched writes instead of N competing ones. Callers wait until the
+    batch containing their document has been written.
+    """
+
+    _pending: Dict[str, List[Tuple[UnstructuredData, asyncio.Future]]] = {}
+    _workers: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    async def submit(cls, user_id: str, data: UnstructuredData) -> None:
+        future = asyncio.get_running_loop().create_future()
+        cls._pending.setdefault(user_id, []).append((data, future))
+        if user_id not in cls._workers:
+            cls._workers[user_id] = asyncio.create_task(cls._drain(user_id))
+        await future
+
+    @classmethod
+    def queue_depth(cls, user_id: str) -> int:
+        return len(cls._pending.get(user_id, []))
+
+    @classmethod
+    async def _drain(cls, user_id: str) -> None:
+        batch: List[Tuple[UnstructuredData, asyncio.Future]] = []
+        try:
+            while cls._pending.get(user_id):
+                batch = []
+                try:
+                    queue = cls._pending[user_id]
+                    max_batch = max(1, config.INGEST.MAX_BATCH_DOCUMENTS)
+                    batch, cls._pending[user_id] = queue[:max_batch], queue[max_batch:]
+                    await cls._process(user_id, [data for data, _ in batch])
+                except Exception as e:
+                    logger.exception("Ingest batch of %d documents failed for user %s", len(batch), user_id)
+                    # Without a batch the queue itself is unusable; fail everything in it
+                    for _, future in batch or cls._pending.pop(user_id, []):
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_result(None)
+            batch = []
+        finally:
+            cls._workers.pop(user_id, None)
+            # Only left over if the worker was cancelled; don't leave their callers waiting forever
+            for _, future in batch + cls._pending.pop(user_id, []):
+                if not future.done():
+                    future.set_exception(RuntimeError(f"Ingestion for user {user_id} was stopped"))
+
+    @classmethod
+    async def _process(cls, user_id: str, documents: List[UnstructuredData]) -> None:
+        if len(documents) > 1:
+            logger.info("Coalescing %d queued documents for user %s", len(documents), user_id)
+        # Ingestion yields to interactive RAG queries when OpenAI capacity is short
+        with llm_priority(Priority.BACKGROUND):
+            async with GraphConstructor(user_id) as constructor:
+                await constructor.process_unstructured_data(cls.merge(documents))
+
+    @staticmethod
+    def merge(documents: List[UnstructuredData]) -> UnstructuredData:
+        if len(documents) == 1:
+            return documents[0]
+        metadata: Dict[str, str] = {}
+        for document in documents:
+            metadata.update(document.metadata or {})
+        return UnstructuredData(
+            title="; ".join(dict.fromkeys(document.title for document in documents)),
+            content="\n\n---\n\n".join(document.content for document in documents),
+            metadata=metadata
+        )
@@ -1,11 +1,11 @@
-from app.graph.constructor import GraphConstructor
+from app.api.ingest_queue import UserIngestQueue
 from app.utils.models import UnstructuredData
 
 class IngestService:
     @staticmethod
     async def ingest_data(user_id: str, content: str):
-        async with GraphConstructor(user_id) as constructor:
-            data = UnstructuredData(title="Ingested Data", content=content)
-            await constructor.process_unstructured_data(data)
-        
-        return {"message": "Data ingested successfully"}
\ No newline at end of file
+        data = UnstructuredData(title="Ingested Data", content=content)
+        # Writes for one user are serialized and queued documents are coalesced
+        await UserIngestQueue.submit(user_id, data)
+
+        return {"message": "Data ingested successfully"}
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+from app.utils.models import JobStatus
+
+logger = logging.getLogger(__name__)
+
+class JobService:
+    """In-process registry of background jobs, so long-running work can report progress over HTTP."""
+
+    MAX_FINISHED_JOBS = 1000
+    _jobs: Dict[str, JobStatus] = {}
+    _tasks: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def start(cls, kind: str, work: Callable[[JobStatus], Awaitable[None]]) -> JobStatus:
+        """Schedule `work(job)` on the running loop; `work` updates `job.progress` as it goes."""
+        job = JobStatus(job_id=uuid.uuid4().hex, kind=kind, created_at=time.time())
+        cls._jobs[job.job_id] = job
+        cls._tasks[job.job_id] = asyncio.create_task(cls._run(job, work))
+        cls._prune()
+        return job
+
+    @classmethod
+    def get(cls, job_id: str) -> Optional[JobStatus]:
+        return cls._jobs.get(job_id)
+
+    @classmethod
+    async def _run(cls, job: JobStatus, work: Callable[[JobStatus], Awaitable[None]]) -> None:
+        job.status = "running"
+        try:
+            await work(job)
+            job.status = "completed"
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.job_id, job.kind)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            cls._tasks.pop(job.job_id, None)
+
+    @classmethod
+    def _prune(cls) -> None:
+        finished = [job for job in cls._jobs.values() if job.finished_at is not None]
+        for job in sorted(finished, key=lambda j: j.finished_at)[:-cls.MAX_FINISHED_JOBS]:
+            del cls._jobs[job.job_id]
@@ -1,9 +1,26 @@
+import logging
+from typing import List, Optional
+from app.config import config
 from app.graph.rag_interface import RAGInterface
 
+logger = logging.getLogger(__name__)
+
 class RAGService:
     @staticmethod
-    async def query(user_id: str, query: str):
+    async def query(user_id: str, query: str, bypass_cache: bool = False, relation_types: Optional[List[str]] = None,
+                    decompose: bool = False):
+        rag = RAGInterface(user_id)
+        response= await rag.query(query, bypass_cache=bypass_cache, relation_types=relation_types, decompose=decompose)
+        logger.debug("RAG response for user %s: %d characters", user_id, len(response))
+        return response
+
+    @staticmethod
+    async def query_many(user_id: str, queries: List[str], bypass_cache: bool = False,
+                         relation_types: Optional[List[str]] = None, decompose: bool = False) -> List[str]:
+        if len(queries) > config.RAG.MAX_BATCH_QUERIES:
+            raise ValueError(f"At most {config.RAG.MAX_BATCH_QUERIES} queries can be sent in one batch")
         rag = RAGInterface(user_id)
-        response= await rag.query(query)
-        print("response", response)
-        return response
\ No newline at end of file
+        responses = await rag.query_many(queries, bypass_cache=bypass_cache, relation_types=relation_types,
+                                         decompose=decompose)
+        logger.debug("Batch RAG responses for user %s: %d answers", user_id, len(responses))
+        return responses
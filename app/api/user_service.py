@@ -1,4 +1,6 @@
 from app.graph.graph_ops import GraphOps
+from app.api.job_service import JobService
+from app.utils.models import JobStatus
 
 class UserService:
     @staticmethod
@@ -11,4 +13,16 @@ class UserService:
     async def delete_user(user_id: str):
         async with GraphOps() as graph_ops:
             await graph_ops.delete_user(user_id)
-        return {"message": f"User {user_id} deleted successfully"}
\ No newline at end of file
+        return {"message": f"User {user_id} deleted successfully"}
+
+    @staticmethod
+    def start_delete_user(user_id: str) -> JobStatus:
+        """Delete the user in batches as a background job; poll `JobService.get` for progress."""
+        async def work(job: JobStatus):
+            def report(deleted: int, total: int):
+                job.progress = {"deleted": deleted, "total": total}
+
+            async with GraphOps() as graph_ops:
+                await graph_ops.delete_user(user_id, progress=report)
+
+        return JobService.start("delete_user", work)
\ No newline at end of file
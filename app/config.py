@@ -13,6 +13,7 @@ class Info(BaseModel):
     description: str = Field("Backend API for Innernet", description="API description")
     version: str = Field("0.1.0", description="API version")
     root_path: str = Field("/", description="API root path")
+    instructions_path: str = Field(environ.get("INSTRUCTIONS_PATH", "INSTRUCTIONS.md"), description="Path to the app objective instructions")
     docs_url: Optional[str] = Field("/docs", description="API documentation URL")
     redoc_url: Optional[str] = Field("/redoc", description="ReDoc documentation URL")
     swagger_ui_parameters: dict = Field(
@@ -43,6 +44,73 @@ class Neo4j(BaseModel):
     URI: str = Field(environ.get("NEO4J_URI", "neo4j://neo4j:7687"), description="Neo4j URI")
     USER: str = Field("neo4j", description="Neo4j username")
     PASSWORD: str = Field("passwordz", description="Neo4j password")
+    DATABASE: Optional[str] = Field(environ.get("NEO4J_DATABASE") or None, description="Neo4j database to use; the server's default database when unset")
+    DELETE_BATCH_SIZE: int = Field(int(environ.get("NEO4J_DELETE_BATCH_SIZE", 1000)), description="Nodes deleted per transaction when removing users or cleaning the graph")
+
+class Graph(BaseModel):
+    """Graph storage configuration"""
+    BACKEND: str = Field(environ.get("GRAPH_BACKEND", "neo4j"), description="Graph storage backend: 'neo4j' or 'memory'")
+    CENTRALITY_DELAY_SECONDS: float = Field(float(environ.get("GRAPH_CENTRALITY_DELAY_SECONDS", 5)), description="Wait after a graph update before recomputing node centrality; negative disables it")
+    ENTITY_RESOLUTION: bool = Field(environ.get("GRAPH_ENTITY_RESOLUTION", "true").lower() == "true", description="Fold ingested nodes into existing nodes with the same normalized name or a near-identical embedding")
+    ENTITY_RESOLUTION_THRESHOLD: float = Field(float(environ.get("GRAPH_ENTITY_RESOLUTION_THRESHOLD", 0.95)), description="Lowest vector similarity score (0 to 1) at which two node names are merged; above 1 matches normalized names only")
+    PAGE_SIZE: int = Field(int(environ.get("GRAPH_PAGE_SIZE", 100)), description="Default page size of the paginated node and relationship endpoints")
+    IMPORT_BATCH_SIZE: int = Field(int(environ.get("GRAPH_IMPORT_BATCH_SIZE", 500)), description="Nodes or relationships written per statement when importing a graph")
+    NEIGHBORHOOD_DIGESTS: bool = Field(environ.get("GRAPH_NEIGHBORHOOD_DIGESTS", "false").lower() == "true", description="Keep a digest of each node's neighbours up to date on write and build RAG context from the seed nodes' digests in one read")
+    DIGEST_MAX_NEIGHBORS: int = Field(int(environ.get("GRAPH_DIGEST_MAX_NEIGHBORS", 10)), description="Most neighbours kept in a node's digest, most central first")
+    DIGEST_PERSPECTIVE_CHARS: int = Field(int(environ.get("GRAPH_DIGEST_PERSPECTIVE_CHARS", 160)), description="Characters of each neighbour's perspective kept in a digest")
+
+class Ingest(BaseModel):
+    """Ingestion configuration"""
+    MAX_BATCH_DOCUMENTS: int = Field(int(environ.get("INGEST_MAX_BATCH_DOCUMENTS", 8)), description="Most queued documents for one user merged into a single graph update")
+
+class Admission(BaseModel):
+    """Admission control for RAG and ingestion routes"""
+    ENABLED: bool = Field(environ.get("ADMISSION_ENABLED", "true").lower() == "true", description="Limit concurrent RAG and ingestion requests, rejecting the excess with 429/503")
+    RAG_MAX_CONCURRENCY: int = Field(int(environ.get("ADMISSION_RAG_MAX_CONCURRENCY", 32)), description="Most RAG requests served at once")
+    RAG_MAX_QUEUE: int = Field(int(environ.get("ADMISSION_RAG_MAX_QUEUE", 64)), description="Most RAG requests waiting for a slot")
+    RAG_MAX_PER_USER: int = Field(int(environ.get("ADMISSION_RAG_MAX_PER_USER", 8)), description="Most RAG requests of one user served or waiting at once")
+    RAG_QUEUE_TIMEOUT_SECONDS: float = Field(float(environ.get("ADMISSION_RAG_QUEUE_TIMEOUT_SECONDS", 5)), description="How long a RAG request may wait for a slot")
+    INGEST_MAX_CONCURRENCY: int = Field(int(environ.get("ADMISSION_INGEST_MAX_CONCURRENCY", 4)), description="Most ingest, import and graph update requests served at once")
+    INGEST_MAX_QUEUE: int = Field(int(environ.get("ADMISSION_INGEST_MAX_QUEUE", 16)), description="Most ingest, import and graph update requests waiting for a slot")
+    INGEST_MAX_PER_USER: int = Field(int(environ.get("ADMISSION_INGEST_MAX_PER_USER", 8)), description="Most ingest, import and graph update requests of one user served or waiting at once")
+    INGEST_QUEUE_TIMEOUT_SECONDS: float = Field(float(environ.get("ADMISSION_INGEST_QUEUE_TIMEOUT_SECONDS", 30)), description="How long an ingest, import or graph update request may wait for a slot")
+
+class Rag(BaseModel):
+    """Retrieval configuration"""
+    CONTEXT_TOKEN_BUDGET: int = Field(int(environ.get("RAG_CONTEXT_TOKEN_BUDGET", 3000)), description="Most tokens of graph context put into a RAG prompt")
+    MAX_NEIGHBORS: int = Field(int(environ.get("RAG_MAX_NEIGHBORS", 10)), description="Most neighbours followed from each node during expansion, highest centrality first")
+    HOP_DECAY: float = Field(float(environ.get("RAG_HOP_DECAY", 0.5)), description="Relevance multiplier per hop away from a similarity search result")
+    BATCH_CONCURRENCY: int = Field(int(environ.get("RAG_BATCH_CONCURRENCY", 4)), description="Most answer completions of one batch RAG request generated at a time")
+    MAX_BATCH_QUERIES: int = Field(int(environ.get("RAG_MAX_BATCH_QUERIES", 20)), description="Most queries accepted in one batch RAG request")
+    DECOMPOSITION_METHOD: str = Field(environ.get("RAG_DECOMPOSITION_METHOD", "heuristic"), description="How decomposed RAG queries are split into sub-queries: 'heuristic' (at connectives) or 'llm'")
+    MAX_SUB_QUERIES: int = Field(int(environ.get("RAG_MAX_SUB_QUERIES", 3)), description="Most sub-queries a decomposed RAG query is split into, besides the query itself")
+    DECOMPOSITION_MAX_SEEDS: int = Field(int(environ.get("RAG_DECOMPOSITION_MAX_SEEDS", 10)), description="Most similarity search results of all sub-queries together that a decomposed RAG query expands from")
+
+class Cache(BaseModel):
+    """Cache configuration"""
+    BACKEND: str = Field(environ.get("CACHE_BACKEND", "memory"), description="Cache storage: 'memory' (per worker), 'sqlite' (shared by the workers on a host) or 'redis'")
+    SQLITE_PATH: str = Field(environ.get("CACHE_SQLITE_PATH", "/tmp/persona-graph-cache.sqlite3"), description="Database file of the sqlite cache backend, on local disk")
+    SQLITE_MAX_ENTRIES: int = Field(int(environ.get("CACHE_SQLITE_MAX_ENTRIES", 100000)), description="Most entries kept by the sqlite cache backend across all caches")
+    REDIS_URL: str = Field(environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0"), description="Server of the redis cache backend")
+    RAG_TTL_SECONDS: float = Field(float(environ.get("RAG_CACHE_TTL_SECONDS", 300)), description="How long a cached RAG answer stays valid")
+    RAG_MAX_ENTRIES: int = Field(int(environ.get("RAG_CACHE_MAX_ENTRIES", 1024)), description="Most RAG answers kept in the cache; 0 disables it")
+    EMBEDDING_TTL_SECONDS: float = Field(float(environ.get("CACHE_EMBEDDING_TTL_SECONDS", 86400)), description="How long a cached query embedding stays valid")
+    EMBEDDING_MAX_ENTRIES: int = Field(int(environ.get("CACHE_EMBEDDING_MAX_ENTRIES", 2048)), description="Most query embeddings kept in the cache; 0 disables it")
+    USER_TTL_SECONDS: float = Field(float(environ.get("CACHE_USER_TTL_SECONDS", 60)), description="How long a user is remembered to exist without asking the graph store")
+    USER_MAX_ENTRIES: int = Field(int(environ.get("CACHE_USER_MAX_ENTRIES", 10000)), description="Most users remembered to exist; 0 disables it")
+    DECOMPOSITION_TTL_SECONDS: float = Field(float(environ.get("CACHE_DECOMPOSITION_TTL_SECONDS", 86400)), description="How long an LLM query decomposition stays cached")
+    DECOMPOSITION_MAX_ENTRIES: int = Field(int(environ.get("CACHE_DECOMPOSITION_MAX_ENTRIES", 2048)), description="Most LLM query decompositions kept in the cache; 0 disables it")
+
+class Compaction(BaseModel):
+    """Graph compaction and retention configuration"""
+    INTERVAL_SECONDS: float = Field(float(environ.get("COMPACTION_INTERVAL_SECONDS", 0)), description="How often every user's graph is compacted in the background; 0 disables the schedule")
+    STALE_DAYS: float = Field(float(environ.get("COMPACTION_STALE_DAYS", 90)), description="Nodes not written or retrieved for this long may be compacted")
+    MAX_ACCESS_COUNT: int = Field(int(environ.get("COMPACTION_MAX_ACCESS_COUNT", 1)), description="Nodes retrieved more often than this are never compacted for staleness")
+    MAX_NODES: int = Field(int(environ.get("COMPACTION_MAX_NODES", 0)), description="Nodes a user's graph is compacted down to, least used leaves first, even if they aren't stale; 0 for no bound")
+    BATCH_SIZE: int = Field(int(environ.get("COMPACTION_BATCH_SIZE", 500)), description="Most nodes compacted for one user per run")
+    SUMMARIZE: bool = Field(environ.get("COMPACTION_SUMMARIZE", "false").lower() == "true", description="Replace large clusters of compacted leaves with one LLM-written summary node")
+    SUMMARIZE_MIN_CLUSTER: int = Field(int(environ.get("COMPACTION_SUMMARIZE_MIN_CLUSTER", 5)), description="Fewest compacted leaves around one node that are summarized instead of folded in")
+    ACCESS_FLUSH_SECONDS: float = Field(float(environ.get("COMPACTION_ACCESS_FLUSH_SECONDS", 2)), description="How long node access counts from RAG queries are buffered before being written; negative disables access tracking")
 
 class ML(BaseModel):
     """Machine Learning configuration"""
@@ -57,14 +125,36 @@ class ML(BaseModel):
     )
     OPENAI_KEY: str = Field(environ.get("OPENAI_KEY", ""), description="OpenAI API key")
     OPENAI_ORG: str = Field(environ.get("OPENAI_ORG", ""), description="OpenAI organization")
+    OPENAI_BASE_URL: Optional[str] = Field(environ.get("OPENAI_BASE_URL"), description="Override for the OpenAI API base URL, e.g. a local mock server")
     OPENAI_TEXT_COMPLETION_MODEL: str = Field("gpt-3.5-turbo", description="OpenAI text completion model")
+    OPENAI_MAX_CONCURRENCY: int = Field(int(environ.get("OPENAI_MAX_CONCURRENCY", 8)), description="Most OpenAI calls in flight at once")
+    OPENAI_REQUESTS_PER_MINUTE: float = Field(float(environ.get("OPENAI_REQUESTS_PER_MINUTE", 500)), description="Requests per minute allowed to OpenAI")
+    OPENAI_TOKENS_PER_MINUTE: float = Field(float(environ.get("OPENAI_TOKENS_PER_MINUTE", 200000)), description="Estimated tokens per minute allowed to OpenAI")
+    OPENAI_TIMEOUT_SECONDS: float = Field(float(environ.get("OPENAI_TIMEOUT_SECONDS", 60)), description="Timeout for each OpenAI call attempt")
+    OPENAI_MAX_RETRIES: int = Field(int(environ.get("OPENAI_MAX_RETRIES", 4)), description="Retries for rate-limited, timed-out or failed OpenAI calls")
+
+class Telemetry(BaseModel):
+    """Logging and metrics configuration"""
+    LOG_LEVEL: str = Field(environ.get("LOG_LEVEL", "INFO"), description="Log level for the application loggers")
+    SERVICE_NAME: str = Field(environ.get("SERVICE_NAME", "innernet-user-memory"), description="Service name attached to exported traces")
+    TRACE_EXPORTER: str = Field(environ.get("TRACE_EXPORTER", "none"), description="Where request traces go: 'log' (JSON log lines), 'otlp' or 'none'")
+    OTLP_ENDPOINT: str = Field(environ.get("OTLP_ENDPOINT", "http://localhost:4318/v1/traces"), description="OTLP/HTTP traces endpoint used when TRACE_EXPORTER is 'otlp'")
+    DEBUG_TIMING: bool = Field(environ.get("DEBUG_TIMING", "false").lower() == "true", description="Always send the X-Debug-Timing header, not only when the request asks for it")
+    ALLOW_DEBUG_TIMING_HEADER: bool = Field(environ.get("ALLOW_DEBUG_TIMING_HEADER", "false").lower() == "true", description="Send the X-Debug-Timing header to requests that ask for it with an X-Debug-Timing header of their own")
 
 class BaseConfig(BaseSettings):
     """Base configuration for the application"""
     INFO: Info = Info()
     DB: Database = Database()
     NEO4J: Neo4j = Neo4j()
+    GRAPH: Graph = Graph()
+    INGEST: Ingest = Ingest()
+    RAG: Rag = Rag()
+    ADMISSION: Admission = Admission()
+    CACHE: Cache = Cache()
+    COMPACTION: Compaction = Compaction()
     MACHINE_LEARNING: ML = ML()
+    TELEMETRY: Telemetry = Telemetry()
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,234 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Protocol, runtime_checkable
+
+from app.config import config
+
+# Called with (deleted, total) while a batched delete makes progress.
+ProgressCallback = Callable[[int, int], None]
+
+
+def flatten_properties(properties: Dict[str, Any], parent: str = "") -> Dict[str, Any]:
+    """
+    Flatten nested property maps into dotted keys with primitive values, the
+    shape a graph store can hold natively, e.g. {"a": {"b": 1}} -> {"a.b": 1}.
+    """
+    flat: Dict[str, Any] = {}
+    for key, value in (properties or {}).items():
+        name = f"{parent}.{key}" if parent else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_properties(value, name))
+        elif value is None or isinstance(value, (str, int, float, bool)):
+            flat[name] = value
+        elif isinstance(value, (list, tuple)) and all(isinstance(v, (str, int, float, bool)) for v in value):
+            flat[name] = list(value)
+        else:
+            flat[name] = str(value)
+    return flat
+
+
+@runtime_checkable
+class GraphBackend(Protocol):
+    """
+    Storage operations `GraphOps` needs from a graph store.
+
+    `Neo4jConnectionManager` is the production implementation and
+    `InMemoryGraphBackend` the reference one; both return plain dicts in the
+    shapes documented below.
+    """
+
+    async def wait_until_ready(self, timeout: int = 60) -> None: ...
+
+    async def close(self) -> None: ...
+
+    async def ensure_vector_index(self, force: bool = False) -> None:
+        """Make sure the schema exists; after the first call in a process this is a no-op unless forced."""
+        ...
+
+    async def clean_graph(self, batch_size: Optional[int] = None) -> None: ...
+
+    async def create_nodes(self, nodes: List[Dict[str, Any]], user_id: str) -> None:
+        """
+        Merge nodes by name; each dict has `name`, `perspective`, `properties`
+        and optionally `aliases`. Properties are flattened and merged into the
+        node's existing ones and aliases are added to the node's alias list.
+        """
+        ...
+
+    async def find_nodes_by_keys(self, keys: List[str], user_id: str) -> Dict[str, str]:
+        """
+        Names of the nodes whose normalized name or alias (see `app.graph.entity_resolution`)
+        is one of `keys`, keyed by the matching key.
+        """
+        ...
+
+    async def create_relationships(self, relationships: List[Dict[str, Any]], user_id: str) -> None:
+        """
+        Merge relationships; each dict has `source`, `target`, `relation` and
+        optionally `value`. They are stored under the canonical type of
+        `relation` (see `app.graph.relations`), with `value` defaulting to the
+        relation as given.
+        """
+        ...
+
+    async def add_embedding_to_vector_index(self, node_name: str, embedding: List[float], user_id: str) -> None: ...
+
+    async def add_embeddings_to_vector_index(self, embeddings: Dict[str, List[float]], user_id: str) -> None:
+        """Set the embeddings of many nodes, keyed by node name, in one write."""
+        ...
+
+    async def nodes_missing_embeddings(self, node_names: List[str], user_id: str) -> List[str]:
+        """The given names that are not nodes yet, or are nodes without an embedding."""
+        ...
+
+    async def apply_graph_delta(self, delta: Dict[str, Any], user_id: str) -> None:
+        """
+        Atomically apply `delete_relationships`, `delete_nodes`, `nodes`,
+        `embeddings` and `relationships` (in that order, each optional) and
+        bump the graph version.
+        """
+        ...
+
+    async def query_text_similarity(self, keyword_embedding: List[float], user_id: str, index_name: str = "embeddings_index",
+                                    property_filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Top matches as dicts with `nodeId`, `nodeName` and `score`, best first,
+        restricted to nodes whose properties equal every entry of `property_filters`.
+        """
+        ...
+
+    async def query_text_similarity_many(self, keyword_embeddings: List[List[float]], user_id: str,
+                                         index_name: str = "embeddings_index",
+                                         property_filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """`query_text_similarity` for several embeddings in one round trip, results in input order."""
+        ...
+
+    async def get_node_data(self, node_name: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """A dict with `name`, `perspective` and `properties`, or None if the node doesn't exist."""
+        ...
+
+    async def get_nodes_data(self, node_names: List[str], user_id: str) -> Dict[str, Dict[str, Any]]:
+        """`get_node_data` for several nodes in one read, keyed by name; missing nodes are left out."""
+        ...
+
+    async def get_node_relationships(self, node_name: str, user_id: str, limit: Optional[int] = None,
+                                     relation_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Relationships in either direction as dicts with `source`, `target`, `relation` and `value`.
+        With a `limit`, only the relationships to the most central neighbours, highest PageRank first.
+        With `relation_types`, only relationships of those (canonicalized) types.
+        """
+        ...
+
+    async def get_nodes_relationships(self, node_names: List[str], user_id: str, limit: Optional[int] = None,
+                                      relation_types: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        `get_node_relationships` for several nodes in one read, keyed by name,
+        with `limit` applied per node. Nodes without relationships may be left out.
+        """
+        ...
+
+    async def get_node_digests(self, node_names: List[str], user_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        `get_node_data` plus the stored neighbourhood digest (`GRAPH_NEIGHBORHOOD_DIGESTS`)
+        of several nodes in one read, keyed by name. `neighbors` lists dicts with `name`,
+        `relation`, `value`, `outgoing` and a truncated `perspective`, most central first,
+        and is None for nodes whose digest hasn't been built.
+        """
+        ...
+
+    async def get_node_centrality(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Stored `degree` and `pagerank` of every node by name; None where not computed yet."""
+        ...
+
+    async def set_node_centrality(self, scores: Dict[str, Dict[str, Any]], user_id: str) -> None: ...
+
+    async def get_all_nodes(self, user_id: str) -> List[Dict[str, Any]]: ...
+
+    async def count_nodes(self, user_id: str) -> int: ...
+
+    async def record_node_access(self, counts: Dict[str, int], user_id: str) -> None:
+        """Add to the nodes' `access_count` and set their `last_touched` to now; writes set it too."""
+        ...
+
+    async def get_compaction_candidates(self, user_id: str, touched_before: int, max_access_count: int,
+                                        limit: int) -> List[Dict[str, Any]]:
+        """
+        Nodes with at most one relationship, last touched before `touched_before`
+        (ms since the epoch) and accessed at most `max_access_count` times, least
+        used first. Dicts have `name`, `perspective`, `access_count`,
+        `last_touched` and `edges`, the node's relationship if it has one.
+        Nodes written before access tracking have no `last_touched` and are skipped.
+        """
+        ...
+
+    async def get_all_relationships(self, user_id: str) -> List[Dict[str, Any]]: ...
+
+    async def get_nodes_page(self, user_id: str, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` nodes with `name`, `perspective` and `properties`, ordered by name, after the name `after`."""
+        ...
+
+    async def get_relationships_page(self, user_id: str, after: Optional[List[str]], limit: int,
+                                     relation_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` relationships with `source`, `target`, `relation` and `value`,
+        ordered by (source, target, relation), after the key `after`, optionally
+        only of the given relation types.
+        """
+        ...
+
+    def iter_nodes(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream every node of the user as dicts with `name`, `perspective`,
+        `properties`, `aliases` and `embedding` (None when missing), without loading them all.
+        """
+        ...
+
+    def iter_relationships(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every relationship of the user as dicts with `source`, `target`, `relation` and `value`."""
+        ...
+
+    async def create_user(self, user_id: str) -> None: ...
+
+    async def list_users(self) -> List[str]: ...
+
+    async def get_graph_version(self, user_id: str) -> Optional[int]:
+        """The user's graph version, which changes on every graph update; None if the user doesn't exist."""
+        ...
+
+    async def bump_graph_version(self, user_id: str) -> None: ...
+
+    async def user_exists(self, user_id: str) -> bool: ...
+
+    async def delete_user(self, user_id: str, batch_size: Optional[int] = None,
+                          progress: Optional[ProgressCallback] = None) -> None:
+        """Delete the user and all of their nodes, reporting progress as it goes."""
+        ...
+
+
+_memory_backend = None
+
+
+def get_graph_backend() -> GraphBackend:
+    """
+    Return the backend selected by `config.GRAPH.BACKEND`.
+
+    The in-memory backend is a process-wide singleton so that every `GraphOps`
+    sees the same data; Neo4j managers are created per caller as before.
+    """
+    global _memory_backend
+    backend = config.GRAPH.BACKEND.lower()
+    if backend == "memory":
+        if _memory_backend is None:
+            from app.graph.memory_backend import InMemoryGraphBackend
+            _memory_backend = InMemoryGraphBackend()
+        return _memory_backend
+    if backend == "neo4j":
+        from app.graph.neo4j_database import Neo4jConnectionManager
+        return Neo4jConnectionManager()
+    raise ValueError(f"Unknown graph backend: {config.GRAPH.BACKEND}")
+
+
+async def close_graph_backend() -> None:
+    """Release process-wide backend resources; call once on shutdown."""
+    if config.GRAPH.BACKEND.lower() == "neo4j":
+        from app.graph.neo4j_database import close_driver
+        await close_driver()
@@ -0,0 +1,264 @@
+"""
+Graph compaction and retention.
+
+Every ingest adds nodes, so without compaction a long-lived user's graph, and
+with it the ingest prompt, vector search and expansion, grows without bound.
+Nodes record when they were last written or retrieved (`last_touched`) and how
+often RAG retrieved them (`access_count`). Compaction removes stale, rarely
+used leaf nodes, those with at most one relationship:
+
+- a leaf hanging off another node is folded into it: the relationship is kept
+  as a line in that node's `compacted` property, which RAG context shows,
+- an isolated leaf is pruned,
+- with `COMPACTION_SUMMARIZE`, a cluster of leaves around one node is replaced
+  by a single LLM-written summary node instead.
+
+If `COMPACTION_MAX_NODES` is set, the least used leaves are compacted even when
+not stale until the graph is back under the bound.
+
+Run it for some or all users with:
+    python -m app.graph.compaction [user_id ...]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter as TallyCounter
+from typing import Any, Dict, Iterable, List, Optional
+
+from prometheus_client import Counter
+
+from app.config import config
+from app.graph.backend import GraphBackend, close_graph_backend, get_graph_backend
+from app.graph.centrality import CentralityJob
+from app.openai.embeddings import generate_embeddings
+from app.openai.llm_graph import summarize_cluster
+from app.openai.scheduler import Priority, llm_priority
+
+logger = logging.getLogger(__name__)
+
+COMPACTED_NODES = Counter(
+    "persona_graph_compacted_nodes_total",
+    "Nodes removed by graph compaction, by what happened to them",
+    ["action"],
+)
+
+# Most folded-in relationship lines kept on one node, newest last.
+MAX_COMPACTED_FACTS = 50
+SUMMARY_RELATION = "SUMMARIZED_AS"
+# Access count ceiling used when compacting for size rather than staleness.
+ANY_ACCESS_COUNT = 2 ** 62
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class AccessTracker:
+    """
+    Buffers how often RAG retrieved each node and writes the counts in one
+    statement per user after `COMPACTION_ACCESS_FLUSH_SECONDS`, so queries
+    don't pay for a write each.
+    """
+
+    _pending: Dict[str, TallyCounter] = {}
+    _tasks: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def record(cls, user_id: str, node_names: Iterable[str], backend: GraphBackend) -> None:
+        if config.COMPACTION.ACCESS_FLUSH_SECONDS < 0:
+            return
+        cls._pending.setdefault(user_id, TallyCounter()).update(node_names)
+        task = cls._tasks.get(user_id)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            cls._tasks[user_id] = asyncio.create_task(cls._run(user_id, backend))
+
+    @classmethod
+    async def flush(cls, user_id: str, backend: GraphBackend) -> None:
+        counts = cls._pending.pop(user_id, None)
+        if counts:
+            await backend.record_node_access(dict(counts), user_id)
+
+    @classmethod
+    async def flush_all(cls, backend: GraphBackend) -> None:
+        """Write every buffered count now, e.g. on shutdown."""
+        for user_id in list(cls._pending):
+            try:
+                await cls.flush(user_id, backend)
+            except Exception:
+                logger.exception("Failed to record node access for user %s", user_id)
+
+    @classmethod
+    async def _run(cls, user_id: str, backend: GraphBackend) -> None:
+        try:
+            await asyncio.sleep(config.COMPACTION.ACCESS_FLUSH_SECONDS)
+            await cls.flush(user_id, backend)
+        except Exception:
+            logger.exception("Failed to record node access for user %s", user_id)
+        finally:
+            if cls._tasks.get(user_id) is asyncio.current_task():
+                del cls._tasks[user_id]
+
+
+async def find_candidates(backend: GraphBackend, user_id: str, now_ms: int) -> List[Dict[str, Any]]:
+    """Stale, rarely used leaves, plus the least used leaves beyond `COMPACTION_MAX_NODES`."""
+    settings = config.COMPACTION
+    stale_before = now_ms - int(settings.STALE_DAYS * 86_400_000)
+    candidates = await backend.get_compaction_candidates(user_id, stale_before, settings.MAX_ACCESS_COUNT,
+                                                         settings.BATCH_SIZE)
+    room = settings.BATCH_SIZE - len(candidates)
+    if settings.MAX_NODES > 0 and room > 0:
+        excess = await backend.count_nodes(user_id) - len(candidates) - settings.MAX_NODES
+        if excess > 0:
+            seen = {candidate["name"] for candidate in candidates}
+            extra = await backend.get_compaction_candidates(user_id, now_ms + 1, ANY_ACCESS_COUNT,
+                                                            min(room, excess) + len(seen))
+            candidates += [candidate for candidate in extra if candidate["name"] not in seen][:min(room, excess)]
+    return candidates
+
+
+async def compact_user(backend: GraphBackend, user_id: str, now_ms: Optional[int] = None,
+                       summarize: Optional[bool] = None) -> Dict[str, int]:
+    """
+    Compact one user's graph in a single graph update; see the module docstring.
+
+    Args:
+    - backend (GraphBackend): The graph store.
+    - user_id (str): The user whose graph is compacted.
+    - now_ms (int): The current time in ms since the epoch, for tests.
+    - summarize (bool): Summarize clusters with the LLM, defaults to `COMPACTION_SUMMARIZE`.
+
+    Returns:
+    - Dict[str, int]: How many nodes were folded into a neighbour, pruned or summarized, and summary nodes created.
+    """
+    now_ms = _now_ms() if now_ms is None else now_ms
+    summarize = config.COMPACTION.SUMMARIZE if summarize is None else summarize
+    counts = {"folded": 0, "pruned": 0, "summarized": 0, "summary_nodes": 0}
+    candidates = await find_candidates(backend, user_id, now_ms)
+
+    # A leaf is folded into its neighbour, which is kept even if it is a candidate itself
+    removed, kept = set(), set()
+    clusters: Dict[str, List[Dict[str, str]]] = {}
+    for candidate in candidates:
+        name = candidate["name"]
+        if name in kept:
+            continue
+        edge = candidate["edges"][0] if candidate["edges"] else None
+        neighbour = None if edge is None else edge["target"] if edge["source"] == name else edge["source"]
+        if neighbour is not None and neighbour != name and neighbour not in removed:
+            relation = edge.get("value") or edge["relation"]
+            clusters.setdefault(neighbour, []).append({
+                "name": name,
+                "perspective": candidate.get("perspective") or "",
+                "relation": relation,
+                "fact": f"{edge['source']} {relation} {edge['target']}",
+            })
+            kept.add(neighbour)
+        else:
+            counts["pruned"] += 1
+        removed.add(name)
+    if not removed:
+        return counts
+
+    nodes: List[Dict[str, Any]] = []
+    relationships: List[Dict[str, Any]] = []
+    for hub, members in clusters.items():
+        hub_data = await backend.get_node_data(hub, user_id)
+        if hub_data is None:
+            counts["pruned"] += len(members)
+            continue
+        summary = None
+        if summarize and len(members) >= config.COMPACTION.SUMMARIZE_MIN_CLUSTER:
+            with llm_priority(Priority.BACKGROUND):
+                summary = await summarize_cluster(hub, members)
+        if summary is not None and summary.name not in removed and summary.name != hub:
+            nodes.append({"name": summary.name, "perspective": summary.perspective,
+                          "properties": {"summary_of": [member["name"] for member in members]}})
+            relationships.append({"source": hub, "target": summary.name, "relation": SUMMARY_RELATION})
+            counts["summarized"] += len(members)
+            counts["summary_nodes"] += 1
+        else:
+            facts = list(hub_data["properties"].get("compacted") or []) + [member["fact"] for member in members]
+            nodes.append({"name": hub, "perspective": hub_data["perspective"],
+                          "properties": {"compacted": facts[-MAX_COMPACTED_FACTS:]}})
+            counts["folded"] += len(members)
+
+    summary_names = [node["name"] for node in nodes if "summary_of" in node["properties"]]
+    embeddings = {}
+    if summary_names:
+        with llm_priority(Priority.BACKGROUND):
+            generated = await generate_embeddings(summary_names)
+        embeddings = {name: embedding for name, embedding in zip(summary_names, generated) if embedding}
+
+    await backend.apply_graph_delta({
+        "delete_nodes": sorted(removed),
+        "nodes": nodes,
+        "embeddings": embeddings,
+        "relationships": relationships,
+    }, user_id)
+    CentralityJob.schedule(user_id, backend)
+    for action in ("folded", "pruned", "summarized"):
+        COMPACTED_NODES.labels(action).inc(counts[action])
+    logger.info("Compacted graph of user %s: %s", user_id, counts)
+    return counts
+
+
+async def compact_all(backend: GraphBackend, user_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+    """Compact the given users, or every user, one at a time; a failure for one user doesn't stop the rest."""
+    results = {}
+    for user_id in user_ids or await backend.list_users():
+        try:
+            results[user_id] = await compact_user(backend, user_id)
+        except Exception:
+            logger.exception("Compaction failed for user %s", user_id)
+    return results
+
+
+class CompactionScheduler:
+    """Compacts every user's graph each `COMPACTION_INTERVAL_SECONDS`, from the app's lifespan."""
+
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls, backend: GraphBackend) -> None:
+        if config.COMPACTION.INTERVAL_SECONDS <= 0 or (cls._task is not None and not cls._task.done()):
+            return
+        cls._task = asyncio.create_task(cls._run(backend))
+
+    @classmethod
+    async def stop(cls) -> None:
+        task, cls._task = cls._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @classmethod
+    async def _run(cls, backend: GraphBackend) -> None:
+        while True:
+            await asyncio.sleep(config.COMPACTION.INTERVAL_SECONDS)
+            results = await compact_all(backend)
+            logger.info("Scheduled compaction finished for %d users", len(results))
+
+
+async def main(user_ids: List[str]) -> None:
+    backend = get_graph_backend()
+    await backend.wait_until_ready()
+    try:
+        for user_id, counts in (await compact_all(backend, user_ids)).items():
+            logger.info("User %s: %s", user_id, counts)
+    finally:
+        await backend.close()
+        await close_graph_backend()
+
+
+if __name__ == "__main__":
+    from app.utils.log_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Compact user graphs under the configured retention rules")
+    parser.add_argument("user_ids", nargs="*", help="Users to compact; all users when omitted")
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(main(args.user_ids))
@@ -1,18 +1,22 @@
+from app.graph.backend import GraphBackend
 from app.graph.graph_ops import GraphOps
 from app.openai.llm_graph import get_entities, get_nodes_and_relationships
 from app.utils.models import NodeModel, RelationshipModel, GraphUpdateModel, UnstructuredData, NodesAndRelationshipsResponse
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from collections import defaultdict
+import logging
+
+logger = logging.getLogger(__name__)
 
 class GraphConstructor:
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, backend: Optional[GraphBackend] = None):
         self.user_id = user_id
+        self.backend = backend
         self.graph_ops = None
 
     async def __aenter__(self):
-        self.graph_ops = GraphOps()
-        # Ensure the vector index is created
-        await self.graph_ops.neo4j_manager.ensure_vector_index()
+        self.graph_ops = GraphOps(self.backend)
+        await self.graph_ops.__aenter__()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -21,7 +25,7 @@ class GraphConstructor:
     async def clean_graph(self):
         await self.graph_ops.clean_graph()
         # Recreate the vector index after cleaning
-        await self.graph_ops.neo4j_manager.ensure_vector_index()
+        await self.graph_ops.backend.ensure_vector_index()
 
     async def process_unstructured_data(self, data: UnstructuredData):
         structured_data = self.preprocess_data(data)
@@ -29,7 +33,7 @@ class GraphConstructor:
         nodes, relationships = await self.generate_nodes_and_relationships(entities)
         
         if not nodes and not relationships:
-            print("No nodes or relationships generated from the unstructured data.")
+            logger.info("No nodes or relationships generated from the unstructured data.")
             return
         
         nodes = [NodeModel(name=node.name, perspective=node.perspective) for node in nodes]
@@ -53,28 +57,25 @@ class GraphConstructor:
         return preprocessed
 
     async def extract_entities(self, text: str) -> List[str]:
-        print(f"Extracting entities from text...")
+        logger.debug("Extracting entities from text...")
         entities_response = await get_entities(text)
         entities = entities_response.get('entities', [])
-        print(f"Extracted entities: {entities}")
+        logger.debug("Extracted %d entities", len(entities))
         return entities
 
     async def generate_nodes_and_relationships(self, entities: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        print(f"Generating nodes and relationships from entities...")
+        logger.debug("Generating nodes and relationships from entities...")
         graph_context = await self.get_entire_graph_context()
         nodes, relationships = await get_nodes_and_relationships(entities, graph_context)
         
-        print(f"Generated nodes: {nodes}")
-        print(f"Generated relationships: {relationships}")
+        logger.debug("Generated %d nodes and %d relationships", len(nodes), len(relationships))
         return nodes, relationships
 
     async def get_entire_graph_context(self) -> str:
         nodes = await self.graph_ops.get_all_nodes(self.user_id)
         relationships = await self.graph_ops.get_all_relationships(self.user_id)
-       
-        print (nodes)
-        print (relationships)
-        
+        logger.debug("Building graph context from %d nodes and %d relationships", len(nodes), len(relationships))
+
         context = "# Current Knowledge Graph\n\n## Nodes\n"
         for node in nodes:
             context += f"- {node.name}: {node.perspective}\n"
@@ -86,19 +87,19 @@ class GraphConstructor:
         return context
 
     async def add_nodes_and_relationships(self, nodes: List[Dict[str, Any]], relationships: List[Dict[str, Any]]):
-        print(f"Adding nodes and relationships to the graph...")
+        logger.debug("Adding nodes and relationships to the graph...")
         node_models = [NodeModel(name=node['name'], label=node.get('label', 'Entity')) for node in nodes] if nodes else []
         relationship_models = [RelationshipModel(source=rel['source'], target=rel['target'], relation=rel['relation']) for rel in relationships] if relationships else []
         graph_update = GraphUpdateModel(nodes=node_models, relationships=relationship_models)
         await self.graph_ops.update_graph(graph_update, self.user_id)
 
     async def get_graph_context(self, query: str):
-        print(f"Getting graph context for query: {query}")
+        logger.debug("Getting graph context for query: %s", query)
         results = await self.graph_ops.perform_similarity_search(query, self.user_id)
         return results
 
     async def close(self):
-        print("Closing Neo4j connection...")
+        logger.debug("Closing Neo4j connection...")
         await self.graph_ops.close()
 
 
@@ -117,7 +118,6 @@ class GraphContextRetriever:
     async def crawl_graph(self, start_nodes, max_hops, user_id):
         context = {}
         for node in start_nodes:
-            print(node)
             await self.explore_node(node['nodeName'], context, max_hops, user_id)
         return context
 
@@ -126,6 +126,8 @@ class GraphContextRetriever:
             return
         
         node_data = await self.graph_ops.get_node_data(node_name, user_id)
+        if node_data is None:
+            return
         relationships = await self.graph_ops.get_node_relationships(node_name, user_id)
         
         context[node_name] = {
@@ -0,0 +1,130 @@
+import logging
+from typing import Any, Dict, NamedTuple, Optional
+
+from prometheus_client import Histogram
+
+from app.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKENS = Histogram(
+    "persona_graph_context_tokens",
+    "Tokens of graph context sent to the LLM (used) and left out to fit the budget (dropped)",
+    ["kind"],
+    buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+
+
+class NodeCandidate(NamedTuple):
+    name: str
+    perspective: str
+    properties: Dict[str, Any]
+    score: float
+    hop: int
+
+
+class EdgeCandidate(NamedTuple):
+    source: str
+    relation: str
+    target: str
+    value: str
+    score: float
+    hop: int
+
+
+class AssembledContext(NamedTuple):
+    text: str
+    tokens_used: int
+    tokens_dropped: int
+    nodes_included: int
+    nodes_dropped: int
+    edges_included: int
+    edges_dropped: int
+
+
+class ContextAssembler:
+    """
+    Builds an LLM context from retrieved nodes and edges within a token budget.
+
+    Each node is described once, however many paths reach it, using the
+    candidate with the best relevance. Relevance is the vector score of the
+    seed the candidate was reached from, decayed by `hop_decay` per hop. Node
+    descriptions and relationship lines are added greedily from the most
+    relevant down; anything that doesn't fit in the remaining budget is
+    dropped and counted.
+    """
+
+    def __init__(self, token_budget: int, hop_decay: float = 0.5, title: str = "# Knowledge Graph Context"):
+        self.token_budget = token_budget
+        self.hop_decay = hop_decay
+        self.title = title
+        self.nodes: Dict[str, NodeCandidate] = {}
+        self.edges: Dict[tuple, EdgeCandidate] = {}
+
+    def relevance(self, score: float, hop: int) -> float:
+        return score * self.hop_decay ** hop
+
+    def add_node(self, name: str, perspective: Optional[str], properties: Optional[Dict[str, Any]],
+                 score: float, hop: int = 0) -> None:
+        existing = self.nodes.get(name)
+        if existing is None or self.relevance(score, hop) > self.relevance(existing.score, existing.hop):
+            self.nodes[name] = NodeCandidate(name, perspective or "", properties or {}, score, hop)
+
+    def add_edge(self, source: str, relation: str, target: str, value: Optional[str], score: float, hop: int) -> None:
+        key = (source, relation, target)
+        existing = self.edges.get(key)
+        if existing is None or self.relevance(score, hop) > self.relevance(existing.score, existing.hop):
+            self.edges[key] = EdgeCandidate(source, relation, target, value or "", score, hop)
+
+    @staticmethod
+    def format_node(node: NodeCandidate) -> str:
+        text = f"## {node.name}\n"
+        if node.perspective:
+            text += f"Perspective: {node.perspective}\n"
+        if node.properties:
+            text += f"Properties: {', '.join(f'{k}: {v}' for k, v in node.properties.items())}\n"
+        return text + "\n"
+
+    @staticmethod
+    def format_edge(edge: EdgeCandidate) -> str:
+        line = f"- {edge.source} {edge.relation} {edge.target}"
+        if edge.value and edge.value != edge.relation:
+            line += f" ({edge.value})"
+        return line + "\n"
+
+    def assemble(self) -> AssembledContext:
+        header = self.title + "\n\n"
+        edges_header = "## Relationships\n"
+        remaining = self.token_budget - count_tokens(header)
+
+        items = [(self.relevance(n.score, n.hop), 0, n) for n in self.nodes.values()]
+        items += [(self.relevance(e.score, e.hop) * self.hop_decay, 1, e) for e in self.edges.values()]
+        # Nodes before edges on ties, since edges refer to them
+        items.sort(key=lambda item: (-item[0], item[1]))
+
+        nodes, edges = [], []
+        dropped_tokens = nodes_dropped = edges_dropped = 0
+        for _, kind, item in items:
+            text = self.format_node(item) if kind == 0 else self.format_edge(item)
+            tokens = count_tokens(text)
+            if kind == 1 and not edges:
+                tokens += count_tokens(edges_header)
+            if tokens > remaining:
+                dropped_tokens += tokens
+                if kind == 0:
+                    nodes_dropped += 1
+                else:
+                    edges_dropped += 1
+                continue
+            remaining -= tokens
+            (nodes if kind == 0 else edges).append(text)
+
+        text = header + "".join(nodes)
+        if edges:
+            text += edges_header + "".join(edges)
+        used = self.token_budget - remaining
+        CONTEXT_TOKENS.labels("used").observe(used)
+        CONTEXT_TOKENS.labels("dropped").observe(dropped_tokens)
+        logger.debug("Context uses %d tokens, dropped %d tokens (%d nodes, %d edges)",
+                     used, dropped_tokens, nodes_dropped, edges_dropped)
+        return AssembledContext(text, used, dropped_tokens, len(nodes), nodes_dropped, len(edges), edges_dropped)
@@ -0,0 +1,168 @@
+"""
+Write-time entity resolution.
+
+Before new nodes are written, each name is matched against the user's
+existing nodes, first by normalized name (and the normalized names of known
+aliases), then by embedding similarity. Matches are folded into the existing,
+canonical node and the incoming name is kept as one of its aliases, so
+"Python", "python" and "Python 3" don't become three nodes that are each
+embedded, indexed and crawled.
+"""
+import asyncio
+import logging
+import re
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+from prometheus_client import Counter
+
+from app.config import config
+from app.graph.backend import GraphBackend
+
+logger = logging.getLogger(__name__)
+
+ENTITIES_MERGED = Counter(
+    "persona_graph_entities_merged_total",
+    "Incoming node names folded into another node at write time, by how they were matched",
+    ["method"],
+)
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize_name(name: str) -> str:
+    """
+    The lookup key of a node name: accents, case, punctuation and extra
+    whitespace are dropped, and dotted initials are joined, so
+    "A.I." -> "ai" and "  Café  Society" -> "cafe society".
+    """
+    text = unicodedata.normalize("NFKD", name).casefold()
+    words = _WORD.findall("".join(char for char in text if not unicodedata.combining(char)))
+    if len(words) > 1 and all(len(word) == 1 for word in words):
+        return "".join(words)
+    return " ".join(words)
+
+
+def name_keys(name: str, aliases: Iterable[str] = ()) -> List[str]:
+    """Normalized keys of a node's name and aliases, without duplicates or empty keys."""
+    return [key for key in dict.fromkeys(normalize_name(n) for n in (name, *aliases)) if key]
+
+
+class Resolution(NamedTuple):
+    """
+    The outcome of resolving a batch of nodes.
+
+    - nodes: Node dicts to write, one per canonical name, with the merged names as `aliases`.
+    - embeddings: Embeddings generated for canonical nodes that don't have one yet.
+    - renames: Incoming name -> canonical name, for every name that was folded into another.
+    """
+    nodes: List[Dict[str, Any]]
+    embeddings: Dict[str, List[float]]
+    renames: Dict[str, str]
+
+    def relationships(self, relationships: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Point relationships at canonical names, dropping the self-loops and duplicates that creates."""
+        rewritten = {}
+        for rel in relationships:
+            source, target = self.renames.get(rel["source"], rel["source"]), self.renames.get(rel["target"], rel["target"])
+            if source != target:
+                rewritten.setdefault((source, target, rel["relation"]), {**rel, "source": source, "target": target})
+        return list(rewritten.values())
+
+
+class EntityResolver:
+    """
+    Resolves incoming node names against one user's graph.
+
+    Args:
+    - backend (GraphBackend): Where the user's existing nodes live.
+    - embed (Callable): Generates embeddings for a list of names, returning them keyed by name.
+    - threshold (float): Lowest similarity score, on the vector index's 0..1 scale,
+      at which two names are treated as the same entity; above 1 disables embedding matches.
+    """
+
+    def __init__(self, backend: GraphBackend, embed: Callable[[List[str]], Awaitable[Dict[str, List[float]]]],
+                 threshold: Optional[float] = None):
+        self.backend = backend
+        self.embed = embed
+        self.threshold = config.GRAPH.ENTITY_RESOLUTION_THRESHOLD if threshold is None else threshold
+
+    async def resolve(self, nodes: List[Dict[str, Any]], user_id: str, references: Iterable[str] = ()) -> Resolution:
+        """
+        Resolve `nodes` (dicts with `name`, `perspective` and `properties`).
+
+        `references` are further names, such as relationship endpoints, that
+        are renamed when their normalized name matches a node but never create one.
+        """
+        names = list(dict.fromkeys(node["name"] for node in nodes))
+        references = [name for name in dict.fromkeys(references) if name not in set(names)]
+        keys = {name: normalize_name(name) for name in names + references}
+        existing = await self.backend.find_nodes_by_keys(sorted({key for key in keys.values() if key}), user_id)
+
+        # 1. Normalized names, against the graph and within the batch
+        canonical_by_key = dict(existing)
+        renames: Dict[str, str] = {}
+        for name in names + references:
+            key = keys[name]
+            if not key:
+                continue
+            canonical = canonical_by_key.get(key) if name in references else canonical_by_key.setdefault(key, name)
+            if canonical is not None and canonical != name:
+                renames[name] = canonical
+        ENTITIES_MERGED.labels("name").inc(len(renames))
+
+        # 2. Embedding nearest neighbours for names that are still new. Their
+        # embeddings are needed anyway, so this costs one vector query per name.
+        candidates = [name for name in names if name not in renames and keys[name] not in existing]
+        missing = await self.backend.nodes_missing_embeddings(candidates, user_id) if candidates else []
+        embeddings = await self.embed(missing) if missing else {}
+        if self.threshold <= 1 and embeddings:
+            for name, canonical in (await self._match_embeddings(embeddings, user_id)).items():
+                renames[name] = canonical
+                embeddings.pop(name)
+                for alias, target in renames.items():
+                    if target == name:
+                        renames[alias] = canonical
+
+        if renames:
+            logger.info("Resolved %d of %d incoming names to existing entities for user %s",
+                        len(renames), len(names) + len(references), user_id)
+        return Resolution(self._merge_nodes(nodes, renames), embeddings, renames)
+
+    async def _match_embeddings(self, embeddings: Dict[str, List[float]], user_id: str) -> Dict[str, str]:
+        """New name -> the existing node or earlier new name it is close enough to."""
+        names = list(embeddings)
+        results = await asyncio.gather(*(self.backend.query_text_similarity(embeddings[name], user_id) for name in names))
+        vectors = np.asarray([embeddings[name] for name in names], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        # Same (1 + cos) / 2 scale as the vector index scores
+        scores = (1.0 + (vectors / norms) @ (vectors / norms).T) / 2.0
+
+        matches: Dict[str, str] = {}
+        kept: List[int] = []
+        for i, name in enumerate(names):
+            best = next((r for r in results[i] if r["nodeName"] != name), None)
+            if best is not None and best["score"] >= self.threshold:
+                matches[name] = best["nodeName"]
+                continue
+            earlier = max(kept, key=lambda j: scores[i, j], default=None)
+            if earlier is not None and scores[i, earlier] >= self.threshold:
+                matches[name] = names[earlier]
+                continue
+            kept.append(i)
+        ENTITIES_MERGED.labels("embedding").inc(len(matches))
+        return matches
+
+    @staticmethod
+    def _merge_nodes(nodes: List[Dict[str, Any]], renames: Dict[str, str]) -> List[Dict[str, Any]]:
+        merged: Dict[str, Dict[str, Any]] = {}
+        for node in nodes:
+            canonical = renames.get(node["name"], node["name"])
+            target = merged.setdefault(canonical, {"name": canonical, "perspective": "", "properties": {}, "aliases": []})
+            target["perspective"] = node.get("perspective") or target["perspective"]
+            target["properties"].update(node.get("properties") or {})
+            if node["name"] != canonical and node["name"] not in target["aliases"]:
+                target["aliases"].append(node["name"])
+        return list(merged.values())
@@ -0,0 +1,210 @@
+"""
+Streaming export and import of a user's graph as NDJSON.
+
+The first line is a header, followed by one line per node and then one per
+relationship:
+
+    {"type": "header", "format": "persona-graph", "version": 1, "user_id": "alice", "embedding_dtype": "<f4"}
+    {"type": "node", "name": "Rust", "perspective": "...", "properties": {...}, "embedding": "<base64>"}
+    {"type": "relationship", "source": "Alice", "target": "Rust", "relation": "LEARNING", "value": "LEARNING"}
+
+Embeddings are little-endian float32 arrays, base64 encoded, so a 1536-dim
+vector takes 8 KB instead of ~30 KB of JSON floats. Run from the command line:
+
+    python -m app.graph.graph_io export alice > alice.ndjson
+    python -m app.graph.graph_io import bob < alice.ndjson
+"""
+import argparse
+import asyncio
+import base64
+import codecs
+import json
+import logging
+import sys
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Union
+
+import numpy as np
+
+from app.config import config
+from app.graph.backend import GraphBackend, close_graph_backend, get_graph_backend
+from app.graph.centrality import CentralityJob
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = "persona-graph"
+FORMAT_VERSION = 1
+EMBEDDING_DTYPE = "<f4"
+
+
+class GraphImportError(ValueError):
+    """The import stream is not a graph export this version can read."""
+
+
+def encode_embedding(embedding: Optional[List[float]]) -> Optional[str]:
+    if embedding is None:
+        return None
+    return base64.b64encode(np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()).decode("ascii")
+
+
+def decode_embedding(encoded: Optional[str]) -> Optional[List[float]]:
+    if encoded is None:
+        return None
+    return np.frombuffer(base64.b64decode(encoded), dtype=EMBEDDING_DTYPE).tolist()
+
+
+def _line(record: Dict[str, Any]) -> str:
+    return json.dumps(record, separators=(",", ":"), default=str) + "\n"
+
+
+async def export_graph(backend: GraphBackend, user_id: str) -> AsyncIterator[str]:
+    """Yield the user's graph as NDJSON lines, streaming nodes and then relationships from the backend."""
+    yield _line({"type": "header", "format": FORMAT_NAME, "version": FORMAT_VERSION,
+                 "user_id": user_id, "embedding_dtype": EMBEDDING_DTYPE})
+    async for node in backend.iter_nodes(user_id):
+        yield _line({
+            "type": "node",
+            "name": node["name"],
+            "perspective": node.get("perspective") or "",
+            "properties": node.get("properties") or {},
+            "aliases": node.get("aliases") or [],
+            "embedding": encode_embedding(node.get("embedding")),
+        })
+    async for relationship in backend.iter_relationships(user_id):
+        yield _line({"type": "relationship", **relationship})
+
+
+async def iter_lines(chunks: AsyncIterable[Union[bytes, str]]) -> AsyncIterator[str]:
+    """
+    Split a stream of byte or text chunks, e.g. a request body, into lines.
+    Bytes are decoded incrementally, so a character split across chunks is
+    kept whole.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    try:
+        async for chunk in chunks:
+            buffer += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise GraphImportError(f"The export is not valid UTF-8 ({e})") from e
+    if buffer:
+        yield buffer
+
+
+async def import_graph(backend: GraphBackend, user_id: str, lines: AsyncIterable[str],
+                       batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Load an export into `user_id`'s graph, creating the user if needed.
+
+    Nodes, embeddings and relationships are written in batches of
+    `batch_size` with the backend's UNWIND writes, merging into any existing
+    graph. Relationships are only written once every node before them has
+    been flushed, so their endpoints exist.
+
+    Returns:
+    - Dict[str, int]: How many nodes, embeddings and relationships were imported.
+    """
+    batch_size = batch_size or config.GRAPH.IMPORT_BATCH_SIZE
+    counts = {"nodes": 0, "embeddings": 0, "relationships": 0}
+    nodes: List[Dict[str, Any]] = []
+    embeddings: Dict[str, List[float]] = {}
+    relationships: List[Dict[str, Any]] = []
+
+    async def flush_nodes():
+        if nodes:
+            await backend.create_nodes(nodes, user_id)
+            counts["nodes"] += len(nodes)
+            nodes.clear()
+        if embeddings:
+            await backend.add_embeddings_to_vector_index(embeddings, user_id)
+            counts["embeddings"] += len(embeddings)
+            embeddings.clear()
+
+    async def flush_relationships():
+        await flush_nodes()
+        if relationships:
+            await backend.create_relationships(relationships, user_id)
+            counts["relationships"] += len(relationships)
+            relationships.clear()
+
+    if not await backend.user_exists(user_id):
+        await backend.create_user(user_id)
+
+    header_seen = False
+    async for number, line in _numbered(lines):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            kind = record["type"]
+            if kind == "header":
+                if record.get("format") != FORMAT_NAME or record.get("version") != FORMAT_VERSION:
+                    raise GraphImportError(f"Unsupported export format {record.get('format')} v{record.get('version')}")
+                header_seen = True
+            elif not header_seen:
+                raise GraphImportError("The export must start with a header line")
+            elif kind == "node":
+                nodes.append({"name": record["name"], "perspective": record.get("perspective", ""),
+                              "properties": record.get("properties") or {}, "aliases": record.get("aliases") or []})
+                if record.get("embedding"):
+                    embeddings[record["name"]] = decode_embedding(record["embedding"])
+                if len(nodes) >= batch_size:
+                    await flush_nodes()
+            elif kind == "relationship":
+                relationships.append({"source": record["source"], "target": record["target"],
+                                      "relation": record["relation"], "value": record.get("value")})
+                if len(relationships) >= batch_size:
+                    await flush_relationships()
+            else:
+                raise GraphImportError(f"Unknown record type {kind!r}")
+        except (KeyError, TypeError, ValueError) as e:
+            if isinstance(e, GraphImportError):
+                raise GraphImportError(f"Line {number}: {e}") from e
+            raise GraphImportError(f"Line {number}: malformed record ({e})") from e
+    await flush_relationships()
+
+    await backend.bump_graph_version(user_id)
+    CentralityJob.schedule(user_id, backend)
+    logger.info("Imported %d nodes, %d embeddings and %d relationships for user %s",
+                counts["nodes"], counts["embeddings"], counts["relationships"], user_id)
+    return counts
+
+
+async def _numbered(lines: AsyncIterable[str]) -> AsyncIterator[tuple]:
+    number = 0
+    async for line in lines:
+        number += 1
+        yield number, line
+
+
+async def main(command: str, user_id: str) -> None:
+    backend = get_graph_backend()
+    await backend.wait_until_ready()
+    try:
+        if command == "export":
+            async for line in export_graph(backend, user_id):
+                sys.stdout.write(line)
+        else:
+            async def stdin_lines():
+                for line in sys.stdin:
+                    yield line.rstrip("\n")
+
+            counts = await import_graph(backend, user_id, stdin_lines())
+            logger.info("Import finished: %s", counts)
+    finally:
+        await backend.close()
+        await close_graph_backend()
+
+
+if __name__ == "__main__":
+    from app.utils.log_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Export or import a user's graph as NDJSON on stdout/stdin")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("user_id")
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(main(args.command, args.user_id))
@@ -1,82 +1,156 @@
-from app.graph.neo4j_database import Neo4jConnectionManager
+from app.graph.backend import GraphBackend, ProgressCallback, get_graph_backend
 from app.openai.embeddings import generate_embeddings
+from app.graph.centrality import CentralityJob
+from app.graph.entity_resolution import EntityResolver
+from app.graph.records import DigestRecord, EdgeRecord, NodeRecord
+from app.utils.cache import Cache
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.config import config
 from app.utils.models import NodeModel, RelationshipModel, GraphUpdateModel, NodesAndRelationshipsResponse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 import asyncio
+import hashlib
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Answers keyed by user, graph version, mode and normalized query; see `RAGInterface`.
+rag_answer_cache = Cache("rag_answer", config.CACHE.RAG_MAX_ENTRIES, config.CACHE.RAG_TTL_SECONDS)
+# Query embeddings keyed by a hash of the query; they don't depend on the user.
+query_embedding_cache = Cache("query_embedding", config.CACHE.EMBEDDING_MAX_ENTRIES, config.CACHE.EMBEDDING_TTL_SECONDS)
+# Users known to exist; `GraphOps.create_user` and `delete_user` keep it current.
+user_exists_cache = Cache("user_exists", config.CACHE.USER_MAX_ENTRIES, config.CACHE.USER_TTL_SECONDS)
+
+
+def rag_cache_prefix(user_id: str) -> str:
+    """The start of every `rag_answer_cache` key of the user."""
+    return f"{user_id}\x1f"
+
 
 class GraphOps:
-    def __init__(self):
-        self.neo4j_manager = Neo4jConnectionManager()
-        self.ensure_index_task = asyncio.create_task(self.neo4j_manager.ensure_vector_index())
+    def __init__(self, backend: Optional[GraphBackend] = None):
+        self.backend = backend or get_graph_backend()
 
     async def __aenter__(self):
-        await self.ensure_index_task
+        # A no-op once the schema has been checked in this process.
+        await self.backend.ensure_vector_index()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
     async def clean_graph(self):
-        # Clean the graph
-        async with self.neo4j_manager.driver.session() as session:
-            await session.run("MATCH (n) DETACH DELETE n")
-        print("Graph cleaned.")
-
-        # Clean the vector index if it exists
-        await self.neo4j_manager.drop_vector_index("embeddings_index")
+        # Clean the graph and drop the vector index if it exists
+        await self.backend.clean_graph()
+        logger.info("Graph cleaned.")
 
     async def add_nodes(self, nodes: List[NodeModel], user_id: str):
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot add nodes.")
+            logger.warning("User %s does not exist. Cannot add nodes.", user_id)
             return
 
-        node_dicts = [
+        # Names don't change, so only nodes without an embedding need one
+        missing = await self.backend.nodes_missing_embeddings([node.name for node in nodes], user_id)
+        await self.backend.create_nodes(self._node_dicts(nodes), user_id)
+
+        # Generate embeddings for all new nodes in one call and store them in one write
+        await self.add_node_embeddings(missing, user_id)
+
+    @staticmethod
+    def _node_dicts(nodes: List[NodeModel]) -> List[Dict[str, Any]]:
+        return [
             {
                 "name": node.name,
                 "perspective": node.perspective or "",
-                "properties": node.properties.dict() if node.properties else {}
+                "properties": dict(node.properties) if node.properties else {}
             }
             for node in nodes
         ]
-        await self.neo4j_manager.create_nodes(node_dicts, user_id)
-        
-        # Generate and add embeddings for new nodes
-        for node in nodes:
-            await self.add_node_embedding(node.name, user_id)
+
+    async def add_node_embeddings(self, node_names: List[str], user_id: str):
+        generated = await self._generate_node_embeddings(node_names)
+        if generated:
+            await self.backend.add_embeddings_to_vector_index(generated, user_id)
+
+    async def _generate_node_embeddings(self, node_names: List[str]) -> Dict[str, List[float]]:
+        names = list(dict.fromkeys(node_names))
+        if not names:
+            return {}
+        logger.debug("Generating embeddings for %d nodes", len(names))
+        embeddings = await generate_embeddings(names)
+        generated = {name: embedding for name, embedding in zip(names, embeddings) if embedding}
+        if len(generated) < len(names):
+            logger.warning("Failed to generate embeddings for %d nodes", len(names) - len(generated))
+        return generated
+
+    async def apply_graph_update(self, graph_update: GraphUpdateModel, user_id: str) -> Dict[str, int]:
+        """
+        Apply structured upserts and deletes directly, without the LLM pipeline.
+
+        Embeddings are generated only for upserted nodes that have none yet and
+        weren't given one in the update, then every change is written in one
+        transaction.
+
+        Returns:
+        - Dict[str, int]: How many nodes and relationships were upserted or deleted and how many embeddings were generated.
+        """
+        nodes = list({node.name: node for node in graph_update.nodes}.values())
+        provided = {node.name: node.embedding for node in nodes if node.embedding}
+        deleted = set(graph_update.delete_nodes)
+        missing = await self.backend.nodes_missing_embeddings([node.name for node in nodes], user_id)
+        # Re-created nodes lose their old embedding along with the deleted node
+        missing = set(missing) | {node.name for node in nodes if node.name in deleted}
+        generated = await self._generate_node_embeddings([name for name in missing if name not in provided])
+
+        await self.backend.apply_graph_delta({
+            "delete_relationships": [rel.model_dump() for rel in graph_update.delete_relationships],
+            "delete_nodes": list(deleted),
+            "nodes": self._node_dicts(nodes),
+            "embeddings": {**provided, **generated},
+            "relationships": [rel.model_dump() for rel in graph_update.relationships],
+        }, user_id)
+        CentralityJob.schedule(user_id, self.backend)
+        return {
+            "nodes_upserted": len(nodes),
+            "relationships_upserted": len(graph_update.relationships),
+            "nodes_deleted": len(deleted),
+            "relationships_deleted": len(graph_update.delete_relationships),
+            "embeddings_generated": len(generated),
+        }
 
     async def add_node_embedding(self, node_name: str, user_id: str):
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot add node with embedding.")
+            logger.warning("User %s does not exist. Cannot add node with embedding.", user_id)
             return
 
-        print(f"Generating embedding for node: {node_name}")
-        embeddings = generate_embeddings([node_name])
+        logger.debug("Generating embedding for node: %s", node_name)
+        embeddings = await generate_embeddings([node_name])
         if not embeddings[0]:
-            print(f"Failed to generate embeddings for node: {node_name}")
+            logger.warning("Failed to generate embeddings for node: %s", node_name)
             return
 
-        await self.neo4j_manager.add_embedding_to_vector_index(node_name, embeddings[0], user_id)
-        print(f"Added embedding for node: {node_name}")
+        await self.backend.add_embedding_to_vector_index(node_name, embeddings[0], user_id)
+        logger.debug("Added embedding for node: %s", node_name)
 
     async def add_relationships(self, relationships: List[RelationshipModel], user_id: str):
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot add relationships.")
+            logger.warning("User %s does not exist. Cannot add relationships.", user_id)
             return
 
-        print(f"Adding relationships to the graph for user ID: {user_id}")
+        logger.debug("Adding relationships to the graph for user ID: %s", user_id)
         relationship_dicts = [rel.dict() for rel in relationships]
-        await self.neo4j_manager.create_relationships(relationship_dicts, user_id)
+        await self.backend.create_relationships(relationship_dicts, user_id)
 
     async def add_node_with_embedding(self, node_name: str, user_id: str):
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot add node with embedding.")
+            logger.warning("User %s does not exist. Cannot add node with embedding.", user_id)
             return
 
-        print(f"Generating embedding for node: {node_name}")
-        embeddings = generate_embeddings([node_name])
+        logger.debug("Generating embedding for node: %s", node_name)
+        embeddings = await generate_embeddings([node_name])
         if not embeddings[0]:
-            print("Failed to generate embeddings.")
+            logger.warning("Failed to generate embeddings.")
             return
 
         node = NodeModel(
@@ -85,43 +159,75 @@ class GraphOps:
             embedding=embeddings[0]
         )
         await self.add_nodes([node], user_id)
-        await self.neo4j_manager.add_embedding_to_vector_index(node_name, embeddings[0], user_id)
+        await self.backend.add_embedding_to_vector_index(node_name, embeddings[0], user_id)
 
-    async def get_node_data(self, node_name: str, user_id: str) -> NodeModel:
+    async def get_node_data(self, node_name: str, user_id: str) -> Optional[NodeRecord]:
+        """The node as a `NodeRecord`, or None if the user or node doesn't exist."""
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot get node data.")
-            return NodeModel(name=node_name, perspective="", properties={})
-
-        node_data = await self.neo4j_manager.get_node_data(node_name, user_id)
-        if node_data:
-            return NodeModel(
-                name=node_data["name"],
-                perspective=node_data["perspective"],
-                properties=node_data["properties"]
-            )
-        return NodeModel(name=node_name, perspective="", properties={})
-
-    async def get_node_relationships(self, node_name: str, user_id: str) -> List[RelationshipModel]:
+            logger.warning("User %s does not exist. Cannot get node data.", user_id)
+            return None
+
+        node_data = await self.backend.get_node_data(node_name, user_id)
+        return NodeRecord.from_row(node_data) if node_data else None
+
+    async def get_node_relationships(self, node_name: str, user_id: str, limit: Optional[int] = None,
+                                     relation_types: Optional[List[str]] = None) -> List[EdgeRecord]:
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot get node relationships.")
+            logger.warning("User %s does not exist. Cannot get node relationships.", user_id)
             return []
 
-        relationships = await self.neo4j_manager.get_node_relationships(node_name, user_id)
-        return [RelationshipModel(source=rel["source"], target=rel["target"], relation=rel["relation"]) 
-                for rel in relationships]
-
-    async def perform_similarity_search(self, query: str, user_id: str, limit: int = 5, index_name: str = "embeddings_index") -> Dict[str, Any]:
+        relationships = await self.backend.get_node_relationships(node_name, user_id, limit=limit,
+                                                                  relation_types=relation_types)
+        return [EdgeRecord.from_row(rel) for rel in relationships]
+
+    # The batched reads skip the user check: an unknown user simply has no nodes.
+    async def get_nodes_data(self, node_names: List[str], user_id: str) -> Dict[str, NodeRecord]:
+        """Records of the given nodes that exist, keyed by name, from one read."""
+        if not node_names:
+            return {}
+        return {name: NodeRecord.from_row(row) for name, row in (await self.backend.get_nodes_data(node_names, user_id)).items()}
+
+    async def get_node_digests(self, node_names: List[str], user_id: str) -> Dict[str, DigestRecord]:
+        """The given nodes that exist with their neighbourhood digests, keyed by name, from one read."""
+        if not node_names:
+            return {}
+        return {name: DigestRecord.from_row(row) for name, row in (await self.backend.get_node_digests(node_names, user_id)).items()}
+
+    async def get_nodes_relationships(self, node_names: List[str], user_id: str, limit: Optional[int] = None,
+                                      relation_types: Optional[List[str]] = None) -> Dict[str, List[EdgeRecord]]:
+        """Relationships of each of the given nodes, keyed by name, from one read; see `get_node_relationships`."""
+        if not node_names:
+            return {}
+        relationships = await self.backend.get_nodes_relationships(node_names, user_id, limit=limit,
+                                                                   relation_types=relation_types)
+        return {name: [EdgeRecord.from_row(rel) for rel in rels] for name, rels in relationships.items()}
+
+    @staticmethod
+    async def embed_queries(queries: List[str]) -> List[Optional[List[float]]]:
+        """Embeddings of the queries, from the cache where possible and otherwise from one embeddings call."""
+        keys = [hashlib.sha256(query.encode()).hexdigest() for query in queries]
+        embeddings = await query_embedding_cache.get_many(list(dict.fromkeys(keys)))
+        missing = {key: query for key, query in zip(keys, queries) if key not in embeddings}
+        if missing:
+            for key, embedding in zip(missing, await generate_embeddings(list(missing.values()))):
+                if embedding:
+                    embeddings[key] = embedding
+                    await query_embedding_cache.set(key, embedding)
+        return [embeddings.get(key) for key in keys]
+
+    async def perform_similarity_search(self, query: str, user_id: str, limit: int = 5, index_name: str = "embeddings_index",
+                                        property_filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot perform similarity search.")
+            logger.warning("User %s does not exist. Cannot perform similarity search.", user_id)
             return {"query": query, "results": []}
 
-        print(f"Generating embedding for query: '{query}' for user ID: '{user_id}'")
-        query_embeddings = generate_embeddings([query])
+        logger.debug("Generating embedding for query: '%s' for user ID: '%s'", query, user_id)
+        query_embeddings = await self.embed_queries([query])
         if not query_embeddings[0]:
             return {"query": query, "results": []}
 
-        print(f"Performing similarity search for the query: '{query}' for user ID: '{user_id}'")
-        results = await self.neo4j_manager.query_text_similarity(query_embeddings[0], user_id)
+        logger.debug("Performing similarity search for the query: '%s' for user ID: '%s'", query, user_id)
+        results = await self.backend.query_text_similarity(query_embeddings[0], user_id, property_filters=property_filters)
 
         return {
             "query": query,
@@ -134,44 +240,142 @@ class GraphOps:
             ]
         }
 
+    async def perform_similarity_searches(self, queries: List[str], user_id: str, limit: int = 5,
+                                          index_name: str = "embeddings_index",
+                                          property_filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        `perform_similarity_search` for several queries, with one embeddings
+        call and one vector search round trip for all of them.
+
+        Returns:
+        - List[Dict[str, Any]]: A `{"query", "results"}` dict per query, in input order.
+        """
+        searches = [{"query": query, "results": []} for query in queries]
+        if not queries or not await self.user_exists(user_id):
+            return searches
+
+        query_embeddings = await self.embed_queries(queries)
+        embedded = [i for i, embedding in enumerate(query_embeddings) if embedding]
+        if not embedded:
+            return searches
+        results = await self.backend.query_text_similarity_many([query_embeddings[i] for i in embedded], user_id,
+                                                                index_name=index_name, property_filters=property_filters)
+        for i, matches in zip(embedded, results):
+            searches[i]["results"] = [
+                {"nodeId": match["nodeId"], "nodeName": match["nodeName"], "score": match["score"]} for match in matches
+            ]
+        return searches
+
     async def update_graph(self, graph_update: NodesAndRelationshipsResponse, user_id: str):
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot update graph.")
+            logger.warning("User %s does not exist. Cannot update graph.", user_id)
             return
 
-        print(f"Updating graph with new nodes and relationships for user ID: {user_id}")
-        if graph_update.nodes:
-            await self.add_nodes(graph_update.nodes, user_id)
-        if graph_update.relationships:
-            await self.add_relationships(graph_update.relationships, user_id)
+        logger.info("Updating graph with new nodes and relationships for user ID: %s", user_id)
         if not graph_update.nodes and not graph_update.relationships:
-            print("No nodes or relationships to update.")
+            logger.info("No nodes or relationships to update.")
+            return
+        if config.GRAPH.ENTITY_RESOLUTION:
+            await self._write_resolved(graph_update, user_id)
+        else:
+            if graph_update.nodes:
+                await self.add_nodes(graph_update.nodes, user_id)
+            if graph_update.relationships:
+                await self.add_relationships(graph_update.relationships, user_id)
+        await self.backend.bump_graph_version(user_id)
+        CentralityJob.schedule(user_id, self.backend)
+
+    async def _write_resolved(self, graph_update: NodesAndRelationshipsResponse, user_id: str) -> None:
+        """Write an update after folding its nodes into the user's existing entities; see `EntityResolver`."""
+        relationships = [rel.model_dump() for rel in graph_update.relationships]
+        resolver = EntityResolver(self.backend, self._generate_node_embeddings)
+        resolution = await resolver.resolve(
+            self._node_dicts(graph_update.nodes), user_id,
+            references=[name for rel in relationships for name in (rel["source"], rel["target"])],
+        )
+        if resolution.nodes:
+            await self.backend.create_nodes(resolution.nodes, user_id)
+        if resolution.embeddings:
+            await self.backend.add_embeddings_to_vector_index(resolution.embeddings, user_id)
+        relationships = resolution.relationships(relationships)
+        if relationships:
+            await self.backend.create_relationships(relationships, user_id)
 
     async def close(self):
-        print("Closing Neo4j connection...")
-        await self.neo4j_manager.close()
+        logger.debug("Closing graph backend...")
+        await self.backend.close()
 
-    async def get_all_nodes(self, user_id: str) -> List[NodeModel]:
+    async def get_all_nodes(self, user_id: str) -> List[NodeRecord]:
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot get all nodes.")
+            logger.warning("User %s does not exist. Cannot get all nodes.", user_id)
             return []
 
-        nodes = await self.neo4j_manager.get_all_nodes(user_id)
-        return [NodeModel(name=node['name'], perspective=node['perspective']) for node in nodes]
+        nodes = await self.backend.get_all_nodes(user_id)
+        return [NodeRecord(node['name'], node['perspective'] or "", {}) for node in nodes]
 
-    async def get_all_relationships(self, user_id: str) -> List[RelationshipModel]:
+    async def get_all_relationships(self, user_id: str) -> List[EdgeRecord]:
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot get all relationships.")
+            logger.warning("User %s does not exist. Cannot get all relationships.", user_id)
             return []
 
-        relationships = await self.neo4j_manager.get_all_relationships(user_id)
-        return [RelationshipModel(source=rel['source'], target=rel['target'], relation=rel['relation']) for rel in relationships]
+        relationships = await self.backend.get_all_relationships(user_id)
+        return [EdgeRecord(rel['source'], rel['target'], rel['relation']) for rel in relationships]
+
+    async def get_nodes_page(self, user_id: str, cursor: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        One page of the user's nodes, ordered by name, as plain dicts.
+
+        Args:
+        - user_id (str): The user whose nodes to list.
+        - cursor (str): `next_cursor` from the previous page, or None for the first page.
+        - limit (int): Page size.
+
+        Returns:
+        - Dict[str, Any]: `items` and `next_cursor`, which is None on the last page.
+        """
+        after = decode_cursor(cursor, 1)
+        nodes = await self.backend.get_nodes_page(user_id, after[0] if after else None, limit)
+        next_cursor = encode_cursor([nodes[-1]["name"]]) if len(nodes) == limit else None
+        return {"items": nodes, "next_cursor": next_cursor}
+
+    async def get_relationships_page(self, user_id: str, cursor: Optional[str] = None, limit: int = 100,
+                                     relation_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        One page of the user's relationships, ordered by (source, target, relation),
+        optionally only of the given relation types; see `get_nodes_page`.
+        """
+        after = decode_cursor(cursor, 3)
+        relationships = await self.backend.get_relationships_page(user_id, after, limit, relation_types)
+        last = relationships[-1] if len(relationships) == limit else None
+        next_cursor = encode_cursor([last["source"], last["target"], last["relation"]]) if last else None
+        return {"items": relationships, "next_cursor": next_cursor}
+
+    async def stream_nodes(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the user's nodes as they arrive from the backend, without embeddings."""
+        async for node in self.backend.iter_nodes(user_id):
+            yield {"name": node["name"], "perspective": node["perspective"], "properties": node["properties"]}
+
+    def stream_relationships(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        return self.backend.iter_relationships(user_id)
 
     async def create_user(self, user_id: str) -> None:
-        await self.neo4j_manager.create_user(user_id)
+        await self.backend.create_user(user_id)
+        await user_exists_cache.set(user_id, True)
+
+    async def delete_user(self, user_id: str, progress: Optional[ProgressCallback] = None) -> None:
+        await self.backend.bump_graph_version(user_id)
+        await self.backend.delete_user(user_id, progress=progress)
+        await user_exists_cache.delete(user_id)
+        await rag_answer_cache.invalidate_prefix(rag_cache_prefix(user_id))
 
-    async def delete_user(self, user_id: str) -> None:
-        await self.neo4j_manager.delete_user(user_id)
+    async def get_graph_version(self, user_id: str) -> Optional[int]:
+        return await self.backend.get_graph_version(user_id)
 
     async def user_exists(self, user_id: str) -> bool:
-        return await self.neo4j_manager.user_exists(user_id)
\ No newline at end of file
+        # Only hits are cached, so a user created by another worker is seen at once
+        if await user_exists_cache.get(user_id):
+            return True
+        exists = await self.backend.user_exists(user_id)
+        if exists:
+            await user_exists_cache.set(user_id, True)
+        return exists
\ No newline at end of file
@@ -0,0 +1,490 @@
+import bisect
+import itertools
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import config
+from app.graph.backend import ProgressCallback, flatten_properties
+from app.graph.entity_resolution import name_keys
+from app.graph.relations import canonical_relation, canonical_relations
+from app.utils.metrics import instrumented
+
+logger = logging.getLogger(__name__)
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class _UserGraph:
+    """One user's nodes, adjacency and embedding matrix."""
+
+    def __init__(self):
+        # Starts from the clock so a re-created user never repeats an old version.
+        self.version = _now_ms()
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        # name -> {(relation type, other_name): value}
+        self.outgoing: Dict[str, Dict[Tuple[str, str], str]] = {}
+        self.incoming: Dict[str, Dict[Tuple[str, str], str]] = {}
+        self.embeddings: Dict[str, np.ndarray] = {}
+        # normalized name or alias -> node name
+        self.name_keys: Dict[str, str] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_names: List[str] = []
+
+    def matrix(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        """Row-normalized embedding matrix, rebuilt lazily after embedding writes."""
+        if self._matrix is None and self.embeddings:
+            self._matrix_names = list(self.embeddings)
+            matrix = np.stack([self.embeddings[name] for name in self._matrix_names])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._matrix = matrix / norms
+        return self._matrix_names, self._matrix
+
+    def invalidate_matrix(self) -> None:
+        self._matrix = None
+
+
+class InMemoryGraphBackend:
+    """
+    A dict-backed implementation of `GraphBackend`.
+
+    It follows the Neo4j query semantics: nodes merge on (user, name),
+    relationships merge on (source, relation, target), and similarity scores
+    use the same normalized cosine as a Neo4j cosine vector index, (1 + cos) / 2.
+    Data lives for the lifetime of the process.
+    """
+
+    def __init__(self, top_k: int = 5):
+        self.top_k = top_k
+        self.users: Dict[str, _UserGraph] = {}
+        self._node_ids = itertools.count()
+
+    async def wait_until_ready(self, timeout: int = 60) -> None:
+        return None
+
+    async def close(self) -> None:
+        # Shared by every GraphOps in the process, so closing one must not drop the data.
+        return None
+
+    async def ensure_vector_index(self, force: bool = False) -> None:
+        return None
+
+    @instrumented("memory")
+    async def clean_graph(self, batch_size: Optional[int] = None) -> None:
+        self.users.clear()
+
+    @instrumented("memory")
+    async def create_nodes(self, nodes: List[Dict[str, Any]], user_id: str) -> None:
+        graph = self.users.get(user_id)
+        if graph is None:
+            logger.warning("User %s does not exist. Cannot create nodes.", user_id)
+            return
+        self._create_nodes(graph, nodes)
+        self._refresh_digests(graph, self._digest_scope(graph, nodes=[node["name"] for node in nodes]))
+
+    def _create_nodes(self, graph: _UserGraph, nodes: List[Dict[str, Any]]) -> None:
+        for node in nodes:
+            existing = graph.nodes.get(node["name"])
+            if existing is None:
+                existing = graph.nodes[node["name"]] = {"id": next(self._node_ids), "name": node["name"], "properties": {}, "aliases": []}
+            existing["perspective"] = node.get("perspective", "")
+            existing["properties"].update(flatten_properties(node.get("properties")))
+            existing["aliases"].extend(alias for alias in node.get("aliases", []) if alias not in existing["aliases"])
+            existing["last_touched"] = _now_ms()
+            existing.setdefault("access_count", 0)
+            for key in name_keys(node["name"], existing["aliases"]):
+                graph.name_keys.setdefault(key, node["name"])
+
+    @instrumented("memory")
+    async def find_nodes_by_keys(self, keys: List[str], user_id: str) -> Dict[str, str]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return {}
+        return {key: graph.name_keys[key] for key in keys if key in graph.name_keys}
+
+    @instrumented("memory")
+    async def create_relationships(self, relationships: List[Dict[str, Any]], user_id: str) -> None:
+        graph = self.users.get(user_id)
+        if graph is None:
+            logger.warning("User %s does not exist. Cannot create relationships.", user_id)
+            return
+        self._create_relationships(graph, relationships)
+        self._refresh_digests(graph, self._digest_scope(graph, endpoints=relationships))
+
+    @staticmethod
+    def _create_relationships(graph: _UserGraph, relationships: List[Dict[str, Any]]) -> None:
+        for relationship in relationships:
+            source, target = relationship["source"], relationship["target"]
+            if source not in graph.nodes or target not in graph.nodes:
+                continue
+            relation = canonical_relation(relationship["relation"])
+            value = relationship.get("value") or relationship["relation"]
+            graph.outgoing.setdefault(source, {})[(relation, target)] = value
+            graph.incoming.setdefault(target, {})[(relation, source)] = value
+
+    async def add_embedding_to_vector_index(self, node_name: str, embedding: List[float], user_id: str) -> None:
+        await self.add_embeddings_to_vector_index({node_name: embedding}, user_id)
+
+    @instrumented("memory")
+    async def add_embeddings_to_vector_index(self, embeddings: Dict[str, List[float]], user_id: str) -> None:
+        graph = self.users.get(user_id)
+        if graph is None:
+            logger.warning("User %s does not exist. Cannot add embeddings.", user_id)
+            return
+        self._add_embeddings(graph, embeddings)
+
+    @staticmethod
+    def _add_embeddings(graph: _UserGraph, embeddings: Dict[str, List[float]]) -> None:
+        for node_name, embedding in embeddings.items():
+            if node_name in graph.nodes:
+                graph.embeddings[node_name] = np.asarray(embedding, dtype=np.float32)
+        if embeddings:
+            graph.invalidate_matrix()
+
+    @instrumented("memory")
+    async def nodes_missing_embeddings(self, node_names: List[str], user_id: str) -> List[str]:
+        graph = self.users.get(user_id)
+        return [name for name in node_names if graph is None or name not in graph.embeddings]
+
+    @instrumented("memory")
+    async def apply_graph_delta(self, delta: Dict[str, Any], user_id: str) -> None:
+        if user_id not in self.users:
+            logger.warning("User %s does not exist. Cannot apply graph update.", user_id)
+            return
+        # No awaits below, so nothing else sees the graph half-updated
+        graph = self.users[user_id]
+        stale = self._digest_scope(graph, delta.get("delete_nodes", []), delta.get("delete_relationships", []))
+        for rel in delta.get("delete_relationships", []):
+            relation = canonical_relation(rel["relation"])
+            outgoing = graph.outgoing.get(rel["source"], {})
+            if rel.get("value") is not None and outgoing.get((relation, rel["target"])) != rel["value"]:
+                continue
+            outgoing.pop((relation, rel["target"]), None)
+            graph.incoming.get(rel["target"], {}).pop((relation, rel["source"]), None)
+        for name in delta.get("delete_nodes", []):
+            self._delete_node(graph, name)
+        self._create_nodes(graph, delta.get("nodes", []))
+        self._add_embeddings(graph, delta.get("embeddings", {}))
+        self._create_relationships(graph, delta.get("relationships", []))
+        stale |= self._digest_scope(graph, [node["name"] for node in delta.get("nodes", [])], delta.get("relationships", []))
+        self._refresh_digests(graph, stale)
+        graph.version += 1
+
+    @staticmethod
+    def _digest_scope(graph: _UserGraph, nodes: Iterable[str] = (), endpoints: Iterable[Dict[str, Any]] = ()) -> Set[str]:
+        """Nodes whose digest a write changes: `nodes` and their neighbours, and relationship endpoints."""
+        if not config.GRAPH.NEIGHBORHOOD_DIGESTS:
+            return set()
+        nodes, endpoints = list(nodes), list(endpoints)
+        scope = set(nodes) | {rel["source"] for rel in endpoints} | {rel["target"] for rel in endpoints}
+        for name in nodes:
+            scope.update(target for _, target in graph.outgoing.get(name, {}))
+            scope.update(source for _, source in graph.incoming.get(name, {}))
+        return scope
+
+    @staticmethod
+    def _refresh_digests(graph: _UserGraph, names: Set[str]) -> None:
+        """Rebuild the digests of `names`, with the same order and caps as the Neo4j backend."""
+        for name in names:
+            node = graph.nodes.get(name)
+            if node is None:
+                continue
+            entries = [(target, relation, value, True) for (relation, target), value in graph.outgoing.get(name, {}).items()]
+            entries += [(source, relation, value, False) for (relation, source), value in graph.incoming.get(name, {}).items()]
+            entries = [(graph.nodes[other], relation, value, outgoing) for other, relation, value, outgoing in entries
+                       if other in graph.nodes]
+            entries.sort(key=lambda entry: (-(entry[0].get("pagerank") or 0.0), -(entry[0].get("degree") or 0), entry[0]["name"]))
+            node["digest"] = [
+                {"name": other["name"], "relation": relation, "value": value, "outgoing": outgoing,
+                 "perspective": (other.get("perspective") or "")[:config.GRAPH.DIGEST_PERSPECTIVE_CHARS]}
+                for other, relation, value, outgoing in entries[:config.GRAPH.DIGEST_MAX_NEIGHBORS]
+            ]
+
+    @staticmethod
+    def _delete_node(graph: _UserGraph, name: str) -> None:
+        node = graph.nodes.pop(name, None)
+        if node is None:
+            return
+        for key in name_keys(name, node["aliases"]):
+            if graph.name_keys.get(key) == name:
+                del graph.name_keys[key]
+        for (relation, target) in graph.outgoing.pop(name, {}):
+            graph.incoming.get(target, {}).pop((relation, name), None)
+        for (relation, source) in graph.incoming.pop(name, {}):
+            graph.outgoing.get(source, {}).pop((relation, name), None)
+        if graph.embeddings.pop(name, None) is not None:
+            graph.invalidate_matrix()
+
+    @instrumented("memory")
+    async def query_text_similarity(self, keyword_embedding: List[float], user_id: str, index_name: str = "embeddings_index",
+                                    property_filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self._similarity(self.users.get(user_id), [keyword_embedding], property_filters)[0]
+
+    @instrumented("memory")
+    async def query_text_similarity_many(self, keyword_embeddings: List[List[float]], user_id: str,
+                                         index_name: str = "embeddings_index",
+                                         property_filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        return self._similarity(self.users.get(user_id), keyword_embeddings, property_filters)
+
+    def _similarity(self, graph: Optional[_UserGraph], keyword_embeddings: List[List[float]],
+                    property_filters: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Top matches for each embedding, scored against the embedding matrix in one product."""
+        empty: List[List[Dict[str, Any]]] = [[] for _ in keyword_embeddings]
+        names, matrix = graph.matrix() if graph is not None else ([], None)
+        if matrix is None or not keyword_embeddings:
+            return empty
+        queries = np.asarray(keyword_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1)
+        valid = norms > 0
+        queries[valid] /= norms[valid, None]
+        all_scores = (1.0 + queries @ matrix.T) / 2.0
+        # Matched against the stored, flattened properties, as Neo4j does
+        filters = flatten_properties(property_filters or {})
+        if filters:
+            keep = np.array([
+                all(graph.nodes[name]["properties"].get(key) == value for key, value in filters.items())
+                for name in names
+            ])
+            if not keep.any():
+                return empty
+            all_scores = np.where(keep, all_scores, -np.inf)
+
+        results = []
+        for scores, is_valid in zip(all_scores, valid):
+            k = min(self.top_k, int(np.isfinite(scores).sum())) if is_valid else 0
+            if k == 0:
+                results.append([])
+                continue
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results.append([
+                {"nodeId": graph.nodes[names[i]]["id"], "nodeName": names[i], "score": float(scores[i])}
+                for i in top
+            ])
+        return results
+
+    @instrumented("memory")
+    async def get_node_data(self, node_name: str, user_id: str) -> Optional[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        return self._node_data(graph, node_name) if graph else None
+
+    @instrumented("memory")
+    async def get_nodes_data(self, node_names: List[str], user_id: str) -> Dict[str, Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return {}
+        found = {name: self._node_data(graph, name) for name in dict.fromkeys(node_names)}
+        return {name: data for name, data in found.items() if data is not None}
+
+    @staticmethod
+    def _node_data(graph: _UserGraph, node_name: str) -> Optional[Dict[str, Any]]:
+        node = graph.nodes.get(node_name)
+        if node is None:
+            return None
+        return {"name": node["name"], "perspective": node["perspective"], "properties": dict(node["properties"])}
+
+    @instrumented("memory")
+    async def get_node_relationships(self, node_name: str, user_id: str, limit: Optional[int] = None,
+                                     relation_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return []
+        return self._node_relationships(graph, node_name, limit, set(canonical_relations(relation_types) or []))
+
+    @instrumented("memory")
+    async def get_node_digests(self, node_names: List[str], user_id: str) -> Dict[str, Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return {}
+        digests = {}
+        for name in dict.fromkeys(node_names):
+            data = self._node_data(graph, name)
+            if data is not None:
+                digest = graph.nodes[name].get("digest")
+                digests[name] = {**data, "neighbors": [dict(entry) for entry in digest] if digest is not None else None}
+        return digests
+
+    @instrumented("memory")
+    async def get_nodes_relationships(self, node_names: List[str], user_id: str, limit: Optional[int] = None,
+                                      relation_types: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return {}
+        types = set(canonical_relations(relation_types) or [])
+        return {name: self._node_relationships(graph, name, limit, types)
+                for name in dict.fromkeys(node_names) if name in graph.nodes}
+
+    @staticmethod
+    def _node_relationships(graph: _UserGraph, node_name: str, limit: Optional[int], types: set) -> List[Dict[str, Any]]:
+        outgoing = [
+            {"source": node_name, "target": target, "relation": relation, "value": value}
+            for (relation, target), value in graph.outgoing.get(node_name, {}).items()
+            if not types or relation in types
+        ]
+        incoming = [
+            {"source": source, "target": node_name, "relation": relation, "value": value}
+            for (relation, source), value in graph.incoming.get(node_name, {}).items()
+            if not types or relation in types
+        ]
+        relationships = outgoing + incoming
+        if limit is not None:
+            def centrality(rel):
+                neighbour = graph.nodes.get(rel["target"] if rel["source"] == node_name else rel["source"], {})
+                return -(neighbour.get("pagerank") or 0.0), -(neighbour.get("degree") or 0)
+            relationships = sorted(relationships, key=centrality)[:limit]
+        return relationships
+
+    @instrumented("memory")
+    async def get_node_centrality(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return {}
+        return {name: {"degree": node.get("degree"), "pagerank": node.get("pagerank")} for name, node in graph.nodes.items()}
+
+    @instrumented("memory")
+    async def set_node_centrality(self, scores: Dict[str, Dict[str, Any]], user_id: str) -> None:
+        graph = self.users.get(user_id)
+        for name, score in scores.items() if graph else []:
+            if name in graph.nodes:
+                graph.nodes[name].update(degree=score["degree"], pagerank=score["pagerank"])
+
+    @instrumented("memory")
+    async def get_all_nodes(self, user_id: str) -> List[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return []
+        return [{"name": node["name"], "perspective": node["perspective"]} for node in graph.nodes.values()]
+
+    @instrumented("memory")
+    async def count_nodes(self, user_id: str) -> int:
+        graph = self.users.get(user_id)
+        return len(graph.nodes) if graph else 0
+
+    @instrumented("memory")
+    async def record_node_access(self, counts: Dict[str, int], user_id: str) -> None:
+        graph = self.users.get(user_id)
+        for name, count in counts.items() if graph else []:
+            node = graph.nodes.get(name)
+            if node is not None:
+                node["access_count"] += count
+                node["last_touched"] = _now_ms()
+
+    @instrumented("memory")
+    async def get_compaction_candidates(self, user_id: str, touched_before: int, max_access_count: int,
+                                        limit: int) -> List[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return []
+        candidates = []
+        for name, node in graph.nodes.items():
+            if node["last_touched"] >= touched_before or node["access_count"] > max_access_count:
+                continue
+            edges = (
+                [{"source": name, "target": target, "relation": relation, "value": value}
+                 for (relation, target), value in graph.outgoing.get(name, {}).items()]
+                + [{"source": source, "target": name, "relation": relation, "value": value}
+                   for (relation, source), value in graph.incoming.get(name, {}).items()]
+            )
+            if len(edges) <= 1:
+                candidates.append({"name": name, "perspective": node["perspective"], "access_count": node["access_count"],
+                                   "last_touched": node["last_touched"], "edges": edges})
+        candidates.sort(key=lambda c: (c["access_count"], c["last_touched"], c["name"]))
+        return candidates[:limit]
+
+    @instrumented("memory")
+    async def get_all_relationships(self, user_id: str) -> List[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return []
+        return [
+            {"source": source, "relation": relation, "target": target}
+            for source, edges in graph.outgoing.items()
+            for (relation, target) in edges
+        ]
+
+    @instrumented("memory")
+    async def get_nodes_page(self, user_id: str, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return []
+        names = sorted(graph.nodes)
+        start = bisect.bisect_right(names, after) if after is not None else 0
+        return [
+            {"name": name, "perspective": graph.nodes[name]["perspective"], "properties": dict(graph.nodes[name]["properties"])}
+            for name in names[start:start + limit]
+        ]
+
+    @instrumented("memory")
+    async def get_relationships_page(self, user_id: str, after: Optional[List[str]], limit: int,
+                                     relation_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        if graph is None:
+            return []
+        types = set(canonical_relations(relation_types) or [])
+        keys = sorted(
+            (source, target, relation, value)
+            for source, edges in graph.outgoing.items()
+            for (relation, target), value in edges.items()
+            if not types or relation in types
+        )
+        start = bisect.bisect_right(keys, tuple(after) + (chr(0x10FFFF),)) if after is not None else 0
+        return [
+            {"source": source, "target": target, "relation": relation, "value": value}
+            for source, target, relation, value in keys[start:start + limit]
+        ]
+
+    async def iter_nodes(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        for node in list(graph.nodes.values()) if graph else []:
+            embedding = graph.embeddings.get(node["name"])
+            yield {
+                "name": node["name"],
+                "perspective": node["perspective"],
+                "properties": dict(node["properties"]),
+                "aliases": list(node["aliases"]),
+                "embedding": embedding.tolist() if embedding is not None else None,
+            }
+
+    async def iter_relationships(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        graph = self.users.get(user_id)
+        edges = [(source, key, value) for source, out in graph.outgoing.items() for key, value in out.items()] if graph else []
+        for source, (relation, target), value in edges:
+            yield {"source": source, "target": target, "relation": relation, "value": value}
+
+    @instrumented("memory")
+    async def create_user(self, user_id: str) -> None:
+        self.users.setdefault(user_id, _UserGraph())
+        logger.info("User %s created successfully.", user_id)
+
+    @instrumented("memory")
+    async def list_users(self) -> List[str]:
+        return sorted(self.users)
+
+    @instrumented("memory")
+    async def get_graph_version(self, user_id: str) -> Optional[int]:
+        graph = self.users.get(user_id)
+        return graph.version if graph else None
+
+    @instrumented("memory")
+    async def bump_graph_version(self, user_id: str) -> None:
+        graph = self.users.get(user_id)
+        if graph is not None:
+            graph.version += 1
+
+    @instrumented("memory")
+    async def user_exists(self, user_id: str) -> bool:
+        return user_id in self.users
+
+    @instrumented("memory")
+    async def delete_user(self, user_id: str, batch_size: Optional[int] = None,
+                          progress: Optional[ProgressCallback] = None) -> None:
+        graph = self.users.pop(user_id, None)
+        total = len(graph.nodes) if graph else 0
+        if progress:
+            progress(total, total)
+        logger.info("User %s and %d associated nodes deleted successfully.", user_id, total)
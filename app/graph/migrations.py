@@ -0,0 +1,221 @@
+"""
+One-off data migrations for existing Neo4j graphs.
+
+Run with:
+    python -m app.graph.migrations json-properties
+    python -m app.graph.migrations name-keys
+    python -m app.graph.migrations relation-types
+    python -m app.graph.migrations access-tracking
+    python -m app.graph.migrations neighborhood-digests
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+from typing import Optional
+
+from app.graph.entity_resolution import name_keys
+from app.graph.neo4j_database import Neo4jConnectionManager
+from app.graph.relations import canonical_relation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+async def migrate_json_properties(manager: Neo4jConnectionManager, batch_size: Optional[int] = None) -> int:
+    """
+    Convert nodes that still hold `properties` as a JSON string into native,
+    prefixed properties, one batch per transaction. Safe to re-run.
+
+    Returns the number of nodes migrated.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    fetch_query = """
+    MATCH (n:NodeName) WHERE n.properties IS NOT NULL
+    RETURN elementId(n) AS id, n.properties AS properties
+    LIMIT $batch_size
+    """
+    update_query = """
+    UNWIND $rows AS row
+    MATCH (n:NodeName) WHERE elementId(n) = row.id
+    SET n += row.properties
+    REMOVE n.properties
+    """
+    migrated = 0
+    while True:
+        records = await manager._read(fetch_query, batch_size=batch_size)
+        if not records:
+            break
+        rows = []
+        for record in records:
+            try:
+                properties = json.loads(record["properties"]) if isinstance(record["properties"], str) else {}
+            except json.JSONDecodeError:
+                logger.warning("Node %s has unparseable properties, dropping them", record["id"])
+                properties = {}
+            rows.append({"id": record["id"], "properties": manager._prefixed_properties(properties)})
+        await manager._write(update_query, rows=rows)
+        migrated += len(rows)
+        logger.info("Migrated properties on %d nodes", migrated)
+    return migrated
+
+
+async def migrate_name_keys(manager: Neo4jConnectionManager, batch_size: Optional[int] = None) -> int:
+    """
+    Store the normalized name keys used by entity resolution on nodes written
+    before it existed, one batch per transaction. Safe to re-run.
+
+    Returns the number of nodes migrated.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    fetch_query = """
+    MATCH (n:NodeName) WHERE n.name_keys IS NULL
+    RETURN elementId(n) AS id, n.name AS name, coalesce(n.aliases, []) AS aliases
+    LIMIT $batch_size
+    """
+    update_query = """
+    UNWIND $rows AS row
+    MATCH (n:NodeName) WHERE elementId(n) = row.id
+    SET n.name_keys = row.name_keys, n.aliases = coalesce(n.aliases, [])
+    """
+    migrated = 0
+    while True:
+        records = await manager._read(fetch_query, batch_size=batch_size)
+        if not records:
+            break
+        rows = [{"id": record["id"], "name_keys": name_keys(record["name"], record["aliases"])} for record in records]
+        await manager._write(update_query, rows=rows)
+        migrated += len(rows)
+        logger.info("Stored name keys on %d nodes", migrated)
+    return migrated
+
+
+async def migrate_relation_types(manager: Neo4jConnectionManager, batch_size: Optional[int] = None) -> int:
+    """
+    Re-create relationships stored under the literal type `{relation}` under
+    the canonical type of their `value`, one batch per transaction. Safe to re-run.
+
+    Returns the number of relationships migrated.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    fetch_query = """
+    MATCH (:NodeName)-[r:`{relation}`]->(:NodeName)
+    RETURN elementId(r) AS id, r.value AS value
+    LIMIT $batch_size
+    """
+    # Formatted with a sanitized type, like `Neo4jConnectionManager.CREATE_RELATIONSHIPS_QUERY`
+    update_query = """
+    UNWIND $ids AS id
+    MATCH (source)-[old]->(target) WHERE elementId(old) = id
+    MERGE (source)-[r:`{relation}`]->(target)
+    SET r.value = old.value
+    DELETE old
+    """
+    migrated = 0
+    while True:
+        records = await manager._read(fetch_query, batch_size=batch_size)
+        if not records:
+            break
+        rows = sorted((canonical_relation(record["value"]), record["id"]) for record in records)
+        await manager._write_all([
+            (update_query.replace("{relation}", relation), {"ids": [row[1] for row in group]})
+            for relation, group in itertools.groupby(rows, key=lambda row: row[0])
+        ])
+        migrated += len(rows)
+        logger.info("Re-typed %d relationships", migrated)
+    return migrated
+
+
+async def migrate_access_tracking(manager: Neo4jConnectionManager, batch_size: Optional[int] = None) -> int:
+    """
+    Start access tracking on nodes written before it existed, so compaction
+    treats them as touched now rather than skipping them forever. Safe to re-run.
+
+    Returns the number of nodes migrated.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    fetch_query = """
+    MATCH (n:NodeName) WHERE n.last_touched IS NULL
+    RETURN elementId(n) AS id
+    LIMIT $batch_size
+    """
+    update_query = """
+    UNWIND $ids AS id
+    MATCH (n:NodeName) WHERE elementId(n) = id
+    SET n.last_touched = timestamp(), n.access_count = coalesce(n.access_count, 0)
+    """
+    migrated = 0
+    while True:
+        records = await manager._read(fetch_query, batch_size=batch_size)
+        if not records:
+            break
+        await manager._write(update_query, ids=[record["id"] for record in records])
+        migrated += len(records)
+        logger.info("Started access tracking on %d nodes", migrated)
+    return migrated
+
+
+async def migrate_neighborhood_digests(manager: Neo4jConnectionManager, batch_size: Optional[int] = None) -> int:
+    """
+    Build the neighbourhood digests of nodes written before `GRAPH_NEIGHBORHOOD_DIGESTS`
+    was turned on, one batch per transaction. Safe to re-run.
+
+    Returns the number of nodes migrated.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    fetch_query = """
+    MATCH (n:NodeName) WHERE n.digest_names IS NULL
+    RETURN elementId(n) AS id, n.UserId AS user_id
+    ORDER BY user_id
+    LIMIT $batch_size
+    """
+    mark_query = """
+    UNWIND $ids AS id
+    MATCH (n:NodeName) WHERE elementId(n) = id
+    SET n:DigestStale
+    """
+    migrated = 0
+    while True:
+        records = await manager._read(fetch_query, batch_size=batch_size)
+        if not records:
+            break
+        for user_id, group in itertools.groupby(records, key=lambda record: record["user_id"]):
+            await manager._write_all([
+                (mark_query, {"ids": [record["id"] for record in group]}),
+                manager._refresh_digests_statement(user_id),
+            ])
+        migrated += len(records)
+        logger.info("Built neighbourhood digests of %d nodes", migrated)
+    return migrated
+
+
+MIGRATIONS = {
+    "json-properties": migrate_json_properties,
+    "name-keys": migrate_name_keys,
+    "relation-types": migrate_relation_types,
+    "access-tracking": migrate_access_tracking,
+    "neighborhood-digests": migrate_neighborhood_digests,
+}
+
+
+async def main(name: str, batch_size: Optional[int]) -> None:
+    manager = Neo4jConnectionManager()
+    try:
+        await manager.wait_for_neo4j()
+        count = await MIGRATIONS[name](manager, batch_size)
+        logger.info("Migration %s finished, %d items updated", name, count)
+    finally:
+        await manager.close()
+
+
+if __name__ == "__main__":
+    from app.utils.log_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Run a graph data migration")
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(main(args.migration, args.batch_size))
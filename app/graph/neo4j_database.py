@@ -1,166 +1,537 @@
-from typing import List, Dict, Any, Union, Tuple
-from neo4j import AsyncGraphDatabase, basic_auth
+from typing import List, Dict, Any, AsyncIterator, Iterable, Union, Tuple, Optional
+from neo4j import AsyncDriver, AsyncGraphDatabase, AsyncSession, READ_ACCESS, WRITE_ACCESS, basic_auth
+from neo4j.api import AsyncBookmarkManager
+from neo4j.exceptions import Neo4jError
 import asyncio
+import itertools
 import time
-from app.openai.embeddings import generate_embeddings
-import json
+import logging
 from app.config import config
+from app.graph.backend import ProgressCallback, flatten_properties
+from app.graph.entity_resolution import name_keys
+from app.graph.relations import canonical_relation, canonical_relations
+from app.utils.metrics import instrumented
+
+logger = logging.getLogger(__name__)
+
+# Node properties are stored as native, flattened Neo4j properties under this prefix.
+PROPERTY_PREFIX = "prop_"
+
+# One driver (and connection pool) per process, shared by every manager.
+_driver: Optional[AsyncDriver] = None
+_driver_loop: Optional[asyncio.AbstractEventLoop] = None
+# Set once the schema has been checked, so each manager doesn't repeat it.
+_schema_ready = False
+# Shared by every session in the process, so a read that follows a write (a RAG
+# query right after an ingest) waits for that write even on a cluster follower.
+_bookmark_manager: Optional[AsyncBookmarkManager] = None
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+# Drivers left behind by an earlier event loop that are still being closed
+_retiring = set()
+
+
+def _retire_driver(driver: AsyncDriver, loop: asyncio.AbstractEventLoop) -> None:
+    """Close a driver created on another event loop, so its connection pool isn't leaked."""
+    if loop.is_running():
+        # Still running in another thread; its connections have to be closed there
+        asyncio.run_coroutine_threadsafe(driver.close(), loop)
+        return
+
+    async def close() -> None:
+        try:
+            await driver.close()
+        except Exception as e:
+            # Connections of a closed loop can't be shut down cleanly; the pool is released anyway
+            logger.debug("Error closing the Neo4j driver of a previous event loop: %s", e)
+
+    task = asyncio.get_running_loop().create_task(close())
+    _retiring.add(task)
+    task.add_done_callback(_retiring.discard)
+
+
+def get_driver() -> AsyncDriver:
+    """Return the shared async driver, creating it on first use (or for a new event loop)."""
+    global _driver, _driver_loop
+    loop = _running_loop()
+    if _driver is not None and loop is not None and _driver_loop is not None and loop is not _driver_loop:
+        _retire_driver(_driver, _driver_loop)
+        _driver = None
+    if _driver is None:
+        _driver = AsyncGraphDatabase.driver(
+            config.NEO4J.URI,
+            auth=basic_auth(config.NEO4J.USER, config.NEO4J.PASSWORD)
+        )
+        _driver_loop = loop
+    return _driver
+
+
+def get_bookmark_manager() -> AsyncBookmarkManager:
+    global _bookmark_manager
+    if _bookmark_manager is None:
+        _bookmark_manager = AsyncGraphDatabase.bookmark_manager()
+    return _bookmark_manager
+
+
+def open_session(**kwargs) -> AsyncSession:
+    """A session on the configured database that shares the process-wide bookmarks."""
+    return get_driver().session(database=config.NEO4J.DATABASE, bookmark_manager=get_bookmark_manager(), **kwargs)
+
+
+async def close_driver() -> None:
+    """Close the shared driver; call once on process shutdown."""
+    global _driver, _driver_loop, _schema_ready, _bookmark_manager
+    if _driver is not None:
+        await _driver.close()
+    _driver, _driver_loop, _schema_ready, _bookmark_manager = None, None, False, None
 
 class Neo4jConnectionManager:
+    # Bulk write statements shared by the single-purpose writes and `apply_graph_delta`.
+    CREATE_NODES_QUERY = """
+    UNWIND $nodes AS node
+    MERGE (n:NodeName {name: node.name, UserId: $user_id})
+    SET n.perspective = node.perspective, n += node.properties,
+        n.aliases = coalesce(n.aliases, []) + [alias IN node.aliases WHERE NOT alias IN coalesce(n.aliases, [])],
+        n.name_keys = coalesce(n.name_keys, []) + [key IN node.name_keys WHERE NOT key IN coalesce(n.name_keys, [])],
+        n.last_touched = timestamp(), n.access_count = coalesce(n.access_count, 0)
+    """
+    # Formatted with one sanitized relationship type (see `app.graph.relations`) per statement
+    CREATE_RELATIONSHIPS_QUERY = (
+        "UNWIND $relationships AS rel "
+        "MATCH (source:NodeName {{UserId: $user_id, name: rel.source}}), "
+        "(target:NodeName {{UserId: $user_id, name: rel.target}}) "
+        "MERGE (source)-[r:`{relation}`]->(target) "
+        "SET r.value = rel.value"
+    )
+    SET_EMBEDDINGS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (n:NodeName {name: row.name, UserId: $user_id})
+    CALL db.create.setNodeVectorProperty(n, 'embedding', row.embedding)
+    """
+    DELETE_NODES_QUERY = """
+    UNWIND $names AS name
+    MATCH (n:NodeName {name: name, UserId: $user_id})
+    DETACH DELETE n
+    """
+    DELETE_RELATIONSHIPS_QUERY = """
+    UNWIND $relationships AS rel
+    MATCH (:NodeName {UserId: $user_id, name: rel.source})-[r]->(:NodeName {UserId: $user_id, name: rel.target})
+    WHERE type(r) = rel.relation AND (rel.value IS NULL OR r.value = rel.value)
+    DELETE r
+    """
+    # Neighbourhood digests (`GRAPH_NEIGHBORHOOD_DIGESTS`): writes label the nodes whose
+    # digest they change, and the last statement of the transaction rebuilds those digests.
+    MARK_DIGESTS_STALE_QUERY = """
+    UNWIND $names AS name
+    MATCH (n:NodeName {name: name, UserId: $user_id})
+    OPTIONAL MATCH (n)--(m:NodeName)
+    WHERE $with_neighbours
+    WITH n, collect(DISTINCT m) AS neighbours
+    FOREACH (x IN [n] + neighbours | SET x:DigestStale)
+    """
+    REFRESH_DIGESTS_QUERY = """
+    MATCH (n:DigestStale {UserId: $user_id})
+    REMOVE n:DigestStale
+    WITH n
+    CALL {
+        WITH n
+        MATCH (n)-[r]-(m:NodeName)
+        WITH n, r, m
+        ORDER BY coalesce(m.pagerank, 0.0) DESC, coalesce(m.degree, 0) DESC, m.name
+        LIMIT $max_neighbors
+        RETURN collect(m.name) AS names, collect(type(r)) AS relations, collect(coalesce(r.value, type(r))) AS rel_values,
+               collect(startNode(r) = n) AS outgoing, collect(left(coalesce(m.perspective, ''), $perspective_chars)) AS perspectives
+    }
+    SET n.digest_names = names, n.digest_relations = relations, n.digest_values = rel_values,
+        n.digest_outgoing = outgoing, n.digest_perspectives = perspectives
+    """
+    BUMP_GRAPH_VERSION_QUERY = """
+    MATCH (u:User {id: $user_id})
+    SET u.graph_version = coalesce(u.graph_version, 0) + 1
+    """
+
+    # Transactions committed between progress updates during batched deletes.
+    DELETE_BATCHES_PER_STEP = 10
+    # Extra vector index candidates fetched when property filters will discard some.
+    FILTERED_SEARCH_OVERSAMPLE = 10
+
     def __init__(self):
         self.uri = config.NEO4J.URI
         self.username = config.NEO4J.USER
-        self.password = config.NEO4J.PASSWORD
-        self.driver = AsyncGraphDatabase.driver(
-            self.uri,
-            auth=basic_auth(self.username, self.password)
-        )
-        self.ensure_vector_index_task = self.ensure_vector_index()
+        self.driver = get_driver()
 
     async def wait_for_neo4j(self, timeout=60):
         start_time = time.time()
         while True:
             try:
-                async with self.driver.session() as session:
-                    await session.run("RETURN 1")
-                    print("Neo4j is ready.")
-                    await self.ensure_vector_index_task
-                    return
+                await self._read("RETURN 1")
+                logger.info("Neo4j is ready.")
+                await self.ensure_vector_index()
+                return
             except Exception as e:
                 elapsed_time = time.time() - start_time
                 if elapsed_time > timeout:
-                    print(f"Failed to connect to Neo4j after {timeout} seconds.")
+                    logger.error("Failed to connect to Neo4j after %s seconds.", timeout)
                     raise e
                 await asyncio.sleep(1)
 
+    async def wait_until_ready(self, timeout=60):
+        await self.wait_for_neo4j(timeout)
+
     async def close(self):
-        await self.driver.close()
+        # The driver is shared by the whole process and closed by `close_driver` on shutdown.
+        pass
 
+    @instrumented("neo4j")
     async def check_node_exists(self, node_name: str, node_type: str, user_id: str) -> bool:
         query = """
         MATCH (n {name: $node_name, NodeType: $node_type, UserId: $user_id})
         RETURN n.name AS NodeName
         """
-        async with self.driver.session() as session:
-            result = await session.run(query, node_name=node_name, node_type=node_type, user_id=user_id)
-            return result.single() is not None
+        records = await self._read(query, node_name=node_name, node_type=node_type, user_id=user_id)
+        return bool(records)
 
-    async def clean_graph(self) -> None:
-        async with self.driver.session() as session:
-            await session.run("MATCH (n) DETACH DELETE n")
+    @instrumented("neo4j")
+    async def clean_graph(self, batch_size: Optional[int] = None) -> None:
+        await self._delete_in_batches("MATCH (n)", {}, batch_size)
         await self.drop_vector_index("embeddings_index")
 
+    async def _delete_in_batches(self, match: str, params: Dict[str, Any], batch_size: Optional[int] = None,
+                                 progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Detach-delete the nodes bound to `n` by `match`, committing every `batch_size` rows.
+
+        `CALL { ... } IN TRANSACTIONS` only runs in an auto-commit transaction, so
+        this uses `session.run` in a write-mode session rather than `execute_write`.
+        Deletion proceeds in steps of a few batches so `progress(deleted, total)`
+        can be reported between them.
+        """
+        batch_size = batch_size or config.NEO4J.DELETE_BATCH_SIZE
+        step = batch_size * self.DELETE_BATCHES_PER_STEP
+        count_query = f"{match} RETURN count(n) AS total"
+        delete_query = f"""
+        {match}
+        WITH n LIMIT $step
+        CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF $batch_size ROWS
+        RETURN count(*) AS deleted
+        """
+        deleted = 0
+        total = (await self._read(count_query, **params))[0]["total"]
+        if progress:
+            progress(deleted, total)
+        async with self._session(default_access_mode=WRITE_ACCESS) as session:
+            while True:
+                result = await session.run(delete_query, {**params, "step": step, "batch_size": batch_size})
+                record = await result.single()
+                removed = record["deleted"] if record else 0
+                if removed == 0:
+                    break
+                deleted += removed
+                if progress:
+                    progress(deleted, max(total, deleted))
+        return deleted
+
+    @instrumented("neo4j")
     async def drop_vector_index(self, index_name: str) -> None:
+        global _schema_ready
+        _schema_ready = False
         if await self.index_exists(index_name):
-            query = f"DROP INDEX `{index_name}`"
-            async with self.driver.session() as session:
-                await session.run(query)
-            print(f"Vector index '{index_name}' dropped.")
+            await self._write(f"DROP INDEX `{index_name}`")
+            logger.info("Vector index '%s' dropped.", index_name)
         else:
-            print(f"Vector index '{index_name}' does not exist. Skipping drop operation.")
+            logger.info("Vector index '%s' does not exist. Skipping drop operation.", index_name)
+
+    def _session(self, **kwargs) -> AsyncSession:
+        return open_session(**kwargs)
 
+    async def _read(self, query: str, **params) -> List[Dict[str, Any]]:
+        """
+        Run a read query in a managed read transaction and return its records.
+        In a cluster it is routed to a follower, and transient errors are retried.
+        """
+        async def work(tx):
+            result = await tx.run(query, params)
+            return await result.data()
+
+        async with self._session() as session:
+            return await session.execute_read(work)
+
+    async def _write(self, query: str, **params) -> None:
+        """
+        Run a write query in a managed transaction. The driver routes it to the
+        leader and retries it on transient errors such as deadlocks between
+        concurrent writers.
+        """
+        async def work(tx):
+            result = await tx.run(query, params)
+            await result.consume()
+
+        async with self._session() as session:
+            await session.execute_write(work)
+
+    async def _write_all(self, statements: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Run several write queries, in order, in one managed transaction."""
+        async def work(tx):
+            for query, params in statements:
+                await (await tx.run(query, params)).consume()
+
+        async with self._session() as session:
+            await session.execute_write(work)
+
+    @instrumented("neo4j")
     async def create_nodes(self, nodes: List[Dict[str, Any]], user_id: str) -> None:
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot create nodes.")
+            logger.warning("User %s does not exist. Cannot create nodes.", user_id)
             return
-        async with self.driver.session() as session:
-            for node in nodes:
-                query = (
-                    "MERGE (n:NodeName {name: $name, UserId: $user_id}) "
-                    "SET n.perspective = $perspective, n.properties = $properties"
-                )
-                properties = json.dumps(node.get("properties", {}))  # Serialize properties to JSON string
-                await session.run(query, {
+        rows = self._node_rows(nodes)
+        await self._write_all([(self.CREATE_NODES_QUERY, {"nodes": rows, "user_id": user_id})]
+                              + self._digest_statements(user_id, nodes=[row["name"] for row in rows]))
+
+    def _node_rows(self, nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # A stable lock order keeps concurrent writers from deadlocking on the same nodes.
+        return sorted(
+            (
+                {
                     "name": node["name"],
-                    "user_id": user_id,
                     "perspective": node.get("perspective", ""),
-                    "properties": properties
-                })
+                    "properties": self._prefixed_properties(node.get("properties")),
+                    "aliases": list(node.get("aliases", [])),
+                    "name_keys": name_keys(node["name"], node.get("aliases", [])),
+                }
+                for node in nodes
+            ),
+            key=lambda row: row["name"]
+        )
+
+    @staticmethod
+    def _prefixed_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+        return {PROPERTY_PREFIX + key: value for key, value in flatten_properties(properties).items()}
 
+    @instrumented("neo4j")
+    async def find_nodes_by_keys(self, keys: List[str], user_id: str) -> Dict[str, str]:
+        query = """
+        MATCH (n:NodeName {UserId: $user_id})
+        WHERE any(key IN n.name_keys WHERE key IN $keys)
+        RETURN n.name AS name, [key IN n.name_keys WHERE key IN $keys] AS keys
+        ORDER BY name
+        """
+        found: Dict[str, str] = {}
+        for record in await self._read(query, keys=list(keys), user_id=user_id):
+            for key in record["keys"]:
+                found.setdefault(key, record["name"])
+        return found
+
+    @instrumented("neo4j")
     async def create_relationships(self, relationships: List[Dict[str, Any]], user_id: str) -> None:
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot create relationships.")
+            logger.warning("User %s does not exist. Cannot create relationships.", user_id)
             return
-        async with self.driver.session() as session:
-            for relationship in relationships:
-                await self._create_relationship(session, relationship, user_id)
-
-    async def _create_relationship(self, session, relationship: Dict[str, Any], user_id: str) -> None:
-        query = (
-            "MATCH (source {UserId: $user_id}), (target {UserId: $user_id}) "
-            "WHERE source.name = $source AND target.name = $target "
-            "MERGE (source)-[r:`{relation}`]->(target) "
-            "SET r.value = $relation"
+        await self._write_all(self._relationship_statements(relationships, user_id)
+                              + self._digest_statements(user_id, endpoints=relationships))
+
+    @staticmethod
+    def _relationship_rows(relationships: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return sorted(
+            (
+                {
+                    "source": rel["source"],
+                    "target": rel["target"],
+                    "relation": canonical_relation(rel["relation"]),
+                    "value": rel.get("value") or rel["relation"],
+                }
+                for rel in relationships
+            ),
+            key=lambda row: (row["relation"], row["source"], row["target"])
         )
-        params = {
-            "source": relationship["source"],
-            "target": relationship["target"],
-            "relation": relationship["relation"],
-            "user_id": user_id
-        }
 
-        await session.run(query, params)
+    @staticmethod
+    def _deleted_relationship_rows(relationships: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Unlike writes, a delete without a value matches the type whatever value the edge holds
+        return sorted(
+            (
+                {
+                    "source": rel["source"],
+                    "target": rel["target"],
+                    "relation": canonical_relation(rel["relation"]),
+                    "value": rel.get("value"),
+                }
+                for rel in relationships
+            ),
+            key=lambda row: (row["relation"], row["source"], row["target"])
+        )
+
+    @classmethod
+    def _relationship_statements(cls, relationships: List[Dict[str, Any]], user_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        One MERGE statement per relationship type, since a type can't be a
+        query parameter. Types are sanitized, so they are safe to put into the
+        query, and the query text per type is reused from Neo4j's plan cache.
+        """
+        rows = cls._relationship_rows(relationships)
+        return [
+            (cls.CREATE_RELATIONSHIPS_QUERY.format(relation=relation), {"relationships": list(group), "user_id": user_id})
+            for relation, group in itertools.groupby(rows, key=lambda row: row["relation"])
+        ]
+
+    @classmethod
+    def _digest_statements(cls, user_id: str, nodes: Iterable[str] = (),
+                           endpoints: Iterable[Dict[str, Any]] = ()) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Statements that rebuild the digests a write changes: those of written
+        `nodes` and their neighbours, and of both `endpoints` of written
+        relationships. Empty when digests are off.
+        """
+        marks = cls._mark_digests_statements(user_id, nodes, endpoints)
+        return marks + [cls._refresh_digests_statement(user_id)] if marks else []
+
+    @classmethod
+    def _mark_digests_statements(cls, user_id: str, nodes: Iterable[str] = (),
+                                 endpoints: Iterable[Dict[str, Any]] = ()) -> List[Tuple[str, Dict[str, Any]]]:
+        if not config.GRAPH.NEIGHBORHOOD_DIGESTS:
+            return []
+        endpoints = list(endpoints)
+        marks = [
+            (sorted(set(nodes)), True),
+            (sorted({rel["source"] for rel in endpoints} | {rel["target"] for rel in endpoints}), False),
+        ]
+        return [
+            (cls.MARK_DIGESTS_STALE_QUERY, {"names": names, "with_neighbours": with_neighbours, "user_id": user_id})
+            for names, with_neighbours in marks if names
+        ]
 
+    @classmethod
+    def _refresh_digests_statement(cls, user_id: str) -> Tuple[str, Dict[str, Any]]:
+        return cls.REFRESH_DIGESTS_QUERY, {
+            "user_id": user_id,
+            "max_neighbors": config.GRAPH.DIGEST_MAX_NEIGHBORS,
+            "perspective_chars": config.GRAPH.DIGEST_PERSPECTIVE_CHARS,
+        }
+
+    @instrumented("neo4j")
     async def create_vector_index(self, index_name: str) -> None:
         # Check if the index already exists
-        existing_indexes_query = "SHOW VECTOR INDEXES"
-        async with self.driver.session() as session:
-            existing_indexes = await session.run(existing_indexes_query)
-            index_exists = any(index['name'] == index_name for index in await existing_indexes.data())
-    
-        if not index_exists:
+        if not await self.index_exists(index_name):
             query = f"""
             CREATE VECTOR INDEX `{index_name}`
             FOR (n:NodeName) ON (n.embedding)
             OPTIONS {{indexConfig: {{`vector.dimensions`: 1536, `vector.similarity_function`: 'cosine'}}}}
             """
-            async with self.driver.session() as session:
-                await session.run(query)
-            print(f"Vector index '{index_name}' created.")
+            await self._write(query)
+            logger.info("Vector index '%s' created.", index_name)
         else:
-            print(f"Vector index '{index_name}' already exists.")
+            logger.debug("Vector index '%s' already exists.", index_name)
 
+    @instrumented("neo4j")
     async def add_embedding_to_vector_index(self, node_name: str, embedding: List[float], user_id: str) -> None:
+        await self.add_embeddings_to_vector_index({node_name: embedding}, user_id)
+
+    @instrumented("neo4j")
+    async def add_embeddings_to_vector_index(self, embeddings: Dict[str, List[float]], user_id: str) -> None:
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot add embedding.")
+            logger.warning("User %s does not exist. Cannot add embeddings.", user_id)
             return
+        await self._write(self.SET_EMBEDDINGS_QUERY, rows=self._embedding_rows(embeddings), user_id=user_id)
+
+    @staticmethod
+    def _embedding_rows(embeddings: Dict[str, List[float]]) -> List[Dict[str, Any]]:
+        return [{"name": name, "embedding": embedding} for name, embedding in sorted(embeddings.items())]
+
+    @instrumented("neo4j")
+    async def nodes_missing_embeddings(self, node_names: List[str], user_id: str) -> List[str]:
         query = """
-        MATCH (n {name: $node_name, UserId: $user_id})
-        CALL db.create.setNodeVectorProperty(n, 'embedding', $embedding)
+        UNWIND $names AS name
+        OPTIONAL MATCH (n:NodeName {name: name, UserId: $user_id})
+        WITH name, n WHERE n IS NULL OR n.embedding IS NULL
+        RETURN name
         """
-        async with self.driver.session() as session:
-            await session.run(query, node_name=node_name, embedding=embedding, user_id=user_id)
+        records = await self._read(query, names=list(node_names), user_id=user_id)
+        return [record["name"] for record in records]
 
+    @instrumented("neo4j")
+    async def apply_graph_delta(self, delta: Dict[str, Any], user_id: str) -> None:
+        """
+        Apply deletes, then upserts, in one managed transaction, with one
+        UNWIND statement per kind of change, and bump the graph version.
+
+        Args:
+        - delta (Dict[str, Any]): `delete_relationships`, `delete_nodes`, `nodes`,
+          `embeddings` and `relationships`, each optional, shaped like the
+          arguments of the corresponding single-purpose methods.
+        - user_id (str): The user whose graph is updated.
+        """
+        if not await self.user_exists(user_id):
+            logger.warning("User %s does not exist. Cannot apply graph update.", user_id)
+            return
+        # Neighbours of deleted nodes and endpoints of deleted relationships are marked before the deletes
+        deleted = self._mark_digests_statements(user_id, delta.get("delete_nodes", []), delta.get("delete_relationships", []))
+        statements = [
+            (self.DELETE_RELATIONSHIPS_QUERY, {"relationships": self._deleted_relationship_rows(delta.get("delete_relationships", []))}),
+            (self.DELETE_NODES_QUERY, {"names": sorted(delta.get("delete_nodes", []))}),
+            (self.CREATE_NODES_QUERY, {"nodes": self._node_rows(delta.get("nodes", []))}),
+            (self.SET_EMBEDDINGS_QUERY, {"rows": self._embedding_rows(delta.get("embeddings", {}))}),
+        ]
+        statements = deleted + [(query, {**params, "user_id": user_id}) for query, params in statements if next(iter(params.values()))]
+        statements += self._relationship_statements(delta.get("relationships", []), user_id)
+        written = self._mark_digests_statements(user_id, [node["name"] for node in delta.get("nodes", [])],
+                                                delta.get("relationships", []))
+        if deleted or written:
+            statements += written + [self._refresh_digests_statement(user_id)]
+        statements.append((self.BUMP_GRAPH_VERSION_QUERY, {"user_id": user_id}))
+        await self._write_all(statements)
+
+    @instrumented("neo4j")
     async def index_exists(self, index_name: str) -> bool:
-        async with self.driver.session() as session:
-            existing_indexes = await session.run("SHOW VECTOR INDEXES")
-            index_exists = any(index['name'] == index_name for index in await existing_indexes.data())
-            return index_exists
-
-    async def ensure_vector_index(self) -> None:
-        async with self.driver.session() as session:
-            # Check if the index exists
-            result = await session.run("SHOW VECTOR INDEXES")
-            indexes = await result.data()
-            index_exists = any(index['name'] == 'embeddings_index' for index in indexes)
-
-            if not index_exists:
-                # Create the index if it doesn't exist
-                query = """
-                CREATE VECTOR INDEX embeddings_index IF NOT EXISTS
-                FOR (n:NodeName)
-                ON (n.embedding)
-                OPTIONS {indexConfig: {
-                    `vector.dimensions`: 1536,
-                    `vector.similarity_function`: 'cosine'
-                }}
-                """
-                await session.run(query)
-                print("Vector index 'embeddings_index' created.")
-            else:
-                print("Vector index 'embeddings_index' already exists.")
-
-    async def query_text_similarity(self, keyword_embedding: List[float], user_id: str, index_name: str = "embeddings_index") -> List[Dict[str, Any]]:
+        indexes = await self._read("SHOW VECTOR INDEXES")
+        return any(index['name'] == index_name for index in indexes)
+
+    @instrumented("neo4j")
+    async def ensure_vector_index(self, force: bool = False) -> None:
+        """Create the vector and lookup indexes if missing. Runs once per process unless `force` is set."""
+        global _schema_ready
+        if _schema_ready and not force:
+            return
+        # Check if the index exists
+        index_exists = await self.index_exists('embeddings_index')
+
+        # Lets per-user deletes and lookups use an index instead of a label scan
+        await self._write("CREATE INDEX nodename_user_id IF NOT EXISTS FOR (n:NodeName) ON (n.UserId)")
+        # Keep concurrent MERGEs from creating duplicate users or per-user nodes
+        for constraint in (
+            "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+            "CREATE CONSTRAINT nodename_user_name_unique IF NOT EXISTS FOR (n:NodeName) REQUIRE (n.UserId, n.name) IS UNIQUE",
+        ):
+            try:
+                await self._write(constraint)
+            except Neo4jError as e:
+                logger.warning("Could not create constraint, existing data may have duplicates: %s", e)
+
+        if not index_exists:
+            # Create the index if it doesn't exist
+            query = """
+            CREATE VECTOR INDEX embeddings_index IF NOT EXISTS
+            FOR (n:NodeName)
+            ON (n.embedding)
+            OPTIONS {indexConfig: {
+                `vector.dimensions`: 1536,
+                `vector.similarity_function`: 'cosine'
+            }}
+            """
+            await self._write(query)
+            logger.info("Vector index 'embeddings_index' created.")
+        else:
+            logger.debug("Vector index 'embeddings_index' already exists.")
+        _schema_ready = True
+
+    @instrumented("neo4j")
+    async def query_text_similarity(self, keyword_embedding: List[float], user_id: str, index_name: str = "embeddings_index",
+                                    property_filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Query the Neo4j vector index to find the top 5 nodes similar to a given text keyword embedding, filtered by user ID.
 
@@ -168,56 +539,87 @@ class Neo4jConnectionManager:
         - keyword_embedding (List[float]): The embedding of the text keyword as a list of floats.
         - user_id (str): The user ID to filter the nodes by.
         - index_name (str): The name of the vector index used for querying.
+        - property_filters (Dict[str, Any]): Node property values the results must match.
 
         Returns:
         - List[Dict[str, Any]]: A list of dictionaries containing the node ID, node name, and their similarity scores.
         """
         query = """
-        CALL db.index.vector.queryNodes($indexName, 5, $embedding)
+        CALL db.index.vector.queryNodes($indexName, $candidates, $embedding)
         YIELD node, score
         WHERE node.UserId = $user_id
+          AND all(key IN keys($filters) WHERE node[$prefix + key] = $filters[key])
         RETURN id(node) AS nodeId, node.name AS nodeName, score
         ORDER BY score DESC
+        LIMIT 5
         """
-        results = []
-        async with self.driver.session() as session:
-            tx = await session.begin_transaction()
-            try:
-                result = await tx.run(query, indexName=index_name, embedding=keyword_embedding, user_id=user_id)
-                async for record in result:
-                    results.append({
-                        'nodeId': record['nodeId'],
-                        'nodeName': record['nodeName'],
-                        'score': record['score']
-                    })
-                await tx.commit()
-            except Exception as e:
-                await tx.rollback()
-                raise
-            finally:
-                await tx.close()
-        return results
+        filters = flatten_properties(property_filters or {})
+        candidates = 5 * (self.FILTERED_SEARCH_OVERSAMPLE if filters else 1)
+        return await self._read(query, indexName=index_name, embedding=keyword_embedding, user_id=user_id,
+                                candidates=candidates, filters=filters, prefix=PROPERTY_PREFIX)
+
+
+    @instrumented("neo4j")
+    async def query_text_similarity_many(self, keyword_embeddings: List[List[float]], user_id: str,
+                                         index_name: str = "embeddings_index",
+                                         property_filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Run `query_text_similarity` for several embeddings in one round trip.
 
+        Args:
+        - keyword_embeddings (List[List[float]]): The query embeddings.
+        - user_id (str): The user ID to filter the nodes by.
+        - index_name (str): The name of the vector index used for querying.
+        - property_filters (Dict[str, Any]): Node property values the results must match.
+
+        Returns:
+        - List[List[Dict[str, Any]]]: The matches of each embedding, in input order.
+        """
+        query = """
+        UNWIND range(0, size($embeddings) - 1) AS i
+        CALL {
+            WITH i
+            CALL db.index.vector.queryNodes($indexName, $candidates, $embeddings[i])
+            YIELD node, score
+            WHERE node.UserId = $user_id
+              AND all(key IN keys($filters) WHERE node[$prefix + key] = $filters[key])
+            RETURN node, score
+            ORDER BY score DESC
+            LIMIT 5
+        }
+        RETURN i, id(node) AS nodeId, node.name AS nodeName, score
+        ORDER BY i, score DESC
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in keyword_embeddings]
+        if not keyword_embeddings:
+            return results
+        filters = flatten_properties(property_filters or {})
+        candidates = 5 * (self.FILTERED_SEARCH_OVERSAMPLE if filters else 1)
+        for record in await self._read(query, indexName=index_name, embeddings=keyword_embeddings, user_id=user_id,
+                                       candidates=candidates, filters=filters, prefix=PROPERTY_PREFIX):
+            results[record["i"]].append({"nodeId": record["nodeId"], "nodeName": record["nodeName"], "score": record["score"]})
+        return results
 
+    @instrumented("neo4j")
     async def update_node_embeddings(self, node_name: str, embedding: List[float], user_id: str) -> None:
         if not await self.user_exists(user_id):
-            print(f"User {user_id} does not exist. Cannot update embeddings.")
+            logger.warning("User %s does not exist. Cannot update embeddings.", user_id)
             return
         if not self._validate_embedding(embedding):
-            print(f"Invalid embedding format for node {node_name}. Embedding must be a list of floats.")
+            logger.warning("Invalid embedding format for node %s. Embedding must be a list of floats.", node_name)
             return
 
-        async with self.driver.session() as session:
-            success_flag = await self._set_node_embedding(session=session, embedding=embedding, node_name=node_name, user_id=user_id)
+        async with self._session() as session:
+            success_flag = await session.execute_write(self._set_node_embedding, embedding=embedding, node_name=node_name, user_id=user_id)
 
-    async def _set_node_embedding(self, session, embedding: List[float], node_name: str, user_id: str) -> bool:
+    @staticmethod
+    async def _set_node_embedding(tx, embedding: List[float], node_name: str, user_id: str) -> bool:
         query = """
-        MATCH (n {name: $node_name, UserId: $user_id})
+        MATCH (n:NodeName {name: $node_name, UserId: $user_id})
         SET n.embedding = $embedding
         RETURN n.embedding IS NOT NULL AS successFlag
         """
-        print("embedding", embedding)
-        result = await session.run(query, embedding=embedding, node_name=node_name, user_id=user_id)
+        result = await tx.run(query, embedding=embedding, node_name=node_name, user_id=user_id)
         result_data = await result.single()
         return result_data['successFlag'] if result_data else False
 
@@ -225,81 +627,299 @@ class Neo4jConnectionManager:
     def _validate_embedding(embedding: List[float]) -> bool:
         return isinstance(embedding, list) and all(isinstance(item, float) for item in embedding)
 
+    @instrumented("neo4j")
     async def get_node_data(self, node_name: str, user_id: str) -> Dict[str, Any]:
         query = """
         MATCH (n:NodeName {name: $node_name, UserId: $user_id})
-        RETURN n.name AS name, n.perspective AS perspective, n.properties AS properties
-        """
-        async with self.driver.session() as session:
-            result = await session.run(query, node_name=node_name, user_id=user_id)
-            record = await result.single()
-            if record:
-                return {
-                    "name": record["name"],
-                    "perspective": record["perspective"],
-                    "properties": json.loads(record["properties"]) if record["properties"] else {}
-                }
-            return None
+        RETURN n.name AS name, n.perspective AS perspective,
+               [key IN keys(n) WHERE key STARTS WITH $prefix | [substring(key, size($prefix)), n[key]]] AS properties
+        """
+        records = await self._read(query, node_name=node_name, user_id=user_id, prefix=PROPERTY_PREFIX)
+        if records:
+            record = records[0]
+            return {
+                "name": record["name"],
+                "perspective": record["perspective"],
+                "properties": dict(record["properties"])
+            }
+        return None
 
-    async def get_node_relationships(self, node_name: str, user_id: str) -> List[Dict[str, Any]]:
+    @instrumented("neo4j")
+    async def get_node_relationships(self, node_name: str, user_id: str, limit: Optional[int] = None,
+                                     relation_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         query = """
-        MATCH (n:NodeName {name: $node_name, UserId: $user_id})-[r]-(m:NodeName)
+        MATCH (n:NodeName {name: $node_name, UserId: $user_id})-[r%s]-(m:NodeName)
         RETURN type(r) AS relation, m.name AS related_node, r.value AS value,
                CASE WHEN startNode(r) = n THEN 'outgoing' ELSE 'incoming' END AS direction
         """
-        async with self.driver.session() as session:
-            result = await session.run(query, node_name=node_name, user_id=user_id)
-            return [
-                {
-                    "source": node_name if record["direction"] == "outgoing" else record["related_node"],
-                    "target": record["related_node"] if record["direction"] == "outgoing" else node_name,
-                    "relation": record["relation"],
-                    "value": record["value"]
-                } 
-                for record in await result.data()
-            ]
+        if limit is not None:
+            # Follow the most central neighbours first, using scores precomputed by `app.graph.centrality`
+            query += "ORDER BY coalesce(m.pagerank, 0.0) DESC, coalesce(m.degree, 0) DESC LIMIT $limit"
+        query = query % self._type_filter(relation_types)
+        return [
+            {
+                "source": node_name if record["direction"] == "outgoing" else record["related_node"],
+                "target": record["related_node"] if record["direction"] == "outgoing" else node_name,
+                "relation": record["relation"],
+                "value": record["value"]
+            }
+            for record in await self._read(query, node_name=node_name, user_id=user_id, limit=limit)
+        ]
+
+    @instrumented("neo4j")
+    async def get_nodes_data(self, node_names: List[str], user_id: str) -> Dict[str, Dict[str, Any]]:
+        query = """
+        UNWIND $node_names AS node_name
+        MATCH (n:NodeName {name: node_name, UserId: $user_id})
+        RETURN n.name AS name, n.perspective AS perspective,
+               [key IN keys(n) WHERE key STARTS WITH $prefix | [substring(key, size($prefix)), n[key]]] AS properties
+        """
+        records = await self._read(query, node_names=sorted(set(node_names)), user_id=user_id, prefix=PROPERTY_PREFIX)
+        return {
+            record["name"]: {"name": record["name"], "perspective": record["perspective"],
+                             "properties": dict(record["properties"])}
+            for record in records
+        }
+
+    @instrumented("neo4j")
+    async def get_node_digests(self, node_names: List[str], user_id: str) -> Dict[str, Dict[str, Any]]:
+        query = """
+        UNWIND $node_names AS node_name
+        MATCH (n:NodeName {name: node_name, UserId: $user_id})
+        RETURN n.name AS name, n.perspective AS perspective,
+               [key IN keys(n) WHERE key STARTS WITH $prefix | [substring(key, size($prefix)), n[key]]] AS properties,
+               n.digest_names AS names, n.digest_relations AS relations, n.digest_values AS rel_values,
+               n.digest_outgoing AS outgoing, n.digest_perspectives AS perspectives
+        """
+        digests = {}
+        for record in await self._read(query, node_names=sorted(set(node_names)), user_id=user_id, prefix=PROPERTY_PREFIX):
+            neighbors = None
+            if record["names"] is not None:
+                neighbors = [
+                    {"name": name, "relation": relation, "value": value, "outgoing": outgoing, "perspective": perspective}
+                    for name, relation, value, outgoing, perspective in zip(
+                        record["names"], record["relations"], record["rel_values"], record["outgoing"], record["perspectives"])
+                ]
+            digests[record["name"]] = {"name": record["name"], "perspective": record["perspective"],
+                                       "properties": dict(record["properties"]), "neighbors": neighbors}
+        return digests
+
+    @instrumented("neo4j")
+    async def get_nodes_relationships(self, node_names: List[str], user_id: str, limit: Optional[int] = None,
+                                      relation_types: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        query = """
+        UNWIND $node_names AS node_name
+        MATCH (n:NodeName {name: node_name, UserId: $user_id})
+        CALL {
+            WITH n
+            MATCH (n)-[r%s]-(m:NodeName)
+            RETURN r, m
+            %s
+        }
+        RETURN n.name AS name, type(r) AS relation, m.name AS related_node, r.value AS value,
+               startNode(r) = n AS outgoing
+        """
+        order = ""
+        if limit is not None:
+            order = "ORDER BY coalesce(m.pagerank, 0.0) DESC, coalesce(m.degree, 0) DESC LIMIT $limit"
+        query = query % (self._type_filter(relation_types), order)
+        relationships: Dict[str, List[Dict[str, Any]]] = {}
+        for record in await self._read(query, node_names=sorted(set(node_names)), user_id=user_id, limit=limit):
+            name, other = record["name"], record["related_node"]
+            relationships.setdefault(name, []).append({
+                "source": name if record["outgoing"] else other,
+                "target": other if record["outgoing"] else name,
+                "relation": record["relation"],
+                "value": record["value"],
+            })
+        return relationships
+
+    @instrumented("neo4j")
+    async def get_node_centrality(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        query = """
+        MATCH (n:NodeName {UserId: $user_id})
+        RETURN n.name AS name, n.degree AS degree, n.pagerank AS pagerank
+        """
+        records = await self._read(query, user_id=user_id)
+        return {record["name"]: {"degree": record["degree"], "pagerank": record["pagerank"]} for record in records}
+
+    @instrumented("neo4j")
+    async def set_node_centrality(self, scores: Dict[str, Dict[str, Any]], user_id: str) -> None:
+        query = """
+        UNWIND $rows AS row
+        MATCH (n:NodeName {name: row.name, UserId: $user_id})
+        SET n.degree = row.degree, n.pagerank = row.pagerank
+        """
+        rows = [{"name": name, **score} for name, score in sorted(scores.items())]
+        for start in range(0, len(rows), config.GRAPH.IMPORT_BATCH_SIZE):
+            await self._write(query, rows=rows[start:start + config.GRAPH.IMPORT_BATCH_SIZE], user_id=user_id)
 
+    @instrumented("neo4j")
     async def get_all_nodes(self, user_id: str) -> List[Dict[str, Any]]:
         query = """
         MATCH (n:NodeName {UserId: $user_id})
         RETURN n.name AS name, n.perspective AS perspective
         """
-        async with self.driver.session() as session:
-            result = await session.run(query, user_id=user_id)
-            return await result.data()
+        return await self._read(query, user_id=user_id)
+
+    @instrumented("neo4j")
+    async def count_nodes(self, user_id: str) -> int:
+        records = await self._read("MATCH (n:NodeName {UserId: $user_id}) RETURN count(n) AS count", user_id=user_id)
+        return records[0]["count"]
+
+    @instrumented("neo4j")
+    async def record_node_access(self, counts: Dict[str, int], user_id: str) -> None:
+        query = """
+        UNWIND $rows AS row
+        MATCH (n:NodeName {name: row.name, UserId: $user_id})
+        SET n.access_count = coalesce(n.access_count, 0) + row.count, n.last_touched = timestamp()
+        """
+        rows = [{"name": name, "count": count} for name, count in sorted(counts.items())]
+        await self._write(query, rows=rows, user_id=user_id)
+
+    @instrumented("neo4j")
+    async def get_compaction_candidates(self, user_id: str, touched_before: int, max_access_count: int,
+                                        limit: int) -> List[Dict[str, Any]]:
+        # COUNT {} reads the degree from the node's relationship store instead of expanding hubs
+        query = """
+        MATCH (n:NodeName {UserId: $user_id})
+        WHERE n.last_touched < $touched_before AND coalesce(n.access_count, 0) <= $max_access_count
+          AND COUNT { (n)--() } <= 1
+        WITH n ORDER BY coalesce(n.access_count, 0), n.last_touched, n.name LIMIT $limit
+        OPTIONAL MATCH (n)-[r]-(:NodeName)
+        RETURN n.name AS name, n.perspective AS perspective, coalesce(n.access_count, 0) AS access_count,
+               n.last_touched AS last_touched,
+               collect(CASE WHEN r IS NULL THEN null ELSE
+                   {source: startNode(r).name, target: endNode(r).name, relation: type(r), value: r.value} END) AS edges
+        ORDER BY access_count, last_touched, name
+        """
+        return await self._read(query, user_id=user_id, touched_before=touched_before,
+                                max_access_count=max_access_count, limit=limit)
 
+    @instrumented("neo4j")
     async def get_all_relationships(self, user_id: str) -> List[Dict[str, Any]]:
         query = """
         MATCH (source:NodeName {UserId: $user_id})-[r]->(target:NodeName {UserId: $user_id})
         RETURN source.name AS source, type(r) AS relation, target.name AS target
         """
-        async with self.driver.session() as session:
-            result = await session.run(query, user_id=user_id)
-            return await result.data()
+        return await self._read(query, user_id=user_id)
+
+    @instrumented("neo4j")
+    async def get_nodes_page(self, user_id: str, after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        # Seeks through the (UserId, name) uniqueness constraint's index instead of skipping rows
+        query = """
+        MATCH (n:NodeName {UserId: $user_id})
+        WHERE $after IS NULL OR n.name > $after
+        RETURN n.name AS name, n.perspective AS perspective,
+               [key IN keys(n) WHERE key STARTS WITH $prefix | [substring(key, size($prefix)), n[key]]] AS properties
+        ORDER BY n.name
+        LIMIT $limit
+        """
+        records = await self._read(query, user_id=user_id, after=after, limit=limit, prefix=PROPERTY_PREFIX)
+        for record in records:
+            record["properties"] = dict(record["properties"])
+        return records
+
+    @instrumented("neo4j")
+    async def get_relationships_page(self, user_id: str, after: Optional[List[str]], limit: int,
+                                     relation_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        query = """
+        MATCH (s:NodeName {UserId: $user_id})-[r%s]->(t:NodeName {UserId: $user_id})
+        WITH s.name AS source, t.name AS target, type(r) AS relation, r.value AS value
+        WHERE $after IS NULL OR source > $after[0]
+           OR (source = $after[0] AND (target > $after[1] OR (target = $after[1] AND relation > $after[2])))
+        RETURN source, target, relation, value
+        ORDER BY source, target, relation
+        LIMIT $limit
+        """ % self._type_filter(relation_types)
+        return await self._read(query, user_id=user_id, after=after, limit=limit)
+
+    @staticmethod
+    def _type_filter(relation_types: Optional[List[str]]) -> str:
+        """A relationship pattern type filter like ":`LIKES`|`USES`", so the traversal only touches those types."""
+        types = canonical_relations(relation_types)
+        return ":" + "|".join(f"`{relation}`" for relation in types) if types else ""
+
+    async def _stream(self, query: str, **params) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the records of a read query as they arrive, for results too large
+        to hold in memory. A managed transaction can't hand records out of its
+        work function, so this is an auto-commit query in a read-mode session,
+        which a cluster still routes to a follower.
+        """
+        async with self._session(default_access_mode=READ_ACCESS) as session:
+            result = await session.run(query, params)
+            async for record in result:
+                yield record.data()
+
+    async def iter_nodes(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        query = """
+        MATCH (n:NodeName {UserId: $user_id})
+        RETURN n.name AS name, n.perspective AS perspective, n.embedding AS embedding,
+               coalesce(n.aliases, []) AS aliases,
+               [key IN keys(n) WHERE key STARTS WITH $prefix | [substring(key, size($prefix)), n[key]]] AS properties
+        """
+        async for record in self._stream(query, user_id=user_id, prefix=PROPERTY_PREFIX):
+            record["properties"] = dict(record["properties"])
+            yield record
 
+    async def iter_relationships(self, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        query = """
+        MATCH (source:NodeName {UserId: $user_id})-[r]->(target:NodeName {UserId: $user_id})
+        RETURN source.name AS source, target.name AS target, type(r) AS relation, r.value AS value
+        """
+        async for record in self._stream(query, user_id=user_id):
+            yield record
+
+    @instrumented("neo4j")
     async def create_user(self, user_id: str) -> None:
+        # The graph version starts from the clock so a re-created user never repeats an old version
         query = """
         MERGE (u:User {id: $user_id})
+        ON CREATE SET u.graph_version = timestamp()
         """
-        async with self.driver.session() as session:
-            await session.run(query, user_id=user_id)
-        print(f"User {user_id} created successfully.")
+        await self._write(query, user_id=user_id)
+        logger.info("User %s created successfully.", user_id)
+
+    @instrumented("neo4j")
+    async def list_users(self) -> List[str]:
+        return [record["id"] for record in await self._read("MATCH (u:User) RETURN u.id AS id ORDER BY id")]
 
+    @instrumented("neo4j")
+    async def get_graph_version(self, user_id: str) -> Optional[int]:
+        query = """
+        MATCH (u:User {id: $user_id})
+        RETURN coalesce(u.graph_version, 0) AS version
+        """
+        records = await self._read(query, user_id=user_id)
+        return records[0]["version"] if records else None
+
+    @instrumented("neo4j")
+    async def bump_graph_version(self, user_id: str) -> None:
+        await self._write(self.BUMP_GRAPH_VERSION_QUERY, user_id=user_id)
+
+    @instrumented("neo4j")
     async def user_exists(self, user_id: str) -> bool:
         query = """
         MATCH (u:User {id: $user_id})
         RETURN COUNT(u) > 0 AS exists
         """
-        async with self.driver.session() as session:
-            result = await session.run(query, user_id=user_id)
-            record = await result.single()
-            return record and record['exists']
+        records = await self._read(query, user_id=user_id)
+        return bool(records and records[0]['exists'])
 
-    async def delete_user(self, user_id: str) -> None:
-        query = """
-        MATCH (n {UserId: $user_id})
-        DETACH DELETE n
+    @instrumented("neo4j")
+    async def delete_user(self, user_id: str, batch_size: Optional[int] = None,
+                          progress: Optional[ProgressCallback] = None) -> None:
         """
-        async with self.driver.session() as session:
-            await session.run(query, user_id=user_id)
-        print(f"User {user_id} and all associated nodes deleted successfully.")
\ No newline at end of file
+        Delete a user's nodes in batched transactions, then the `User` node itself.
+
+        Args:
+        - user_id (str): The user to delete.
+        - batch_size (int): Rows per transaction, defaults to `config.NEO4J.DELETE_BATCH_SIZE`.
+        - progress (ProgressCallback): Called with (deleted, total) as batches commit.
+        """
+        deleted = await self._delete_in_batches(
+            "MATCH (n:NodeName {UserId: $user_id})", {"user_id": user_id}, batch_size, progress
+        )
+        await self._write("MATCH (u:User {id: $user_id}) DETACH DELETE u", user_id=user_id)
+        logger.info("User %s and %d associated nodes deleted successfully.", user_id, deleted)
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Query decomposition for retrieval.
+
+A compound question ("how do my space interests relate to my teaching?") is
+embedded as one vector that sits between its topics, so the similarity search
+finds seeds for at most one of them. `decompose_query` splits such a question
+into sub-queries, by splitting at connectives or, with
+`RAG_DECOMPOSITION_METHOD=llm`, with a cached LLM call. The sub-queries are
+searched together and `merge_seeds` combines their results into one bounded
+seed list for a single expansion.
+"""
+import hashlib
+import logging
+import re
+from typing import Any, Dict, List
+
+from app.config import config
+from app.openai.llm_graph import generate_sub_queries
+from app.utils.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+# LLM decompositions keyed by a hash of the normalized query and the sub-query limit
+query_decomposition_cache = Cache("query_decomposition", config.CACHE.DECOMPOSITION_MAX_ENTRIES,
+                                  config.CACHE.DECOMPOSITION_TTL_SECONDS)
+
+_CONNECTIVES = re.compile(
+    r"[;?]|,|\b(?:and|or|but|versus|vs\.?|as well as|along with|compared? (?:to|with)|"
+    r"relates? to|related to|connects? to|connected to|overlaps? with)\b",
+    re.IGNORECASE,
+)
+# Words that don't make a topic on their own, e.g. what is left of "what is the link between A and B" after A
+_FILLER = {
+    "a", "about", "an", "are", "between", "both", "connection", "difference", "do", "does", "how", "i", "in", "is",
+    "link", "me", "my", "of", "the", "to", "what", "which", "with",
+}
+
+
+def split_query(query: str, max_parts: int) -> List[str]:
+    """
+    The topics of a compound question, split at connectives such as "and",
+    "relate to" or "compared with". Parts made only of filler words are
+    dropped. Returns an empty list when the query has a single topic.
+    """
+    parts = []
+    for part in _CONNECTIVES.split(query):
+        part = part.strip(" \t\n.,!:\"'")
+        if part and any(word not in _FILLER for word in re.findall(r"\w+", part.lower())):
+            parts.append(part)
+    parts = list(dict.fromkeys(parts))
+    return parts[:max_parts] if len(parts) > 1 else []
+
+
+async def decompose_query(query: str) -> List[str]:
+    """
+    The queries to search for `query`: the query itself first, followed by
+    up to `RAG_MAX_SUB_QUERIES` sub-queries if it asks about several topics.
+    LLM decompositions are cached; if the LLM call fails the connective
+    heuristic is used instead.
+    """
+    max_parts = config.RAG.MAX_SUB_QUERIES
+    parts = None
+    if config.RAG.DECOMPOSITION_METHOD == "llm":
+        normalized = " ".join(query.casefold().split())
+        key = hashlib.sha256(f"{max_parts}\x1f{normalized}".encode()).hexdigest()
+        parts = await query_decomposition_cache.get(key)
+        if parts is None:
+            parts = await generate_sub_queries(query, max_parts)
+            if parts:
+                await query_decomposition_cache.set(key, parts)
+    if not parts:
+        parts = split_query(query, max_parts)
+    logger.debug("Decomposed query into %d sub-queries", len(parts))
+    return list(dict.fromkeys([query, *parts]))
+
+
+def merge_seeds(seed_lists: List[List[Dict[str, Any]]], max_seeds: int) -> List[Dict[str, Any]]:
+    """
+    One seed list from the similarity search results of several sub-queries.
+    Seeds are taken rank by rank across the lists, so every sub-query's best
+    matches get in before anyone's weaker ones, up to `max_seeds`. A node
+    found by several sub-queries keeps its best score.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for rank in range(max((len(seeds) for seeds in seed_lists), default=0)):
+        for seeds in seed_lists:
+            if rank >= len(seeds):
+                continue
+            node = seeds[rank]
+            name = node['nodeName']
+            if name in merged:
+                merged[name]['score'] = max(merged[name]['score'], node['score'])
+            elif len(merged) < max_seeds:
+                merged[name] = dict(node)
+    return list(merged.values())
@@ -1,77 +1,276 @@
-from typing import List, Dict, Any
-from app.graph.graph_ops import GraphOps
+from typing import List, Dict, Any, Optional, Awaitable, Callable
+import asyncio
+import hashlib
+import logging
+from app.config import config
+from app.graph.backend import GraphBackend
+from app.graph.compaction import AccessTracker
+from app.graph.context_assembler import AssembledContext, ContextAssembler
+from app.graph.graph_ops import GraphOps, rag_answer_cache, rag_cache_prefix
+from app.graph.query_decomposition import decompose_query, merge_seeds
+from app.graph.records import EdgeRecord, NodeRecord
+from app.graph.relations import canonical_relations
 from app.openai.llm_graph import generate_response_with_context
+from app.utils.tracing import span
+
+logger = logging.getLogger(__name__)
 
 class RAGInterface:
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, backend: Optional[GraphBackend] = None):
         self.user_id = user_id
-        self.graph_ops = GraphOps()
+        self.graph_ops = GraphOps(backend)
 
-    async def get_context(self, query: str, top_k: int = 5, max_hops: int = 2) -> str:
-        similar_nodes = await self.graph_ops.perform_similarity_search(query, self.user_id, limit=top_k)
-        context = await self.expand_context(similar_nodes['results'], max_hops)
-        return self.format_context(context)
+    def new_assembler(self, title: str = "# Knowledge Graph Context") -> ContextAssembler:
+        return ContextAssembler(config.RAG.CONTEXT_TOKEN_BUDGET, config.RAG.HOP_DECAY, title)
+
+    async def get_context(self, query: str, top_k: int = 5, max_hops: int = 2,
+                          relation_types: Optional[List[str]] = None, decompose: bool = False) -> str:
+        if decompose:
+            return (await self.assemble_decomposed_context(query, top_k, max_hops, relation_types)).text
+        return (await self.assemble_context(query, top_k, max_hops, relation_types)).text
+
+    async def assemble_context(self, query: str, top_k: int = 5, max_hops: int = 2,
+                               relation_types: Optional[List[str]] = None) -> AssembledContext:
+        return (await self.assemble_contexts([query], top_k, max_hops, relation_types))[0]
+
+    async def assemble_contexts(self, queries: List[str], top_k: int = 5, max_hops: int = 2,
+                                relation_types: Optional[List[str]] = None,
+                                decompose: bool = False) -> List[AssembledContext]:
+        """
+        Assemble the context of several queries with one embeddings call, one
+        vector search round trip and one expansion over the union of their subgraphs.
+        With `decompose`, each query's sub-queries are searched in the same
+        round trip and merged into its seeds (see `assemble_decomposed_context`).
+        """
+        if not decompose:
+            searches = await self.graph_ops.perform_similarity_searches(queries, self.user_id, limit=top_k)
+            return await self.contexts_from_seeds([search['results'] for search in searches], max_hops, relation_types)
+        with span("rag", "decompose_query") as current:
+            decomposed = await asyncio.gather(*(decompose_query(query) for query in queries))
+            if current is not None:
+                current.attributes.update(sub_queries=sum(len(parts) - 1 for parts in decomposed))
+        searches = await self.graph_ops.perform_similarity_searches([part for parts in decomposed for part in parts],
+                                                                    self.user_id, limit=top_k)
+        results = iter([search['results'] for search in searches])
+        seeds = [merge_seeds([next(results) for _ in parts], config.RAG.DECOMPOSITION_MAX_SEEDS) for parts in decomposed]
+        return await self.contexts_from_seeds(seeds, max_hops, relation_types)
+
+    async def assemble_decomposed_context(self, query: str, top_k: int = 5, max_hops: int = 2,
+                                          relation_types: Optional[List[str]] = None) -> AssembledContext:
+        """
+        `assemble_context` for compound questions: the query and its
+        sub-queries (see `decompose_query`) are embedded in one call and
+        searched in one round trip, and their results are merged into one seed
+        list of at most `RAG_DECOMPOSITION_MAX_SEEDS` nodes that is expanded once.
+        """
+        return (await self.assemble_contexts([query], top_k, max_hops, relation_types, decompose=True))[0]
+
+    async def contexts_from_seeds(self, start_nodes: List[List[Dict[str, Any]]], max_hops: int = 2,
+                                  relation_types: Optional[List[str]] = None) -> List[AssembledContext]:
+        """Assemble a context from each list of similarity search results, from digests or by expansion."""
+        assemblers = [self.new_assembler() for _ in start_nodes]
+        pending = list(range(len(start_nodes)))
+        if config.GRAPH.NEIGHBORHOOD_DIGESTS:
+            pending = await self.digest_contexts(start_nodes, assemblers, relation_types)
+        if pending:
+            await self.expand_contexts([start_nodes[i] for i in pending], max_hops, [assemblers[i] for i in pending],
+                                       relation_types)
+        for assembler in assemblers:
+            AccessTracker.record(self.user_id, list(assembler.nodes), self.graph_ops.backend)
+        return [self._assemble(assembler) for assembler in assemblers]
 
-    async def expand_context(self, start_nodes: List[Dict[str, Any]], max_hops: int) -> Dict[str, Any]:
-        context = {}
-        for node in start_nodes:
-            await self.explore_node(node['nodeName'], context, max_hops)
+    @staticmethod
+    def _assemble(assembler: ContextAssembler) -> AssembledContext:
+        with span("rag", "assemble_context") as current:
+            context = assembler.assemble()
+            if current is not None:
+                current.attributes.update(tokens_used=context.tokens_used, tokens_dropped=context.tokens_dropped)
         return context
 
-    async def explore_node(self, node_name: str, context: Dict[str, Any], hops_left: int):
-        if node_name in context or hops_left < 0:
+    async def digest_contexts(self, start_nodes: List[List[Dict[str, Any]]], assemblers: List[ContextAssembler],
+                              relation_types: Optional[List[str]] = None) -> List[int]:
+        """
+        Fill the assemblers from the stored neighbourhood digests of the seed
+        nodes (`GRAPH_NEIGHBORHOOD_DIGESTS`), read for all seed lists at once:
+        each seed is described with its neighbours one hop away, as an
+        expansion with `max_hops=0` would, but with shortened neighbour
+        perspectives. Seed lists with a seed whose digest hasn't been built are
+        left untouched and their indexes returned, to be expanded instead.
+        """
+        names = sorted({node['nodeName'] for seeds in start_nodes for node in seeds})
+        digests = await self.graph_ops.get_node_digests(names, self.user_id) if names else {}
+        types = set(canonical_relations(relation_types) or [])
+
+        pending = []
+        for i, (seeds, assembler) in enumerate(zip(start_nodes, assemblers)):
+            found = [(node, digests[node['nodeName']]) for node in seeds if node['nodeName'] in digests]
+            if any(digest.neighbors is None for _, digest in found):
+                pending.append(i)
+                continue
+            seed_names = {node['nodeName'] for node, _ in found}
+            for node, digest in found:
+                score = node['score']
+                assembler.add_node(digest.node.name, digest.node.perspective, digest.node.properties, score, 0)
+                for neighbor in digest.neighbors:
+                    if types and neighbor.relation not in types:
+                        continue
+                    source, target = (digest.node.name, neighbor.name) if neighbor.outgoing else (neighbor.name, digest.node.name)
+                    assembler.add_edge(source, neighbor.relation, target, neighbor.value, score, 0)
+                    if neighbor.name not in seed_names:
+                        assembler.add_node(neighbor.name, neighbor.perspective, {}, score, 1)
+        return pending
+
+    async def expand_context(self, start_nodes: List[Dict[str, Any]], max_hops: int, assembler: ContextAssembler,
+                             relation_types: Optional[List[str]] = None) -> None:
+        """
+        Walk the graph breadth-first from the similarity search results, so each
+        node is fetched once at its shortest distance from a seed. Nodes up to
+        `max_hops` away are expanded; their neighbours one hop further are
+        described but not expanded. Every node and edge carries the best seed
+        score that reached it, for the assembler to rank by. With
+        `relation_types`, only relationships of those types are followed.
+        """
+        await self.expand_contexts([start_nodes], max_hops, [assembler], relation_types)
+
+    async def expand_contexts(self, start_nodes: List[List[Dict[str, Any]]], max_hops: int,
+                              assemblers: List[ContextAssembler], relation_types: Optional[List[str]] = None) -> None:
+        """
+        Run `expand_context` for several seed lists in lockstep. Each hop reads
+        the node data and the neighbours of the union of all frontiers in one
+        query each, and nodes shared between expansions are fetched only once.
+        """
+        nodes: Dict[str, Optional[NodeRecord]] = {}
+        edges: Dict[str, List[EdgeRecord]] = {}
+        frontiers: List[Dict[str, float]] = []
+        for seeds in start_nodes:
+            frontier: Dict[str, float] = {}
+            for node in seeds:
+                frontier[node['nodeName']] = max(node['score'], frontier.get(node['nodeName'], 0.0))
+            frontiers.append(frontier)
+        visited = [set() for _ in frontiers]
+
+        for hop in range(max_hops + 2):
+            await self._fetch_subgraph(frontiers, nodes, edges, hop <= max_hops, relation_types)
+            for i, (frontier, assembler) in enumerate(zip(frontiers, assemblers)):
+                next_frontier: Dict[str, float] = {}
+                for node_name, score in frontier.items():
+                    visited[i].add(node_name)
+                    node_data = nodes.get(node_name)
+                    if node_data is None:
+                        continue  # Skip if node data is not found
+                    assembler.add_node(node_name, node_data.perspective, node_data.properties, score, hop)
+                    if hop > max_hops:
+                        continue
+                    for rel in edges.get(node_name, ()):
+                        assembler.add_edge(rel.source, rel.relation, rel.target, rel.value, score, hop)
+                        related_node = rel.target if rel.source == node_name else rel.source
+                        if related_node not in visited[i] and related_node not in frontier:
+                            next_frontier[related_node] = max(score, next_frontier.get(related_node, 0.0))
+                frontiers[i] = next_frontier
+
+    async def _fetch_subgraph(self, frontiers: List[Dict[str, float]], nodes: Dict[str, Optional[NodeRecord]],
+                              edges: Dict[str, List[EdgeRecord]], expand: bool,
+                              relation_types: Optional[List[str]]) -> None:
+        """Add the frontiers' nodes, and their relationships if `expand`, to the shared subgraph."""
+        missing = sorted({name for frontier in frontiers for name in frontier if name not in nodes})
+        if missing:
+            found = await self.graph_ops.get_nodes_data(missing, self.user_id)
+            nodes.update({name: found.get(name) for name in missing})
+        if not expand:
             return
-        
-        node_data = await self.graph_ops.get_node_data(node_name, self.user_id)
-        if node_data is None:
-            return  # Skip if node data is not found
-        
-        relationships = await self.graph_ops.get_node_relationships(node_name, self.user_id)
-        
-        context[node_name] = {
-            'perspective': node_data.perspective,
-            'properties': node_data.properties,
-            'relationships': []
-        }
-
-        for rel in relationships:
-            related_node = rel.target if rel.source == node_name else rel.source
-            related_node_data = await self.graph_ops.get_node_data(related_node, self.user_id)
-            
-            if related_node_data is not None:
-                relationship_info = {
-                    'relation': rel.relation,
-                    'related_node': related_node,
-                    'related_node_perspective': related_node_data.perspective,
-                    'related_node_properties': related_node_data.properties,
-                    'value': getattr(rel, 'value', '')  # Use getattr in case 'value' is not present
-                }
-                
-                context[node_name]['relationships'].append(relationship_info)
-                
-                if hops_left > 0:
-                    await self.explore_node(related_node, context, hops_left - 1)
-
-    def format_context(self, context: Dict[str, Any]) -> str:
-        formatted = "# Knowledge Graph Context\n\n"
-        for node, data in context.items():
-            formatted += f"## {node}\n"
-            formatted += f"Perspective: {data['perspective']}\n"
-            formatted += f"Properties: {', '.join([f'{k}: {v}' for k, v in data['properties'].items()])}\n"
-            formatted += "Relationships:\n"
-            for rel in data['relationships']:
-                formatted += f"- {rel['relation']} {rel['related_node']}\n"
-                formatted += f"  Perspective: {rel['related_node_perspective']}\n"
-                formatted += f"  Properties: {', '.join([f'{k}: {v}' for k, v in rel['related_node_properties'].items()])}\n"
-                formatted += f"  Value: {rel['value']}\n"
-            formatted += "\n"
-        return formatted
-
-    async def query(self, query: str) -> str:
-        context = await self.get_context(query)
+        unexpanded = sorted({name for frontier in frontiers for name in frontier
+                             if nodes.get(name) is not None and name not in edges})
+        if unexpanded:
+            # Hubs would drag in their whole neighbourhood; follow only the most central neighbours
+            found = await self.graph_ops.get_nodes_relationships(
+                unexpanded, self.user_id, limit=config.RAG.MAX_NEIGHBORS, relation_types=relation_types
+            )
+            edges.update({name: found.get(name, []) for name in unexpanded})
+
+    async def query(self, query: str, bypass_cache: bool = False, relation_types: Optional[List[str]] = None,
+                    decompose: bool = False) -> str:
+        types = canonical_relations(relation_types)
+        mode = "graph+decomposed" if decompose else "graph"
+        if types:
+            mode += ":" + ",".join(types)
+        return await self._cached_answer(mode, query, bypass_cache,
+                                         lambda q: self._answer_with_graph(q, types, decompose))
+
+    async def _answer_with_graph(self, query: str, relation_types: Optional[List[str]] = None,
+                                 decompose: bool = False) -> str:
+        context = await self.get_context(query, relation_types=relation_types, decompose=decompose)
         response = await generate_response_with_context(query, context)
         return response
 
+    async def query_many(self, queries: List[str], bypass_cache: bool = False,
+                         relation_types: Optional[List[str]] = None, decompose: bool = False) -> List[str]:
+        """
+        Answer several queries for this user, in input order. Cached answers are
+        reused as in `query`; the rest share one context assembly (see
+        `assemble_contexts`) and their completions run concurrently, at most
+        `RAG_BATCH_CONCURRENCY` at a time.
+        """
+        types = canonical_relations(relation_types)
+        mode = "graph+decomposed" if decompose else "graph"
+        if types:
+            mode += ":" + ",".join(types)
+        version = await self.graph_ops.get_graph_version(self.user_id)
+        keys = [self._cache_key(query, mode, version) for query in queries]
+
+        answers: Dict[str, str] = {}
+        if not bypass_cache and version is not None:
+            answers = await rag_answer_cache.get_many(list(dict.fromkeys(keys)))
+        # Queries that normalize to the same text are answered once
+        pending: Dict[str, str] = {}
+        for key, query in zip(keys, queries):
+            if key not in answers:
+                pending.setdefault(key, query)
+        if answers:
+            logger.debug("RAG cache hit for %d of %d batched queries for user %s", len(answers), len(queries), self.user_id)
+
+        if pending:
+            contexts = await self.assemble_contexts(list(pending.values()), relation_types=types, decompose=decompose)
+            semaphore = asyncio.Semaphore(max(1, config.RAG.BATCH_CONCURRENCY))
+
+            async def answer(query: str, context: AssembledContext) -> str:
+                async with semaphore:
+                    return await generate_response_with_context(query, context.text)
+
+            responses = await asyncio.gather(*(answer(query, context) for query, context in zip(pending.values(), contexts)))
+            for key, response in zip(pending, responses):
+                answers[key] = response
+                if version is not None:
+                    await rag_answer_cache.set(key, response)
+        return [answers[key] for key in keys]
+
+    async def _cached_answer(self, mode: str, query: str, bypass_cache: bool,
+                             answer: Callable[[str], Awaitable[str]]) -> str:
+        """
+        Return a cached answer for this user, query and retrieval mode if the
+        user's graph hasn't changed since it was computed, otherwise compute and
+        cache it. `bypass_cache` skips the lookup but still refreshes the entry.
+        """
+        version = await self.graph_ops.get_graph_version(self.user_id)
+        key = self._cache_key(query, mode, version)
+        if not bypass_cache and version is not None:
+            cached = await rag_answer_cache.get(key)
+            if cached is not None:
+                logger.debug("RAG cache hit for user %s", self.user_id)
+                return cached
+        response = await answer(query)
+        if version is not None:
+            await rag_answer_cache.set(key, response)
+        return response
+
+    def _cache_key(self, query: str, mode: str, version: Optional[int]) -> str:
+        # Hashed so that long queries make short keys on the shared backends
+        digest = hashlib.sha256(self.normalize_query(query).encode()).hexdigest()
+        return f"{rag_cache_prefix(self.user_id)}{version}\x1f{mode}\x1f{digest}"
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.casefold().split())
+
     async def close(self):
         await self.graph_ops.close()
 
@@ -80,17 +279,21 @@ class RAGInterface:
         return await self.format_vector_context(similar_nodes['results'])
 
     async def format_vector_context(self, similar_nodes: List[Dict[str, Any]]) -> str:
-        formatted = "# Vector Search Context\n\n"
+        assembler = self.new_assembler("# Vector Search Context")
+        nodes = await self.graph_ops.get_nodes_data([node['nodeName'] for node in similar_nodes], self.user_id)
         for node in similar_nodes:
-            formatted += f"## {node['nodeName']}\n"
-            formatted += f"Similarity Score: {node['score']}\n"
-            node_data = await self.graph_ops.get_node_data(node['nodeName'], self.user_id)
-            formatted += f"Perspective: {node_data.perspective}\n"
-            formatted += f"Properties: {', '.join([f'{k}: {v}' for k, v in node_data.properties.items()])}\n\n"
-        print(f"Vector context: {formatted}")
-        return formatted
-
-    async def query_vector_only(self, query: str) -> str:
+            node_data = nodes.get(node['nodeName'])
+            if node_data is None:
+                continue
+            assembler.add_node(node['nodeName'], node_data.perspective, node_data.properties, node['score'])
+        logger.debug("Vector context built for %d nodes", len(similar_nodes))
+        AccessTracker.record(self.user_id, list(assembler.nodes), self.graph_ops.backend)
+        return self._assemble(assembler).text
+
+    async def query_vector_only(self, query: str, bypass_cache: bool = False) -> str:
+        return await self._cached_answer("vector", query, bypass_cache, self._answer_with_vectors)
+
+    async def _answer_with_vectors(self, query: str) -> str:
         similar_nodes = await self.graph_ops.perform_similarity_search(query, self.user_id)
         context = await self.format_vector_context(similar_nodes['results'])
         response = await generate_response_with_context(query, context)
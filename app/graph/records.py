@@ -0,0 +1,64 @@
+"""
+Internal row types for graph reads.
+
+Rows from the backends are wrapped in these NamedTuples instead of validated
+Pydantic models: they are built per node and per edge in the retrieval hot
+loop, and the data was already validated on its way into the graph. Pydantic
+models (`app.utils.models`) are for the HTTP boundary; convert with
+`to_model` where a record leaves through the API.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.utils.models import NodeModel, RelationshipModel
+
+
+class NodeRecord(NamedTuple):
+    name: str
+    perspective: str
+    properties: Dict[str, Any]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "NodeRecord":
+        return cls(row["name"], row.get("perspective") or "", row.get("properties") or {})
+
+    def to_model(self) -> NodeModel:
+        return NodeModel(name=self.name, perspective=self.perspective, properties=self.properties)
+
+
+class EdgeRecord(NamedTuple):
+    source: str
+    target: str
+    relation: str
+    value: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "EdgeRecord":
+        return cls(row["source"], row["target"], row["relation"], row.get("value"))
+
+    def to_model(self) -> RelationshipModel:
+        return RelationshipModel(source=self.source, target=self.target, relation=self.relation)
+
+
+class NeighborRecord(NamedTuple):
+    """One entry of a node's neighbourhood digest, as of the last write that touched the node."""
+    name: str
+    relation: str
+    value: Optional[str]
+    outgoing: bool
+    perspective: str
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "NeighborRecord":
+        return cls(row["name"], row["relation"], row.get("value"), row["outgoing"], row.get("perspective") or "")
+
+
+class DigestRecord(NamedTuple):
+    """A node with its neighbourhood digest; `neighbors` is None if the digest hasn't been built."""
+    node: NodeRecord
+    neighbors: Optional[List[NeighborRecord]]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "DigestRecord":
+        neighbors = row.get("neighbors")
+        return cls(NodeRecord.from_row(row),
+                   None if neighbors is None else [NeighborRecord.from_row(neighbor) for neighbor in neighbors])
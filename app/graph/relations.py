@@ -0,0 +1,67 @@
+"""
+Relationship type vocabulary.
+
+Relations produced by the LLM or sent by clients are free text ("is a type
+of", "Utilizes", "loves"). They are stored as real Neo4j relationship types,
+which must be safe to put into a query and should be few, so Neo4j can select
+relationships by type. `canonical_relation` sanitizes a relation to an
+UPPER_SNAKE_CASE type and folds known synonyms into one canonical type; the
+original text is kept in the relationship's `value`.
+"""
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+MAX_RELATION_LENGTH = 64
+DEFAULT_RELATION = "RELATED_TO"
+
+# Canonical type -> synonyms (already sanitized) that are stored as that type
+VOCABULARY: Dict[str, List[str]] = {
+    "LIKES": ["LOVES", "ENJOYS", "PREFERS", "IS_FOND_OF", "FAVORS", "FAVOURS"],
+    "DISLIKES": ["HATES", "DETESTS", "IS_NOT_FOND_OF"],
+    "INTERESTED_IN": ["IS_INTERESTED_IN", "CURIOUS_ABOUT", "IS_CURIOUS_ABOUT", "EXPLORES", "EXPLORING"],
+    "STUDIES": ["LEARNS", "LEARNING", "IS_LEARNING", "STUDYING", "IS_STUDYING"],
+    "KNOWS": ["IS_FRIENDS_WITH", "FRIENDS_WITH", "ACQUAINTED_WITH"],
+    "WORKS_AT": ["WORKS_FOR", "EMPLOYED_BY", "IS_EMPLOYED_BY", "EMPLOYED_AT"],
+    "WORKS_ON": ["IS_WORKING_ON", "WORKING_ON", "CONTRIBUTES_TO"],
+    "USES": ["UTILIZES", "UTILISES", "EMPLOYS", "IS_USING", "USING", "RELIES_ON"],
+    "PART_OF": ["IS_PART_OF", "BELONGS_TO", "MEMBER_OF", "IS_MEMBER_OF", "COMPONENT_OF"],
+    "IS_A": ["IS_A_TYPE_OF", "TYPE_OF", "IS_TYPE_OF", "KIND_OF", "IS_A_KIND_OF", "INSTANCE_OF", "IS_AN", "SUBCLASS_OF"],
+    "HAS": ["OWNS", "POSSESSES", "CONTAINS", "INCLUDES"],
+    "LOCATED_IN": ["LIVES_IN", "BASED_IN", "IS_LOCATED_IN", "IS_IN", "RESIDES_IN"],
+    "ENABLES": ["ALLOWS", "FACILITATES", "MAKES_POSSIBLE"],
+    "INFLUENCES": ["AFFECTS", "IMPACTS", "SHAPES"],
+    "RELATED_TO": ["IS_RELATED_TO", "RELATES_TO", "ASSOCIATED_WITH", "IS_ASSOCIATED_WITH", "CONNECTED_TO",
+                   "IS_CONNECTED_TO", "LINKED_TO", "IS_LINKED_TO"],
+}
+
+RELATION_TYPES = list(VOCABULARY)
+_SYNONYMS = {synonym: canonical for canonical, synonyms in VOCABULARY.items() for synonym in synonyms}
+_NON_WORD = re.compile(r"[^A-Z0-9]+")
+
+
+def sanitize_relation(relation: str) -> str:
+    """UPPER_SNAKE_CASE with only ASCII letters, digits and underscores, never starting with a digit."""
+    sanitized = _NON_WORD.sub("_", relation.upper()).strip("_")[:MAX_RELATION_LENGTH].rstrip("_")
+    if not sanitized:
+        return DEFAULT_RELATION
+    return f"R_{sanitized}" if sanitized[0].isdigit() else sanitized
+
+
+@lru_cache(maxsize=4096)
+def canonical_relation(relation: Optional[str]) -> str:
+    """
+    The relationship type to store `relation` under: sanitized, mapped through
+    the synonym vocabulary and interned, so repeated relations share one string.
+    Relations outside the vocabulary keep their sanitized form.
+    """
+    sanitized = sanitize_relation(relation or "")
+    return sys.intern(_SYNONYMS.get(sanitized, sanitized))
+
+
+def canonical_relations(relations: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """Canonical, de-duplicated, sorted types for a relation filter; None means no filter."""
+    if relations is None:
+        return None
+    return sorted({canonical_relation(relation) for relation in relations})
@@ -1,28 +1,55 @@
 # main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from contextlib import asynccontextmanager
-from app.graph.neo4j_database import Neo4jConnectionManager
+from app.graph.backend import get_graph_backend, close_graph_backend
+from app.graph.compaction import AccessTracker, CompactionScheduler
 
 from app.routers.graph_api import router as graph_ops_router
+from app.routers.metrics import router as metrics_router
 from app.config import BaseConfig
+from app.utils.log_config import configure_logging
+from app.utils.tracing import start_trace
+from app.utils.cache import close_cache_backend
+from app.utils.admission import admission_control
 
 config = BaseConfig()
-
-app = FastAPI(
-    title=config.INFO.title,
-    description=config.INFO.description,
-    version=config.INFO.version
-)
+configure_logging()
 
 @asynccontextmanager
 async def app_lifespan(app):
-    neo4j_manager = Neo4jConnectionManager()
+    # Connect and check the schema once per process, before serving requests.
+    backend = get_graph_backend()
     try:
-        await neo4j_manager.wait_for_neo4j()
+        await backend.wait_until_ready()
+        CompactionScheduler.start(backend)
         yield
     finally:
-        await neo4j_manager.close()
+        await CompactionScheduler.stop()
+        await AccessTracker.flush_all(backend)
+        await backend.close()
+        await close_graph_backend()
+        await close_cache_backend()
+
+app = FastAPI(
+    title=config.INFO.title,
+    description=config.INFO.description,
+    version=config.INFO.version,
+    lifespan=app_lifespan
+)
+
+# Registered first so that it runs inside the tracing middleware and rejections are traced too
+app.middleware("http")(admission_control)
 
-app.lifespan = app_lifespan
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID")
+    with start_trace(f"{request.method} {request.url.path}", request_id=request_id) as trace:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = trace.request_id
+    # The stage breakdown is internal, so clients may only ask for it where that is enabled
+    if config.TELEMETRY.DEBUG_TIMING or (config.TELEMETRY.ALLOW_DEBUG_TIMING_HEADER and request.headers.get("X-Debug-Timing")):
+        response.headers["X-Debug-Timing"] = trace.debug_timing_header()
+    return response
 
-app.include_router(graph_ops_router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(graph_ops_router, prefix="/api/v1")
+app.include_router(metrics_router)
\ No newline at end of file
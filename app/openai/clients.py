@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+import openai
+
+from app.config import config
+
+
+@lru_cache(maxsize=None)
+def get_openai_client() -> openai.OpenAI:
+    """The process-wide synchronous OpenAI client, built on first use."""
+    return openai.OpenAI(api_key=config.MACHINE_LEARNING.OPENAI_KEY, base_url=config.MACHINE_LEARNING.OPENAI_BASE_URL,
+                         max_retries=0)
+
+
+@lru_cache(maxsize=None)
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """
+    The process-wide async OpenAI client, built on first use. Retries and
+    timeouts are left to the scheduler in `app.openai.scheduler`.
+    """
+    return openai.AsyncOpenAI(api_key=config.MACHINE_LEARNING.OPENAI_KEY, base_url=config.MACHINE_LEARNING.OPENAI_BASE_URL,
+                              max_retries=0)
+
+
+@lru_cache(maxsize=None)
+def get_instructor_client():
+    """The async OpenAI client patched by instructor for structured outputs, built on first use."""
+    # instructor is slow to import and only needed for graph generation, so defer it.
+    import instructor
+    return instructor.from_openai(get_async_openai_client())
@@ -1,18 +1,25 @@
-import openai
 from typing import List, Dict, Any
-import json
-from app.config import config
+import logging
+from app.openai.clients import get_async_openai_client
+from app.openai.scheduler import LLMSchedulerError, get_llm_scheduler
+from app.utils.metrics import instrumented
+from app.utils.tokens import count_tokens
 
-# openai.api_key = config.MACHINE_LEARNING.OPENAI_KEY
-openai_client = openai.Client(api_key=config.MACHINE_LEARNING.OPENAI_KEY)
+logger = logging.getLogger(__name__)
 
-def generate_embeddings(texts, model="text-embedding-3-small"):
+@instrumented("openai", "embeddings")
+async def generate_embeddings(texts, model="text-embedding-3-small"):
     try:
         # Takes in a list of strings and returns a list of embeddings
-        response = openai_client.embeddings.create(input=texts, model=model, dimensions=1536)
+        response = await get_llm_scheduler().run(
+            lambda: get_async_openai_client().embeddings.create(input=texts, model=model, dimensions=1536),
+            estimated_tokens=sum(count_tokens(text) for text in texts)
+        )
         embeddings = [data.embedding for data in response.data]
         
         return embeddings
+    except LLMSchedulerError:
+        raise
     except Exception as e:
-        print(f"Error generating embeddings: {e}")
+        logger.error("Error generating embeddings: %s", e)
         return [None] * len(texts)  # Return a list of Nones to maintain alignment with input texts
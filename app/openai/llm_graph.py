@@ -1,93 +1,169 @@
 import json
+import logging
 import openai
-from typing import List, Tuple, Dict
-from app.openai.prompts import GET_ENTITIES, GET_NODES_AND_RELATIONSHIPS
+from typing import List, Optional, Tuple, Dict
+from app.openai.prompts import DECOMPOSE_QUERY, GET_ENTITIES, GET_NODES_AND_RELATIONSHIPS, SUMMARIZE_CLUSTER
 from app.utils.models import EntityExtractionResponse, NodesAndRelationshipsResponse
-from app.config import config
-import instructor
-from instructor import OpenAISchema
-from pydantic import Field
-from app.utils.instructions_reader import INSTRUCTIONS
-
-# Initialize the OpenAI client globally if not already set up elsewhere in your application
-print(f"OpenAI Key: {config.MACHINE_LEARNING.OPENAI_KEY}")
-openai_client = openai.AsyncOpenAI(api_key=config.MACHINE_LEARNING.OPENAI_KEY)
-client = instructor.from_openai(openai_client)
-
-class Node(OpenAISchema):
+from pydantic import BaseModel, Field
+from app.openai.clients import get_async_openai_client, get_instructor_client
+from app.openai.scheduler import LLMSchedulerError, get_llm_scheduler
+from app.utils.instructions_reader import build_system_prompt
+from app.utils.metrics import instrumented
+from app.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Completion tokens charged to the tokens-per-minute budget before the real usage is known.
+EXPECTED_COMPLETION_TOKENS = 500
+
+class Node(BaseModel):
     name: str
     perspective: str
 
-class Relationship(OpenAISchema):
+class Relationship(BaseModel):
     source: str
     relation: str
     target: str
 
-class GraphResponse(OpenAISchema):
+class GraphResponse(BaseModel):
     nodes: List[Node] = Field(..., description="List of nodes in the graph")
     relationships: List[Relationship] = Field(default_factory=list, description="List of relationships between nodes")
 
+class SubQueries(BaseModel):
+    queries: List[str] = Field(..., description="Self-contained search queries, one per topic of the question")
+
+@instrumented("openai")
 async def get_entities(text: str) -> Dict[str, List[str]]:
     """
     Extract entities from provided text using OpenAI's language model.
     """
     try:
-        combined_instructions = f"App Objective: {INSTRUCTIONS}\n\nEntity Extraction Task: {GET_ENTITIES}"
-        print("Open AI key ", config.MACHINE_LEARNING.OPENAI_KEY)
-        response = await openai_client.chat.completions.create(
-            model='gpt-3.5-turbo-0125',
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": combined_instructions},
-                {"role": "user", "content": text}
-            ],
-            temperature=0.5
+        combined_instructions = build_system_prompt("Entity Extraction Task", GET_ENTITIES)
+        response = await get_llm_scheduler().run(
+            lambda: get_async_openai_client().chat.completions.create(
+                model='gpt-3.5-turbo-0125',
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": combined_instructions},
+                    {"role": "user", "content": text}
+                ],
+                temperature=0.5
+            ),
+            estimated_tokens=count_tokens(combined_instructions) + count_tokens(text) + EXPECTED_COMPLETION_TOKENS
         )
         # Extract entities from response, assuming the expected format is JSON
         content = response.choices[0].message.content
-        print("Content: ", content)
         entities = json.loads(content)
-        # print(f"Extracted entities: {entities['entities']}")
         return entities
     except json.JSONDecodeError as e:
-        print(f"Error decoding JSON: {e}")
+        logger.error("Error decoding JSON: %s", e)
         return {"entities": []}
-    except openai.error.AuthenticationError as e:
-        print(f"OpenAI Authentication Error: {e}")
+    except LLMSchedulerError:
+        raise
+    except openai.AuthenticationError as e:
+        logger.error("OpenAI Authentication Error: %s", e)
         return {"entities": []}
     except Exception as e:
-        print(f"Error while extracting entities: {e}")
+        logger.error("Error while extracting entities: %s", e)
         return {"entities": []}
 
-async def get_nodes_and_relationships(entities: List[str], graph_context: str) -> GraphResponse:
+@instrumented("openai")
+async def get_nodes_and_relationships(entities: List[str], graph_context: str) -> Tuple[List[Node], List[Relationship]]:
     """
     Generate nodes and relationships based on the list of entities and existing graph context using OpenAI's language model.
     """
     entities_str = ', '.join(entities)
-    combined_instructions = f"App Objective: {INSTRUCTIONS}\n\nEntity Extraction Task: {GET_ENTITIES}"
+    combined_instructions = build_system_prompt("Entity Extraction Task", GET_ENTITIES)
+    user_message = f"Existing Graph Context:\n{graph_context}\n\nNew Entities: {entities_str}"
     try:
-        response = await client.chat.completions.create(
-            model='gpt-4-turbo',
-            messages=[
-                {"role": "system", "content": combined_instructions},
-                {"role": "user", "content": f"Existing Graph Context:\n{graph_context}\n\nNew Entities: {entities_str}"}
-                
-            ],
-            temperature=0.7,
-            response_model=GraphResponse
+        response = await get_llm_scheduler().run(
+            lambda: get_instructor_client().chat.completions.create(
+                model='gpt-4-turbo',
+                messages=[
+                    {"role": "system", "content": combined_instructions},
+                    {"role": "user", "content": user_message}
+                ],
+                temperature=0.7,
+                response_model=GraphResponse
+            ),
+            estimated_tokens=count_tokens(combined_instructions) + count_tokens(user_message) + EXPECTED_COMPLETION_TOKENS
         )
         nodes = response.nodes
         relationships = response.relationships
-        print(f"Generated nodes: {nodes}")
-        print(f"Generated relationships: {relationships}")
+        logger.debug("Generated %d nodes and %d relationships", len(nodes), len(relationships))
         return nodes, relationships
-    except openai.error.AuthenticationError as e:
-        print(f"OpenAI Authentication Error: {e}")
-        return GraphResponse(nodes=[], relationships=[])
+    except LLMSchedulerError:
+        raise
+    except openai.AuthenticationError as e:
+        logger.error("OpenAI Authentication Error: %s", e)
+        return [], []
     except Exception as e:
-        print(f"Error while generating nodes and relationships: {e}")
-        return GraphResponse(nodes=[], relationships=[])
+        logger.error("Error while generating nodes and relationships: %s", e)
+        return [], []
 
+@instrumented("openai")
+async def summarize_cluster(hub: str, members: List[Dict[str, str]]) -> Optional[Node]:
+    """
+    Summarize rarely used nodes that all hang off `hub` into a single node that
+    keeps what they say about the user. Each member has `name`, `perspective`
+    and `relation` (how it relates to the hub). Returns None if the call fails.
+    """
+    lines = "\n".join(f"- {m['relation']} {m['name']}: {m['perspective']}" for m in members)
+    user_message = f"Node: {hub}\nRelated nodes:\n{lines}"
+    try:
+        response = await get_llm_scheduler().run(
+            lambda: get_instructor_client().chat.completions.create(
+                model='gpt-3.5-turbo-0125',
+                messages=[
+                    {"role": "system", "content": SUMMARIZE_CLUSTER},
+                    {"role": "user", "content": user_message}
+                ],
+                temperature=0.3,
+                response_model=Node
+            ),
+            estimated_tokens=count_tokens(SUMMARIZE_CLUSTER) + count_tokens(user_message) + EXPECTED_COMPLETION_TOKENS
+        )
+        return response
+    except LLMSchedulerError:
+        raise
+    except openai.AuthenticationError as e:
+        logger.error("OpenAI Authentication Error: %s", e)
+        return None
+    except Exception as e:
+        logger.error("Error while summarizing nodes around %s: %s", hub, e)
+        return None
+
+@instrumented("openai")
+async def generate_sub_queries(query: str, max_queries: int) -> List[str]:
+    """
+    Split a compound question into at most `max_queries` search queries, one
+    per topic it asks about. Returns an empty list if the call fails.
+    """
+    system_prompt = f"{DECOMPOSE_QUERY}\nReturn at most {max_queries} queries."
+    try:
+        response = await get_llm_scheduler().run(
+            lambda: get_instructor_client().chat.completions.create(
+                model='gpt-3.5-turbo-0125',
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": query}
+                ],
+                temperature=0,
+                response_model=SubQueries
+            ),
+            estimated_tokens=count_tokens(system_prompt) + count_tokens(query) + EXPECTED_COMPLETION_TOKENS
+        )
+        return [q.strip() for q in response.queries if q.strip()][:max_queries]
+    except LLMSchedulerError:
+        raise
+    except openai.AuthenticationError as e:
+        logger.error("OpenAI Authentication Error: %s", e)
+        return []
+    except Exception as e:
+        logger.error("Error while decomposing query: %s", e)
+        return []
+
+@instrumented("openai")
 async def generate_response_with_context(query: str, context: str) -> str:
     prompt = f"""
     Given the following context from a knowledge graph and a query, provide a detailed answer:
@@ -100,13 +176,16 @@ async def generate_response_with_context(query: str, context: str) -> str:
     Please provide a comprehensive answer based on the given context:
     """
 
-    response = await openai_client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "user", "content": prompt},
-            {"role": "system", "content": "You are a helpful assistant that answers queries about a user based on the provided context from their graph."},
-            
-        ]
+    system_prompt = "You are a helpful assistant that answers queries about a user based on the provided context from their graph."
+    response = await get_llm_scheduler().run(
+        lambda: get_async_openai_client().chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "user", "content": prompt},
+                {"role": "system", "content": system_prompt},
+            ]
+        ),
+        estimated_tokens=count_tokens(prompt) + count_tokens(system_prompt) + EXPECTED_COMPLETION_TOKENS
     )
     return response.choices[0].message.content
 
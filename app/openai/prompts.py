@@ -2,6 +2,7 @@
 PROMPTS USED FOR LLMs
 - OpenAI 
 """
+from app.graph.relations import RELATION_TYPES
 
 sample_statements = [
     "I've recently started exploring blockchain technology and its implications on financial systems.",
@@ -166,10 +167,10 @@ Example Response Format:
   ],
   "relationships": [
     {"source": "Blockchain", "relation": "ENABLES", "target": "Cryptocurrency"},
-    {"source": "Blockchain", "relation": "UTILIZES", "target": "Smart Contracts"},
+    {"source": "Blockchain", "relation": "USES", "target": "Smart Contracts"},
     {"source": "Blockchain", "relation": "PROMOTES", "target": "Decentralization"},
     {"source": "Ethereum", "relation": "IMPLEMENTS", "target": "Smart Contracts"},
-    {"source": "Ethereum", "relation": "IS_A_TYPE_OF", "target": "Cryptocurrency"}
+    {"source": "Ethereum", "relation": "IS_A", "target": "Cryptocurrency"}
   ]
 }
 
@@ -178,4 +179,17 @@ Ensure that your response:
 2. Captures the user's personal perspective on each node.
 3. Creates relationships only between the nodes generated from the extracted entities.
 4. Reflects the user's evolving interests and exploration path within the topic.
-"""
\ No newline at end of file
+5. Uses one of these relation types whenever one fits, and a short UPPER_SNAKE_CASE verb otherwise: """ + ", ".join(RELATION_TYPES) + "\n"
+
+SUMMARIZE_CLUSTER = """
+You maintain a personal knowledge graph for a user. The nodes listed below are rarely used details that all relate to one node.
+Replace them with a single summary node:
+1. "name": a short, specific name for what the details have in common, e.g. "Italian Cooking Recipes", not "Summary".
+2. "perspective": one or two sentences capturing the user's view of these details, keeping the specific names that matter.
+"""
+
+DECOMPOSE_QUERY = """
+You help search a personal knowledge graph about a user. Split the user's question into separate search queries, one per topic it asks about,
+so that each can be looked up on its own. Each query must make sense without the others, e.g. "How do my space interests relate to my teaching?"
+becomes "my interest in space" and "my teaching". Return the question itself as the only query if it is about a single topic.
+"""
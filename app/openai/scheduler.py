@@ -0,0 +1,240 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+from prometheus_client import Counter, Gauge
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LLM_RETRIES = Counter(
+    "persona_graph_llm_retries_total",
+    "OpenAI calls retried by the scheduler, by reason",
+    ["reason"],
+)
+LLM_WAITING = Gauge(
+    "persona_graph_llm_waiting",
+    "OpenAI calls waiting for a concurrency slot, by priority lane",
+    ["priority"],
+)
+
+
+class Priority(IntEnum):
+    """Scheduling lanes; lower values are served first."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """Run the OpenAI calls made inside this block, and the tasks it starts, in the given lane."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class LLMSchedulerError(Exception):
+    """An OpenAI call that still failed after the scheduler's retries."""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMRateLimitError(LLMSchedulerError):
+    """OpenAI kept rate limiting the call."""
+    status_code = 429
+
+
+class LLMUnavailableError(LLMSchedulerError):
+    """OpenAI kept timing out or failing with server errors."""
+    status_code = 503
+
+
+class TokenBucket:
+    """
+    A bucket refilled continuously at `per_minute / 60` per second up to
+    `per_minute`. Callers wait until the amount they need is available.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available; takes them and returns 0 if they already are."""
+        amount = min(amount, self.capacity)
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class LLMScheduler:
+    """
+    Shared gate for every OpenAI call in the process.
+
+    Calls take one of `max_concurrency` slots, handed out by priority lane and
+    then arrival order, so interactive RAG queries overtake queued background
+    ingestion. Each call then waits for request and token budget from the
+    requests-per-minute and tokens-per-minute buckets, runs with a timeout,
+    and is retried with full-jitter exponential backoff on rate limits,
+    timeouts, connection errors and server errors.
+    """
+
+    RETRYABLE = (
+        openai.RateLimitError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+        asyncio.TimeoutError,
+    )
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float, tokens_per_minute: float,
+                 timeout: float, max_retries: int, backoff_base: float = 0.5, backoff_max: float = 20.0):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._active = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._budget_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def _slot(self, priority: Priority):
+        if self._active < self.max_concurrency and not self._waiting:
+            self._active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            entry = [priority, next(self._sequence), future]
+            heapq.heappush(self._waiting, entry)
+            LLM_WAITING.labels(priority.name.lower()).inc()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()  # The slot was handed over just as we were cancelled
+                elif entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                raise
+            finally:
+                LLM_WAITING.labels(priority.name.lower()).dec()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        # Hand the slot straight to the best waiter so nobody can overtake it
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    async def _take_budget(self, estimated_tokens: int) -> None:
+        async with self._budget_lock:
+            while True:
+                wait = self.requests.wait_time(1)
+                if wait == 0:
+                    wait = self.tokens.wait_time(estimated_tokens)
+                    if wait == 0:
+                        return
+                    self.requests.tokens += 1  # Give the request back until the tokens are there too
+                await asyncio.sleep(wait)
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, self.retry_after(error) or 0.0)
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        value = response.headers.get("retry-after") if response is not None else None
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    async def run(self, call: Callable[[], Awaitable[T]], estimated_tokens: int = 0,
+                  priority: Optional[Priority] = None, timeout: Optional[float] = None) -> T:
+        """
+        Run `call` (a function returning a fresh awaitable for each attempt)
+        through the scheduler.
+
+        Args:
+        - call (Callable): Makes the OpenAI request.
+        - estimated_tokens (int): Prompt plus expected completion tokens, charged to the tokens-per-minute bucket.
+        - priority (Priority): The lane; defaults to the one set with `llm_priority`, else interactive.
+        - timeout (float): Seconds per attempt, defaults to the configured timeout.
+
+        Returns:
+        - The call's result. Raises `LLMRateLimitError` or `LLMUnavailableError` once retries run out.
+        """
+        priority = _priority.get() if priority is None else priority
+        timeout = timeout or self.timeout
+        for attempt in range(self.max_retries + 1):
+            async with self._slot(priority):
+                await self._take_budget(estimated_tokens)
+                try:
+                    return await asyncio.wait_for(call(), timeout)
+                except self.RETRYABLE as e:
+                    error = e
+            reason = "timeout" if isinstance(error, asyncio.TimeoutError) else type(error).__name__
+            if attempt == self.max_retries:
+                break
+            delay = self.backoff(attempt, error)
+            LLM_RETRIES.labels(reason).inc()
+            logger.warning("OpenAI call failed (%s), retry %d/%d in %.2fs", reason, attempt + 1, self.max_retries, delay)
+            await asyncio.sleep(delay)
+
+        retry_after = self.retry_after(error) or self.backoff_max
+        if isinstance(error, openai.RateLimitError):
+            raise LLMRateLimitError("OpenAI rate limit exceeded, try again later", retry_after) from error
+        raise LLMUnavailableError(f"OpenAI is unavailable ({reason}), try again later", retry_after) from error
+
+
+@lru_cache(maxsize=None)
+def get_llm_scheduler() -> LLMScheduler:
+    """The process-wide scheduler, built from `config.MACHINE_LEARNING` on first use."""
+    ml = config.MACHINE_LEARNING
+    return LLMScheduler(
+        max_concurrency=ml.OPENAI_MAX_CONCURRENCY,
+        requests_per_minute=ml.OPENAI_REQUESTS_PER_MINUTE,
+        tokens_per_minute=ml.OPENAI_TOKENS_PER_MINUTE,
+        timeout=ml.OPENAI_TIMEOUT_SECONDS,
+        max_retries=ml.OPENAI_MAX_RETRIES,
+    )
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException, status
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from app.graph.graph_ops import GraphOps
 from app.utils.models import NodeModel, RelationshipModel, GraphUpdateModel
 from app.graph.constructor import GraphConstructor
@@ -6,15 +8,29 @@ from app.openai.prompts import sample_statements, ASTRONAUT_PROMPT, SPACE_SCHOOL
 from app.utils.models import UnstructuredData
 from app.graph.constructor import GraphContextRetriever
 from app.graph.rag_interface import RAGInterface
-from app.utils.models import UserCreate, IngestData, RAGQuery, RAGResponse
+from app.utils.models import UserCreate, IngestData, RAGQuery, RAGResponse, RAGBatchQuery, RAGBatchResponse, JobStatus
 from app.api.user_service import UserService
 from app.api.ingest_service import IngestService
 from app.api.rag_service import RAGService
+from app.api.job_service import JobService
+from app.api.graph_io_service import GraphIOService
+from app.api.graph_service import GraphService
+from app.graph.graph_io import GraphImportError
+from app.openai.scheduler import LLMSchedulerError
+from app.config import config
 import random
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def llm_unavailable(e: LLMSchedulerError) -> HTTPException:
+    """429 or 503 with a Retry-After header when OpenAI is still rate limiting or failing after retries."""
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+
+
 @router.post("/users", status_code=201)
 async def create_user(user: UserCreate):
     try:
@@ -23,27 +39,106 @@ async def create_user(user: UserCreate):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.delete("/users/{user_id}")
+@router.delete("/users/{user_id}", status_code=202)
 async def delete_user(user_id: str):
     try:
-        await UserService.delete_user(user_id)
-        return {"message": f"User {user_id} deleted successfully"}
+        job = UserService.start_delete_user(user_id)
+        return {"message": f"Deletion of user {user_id} started", "job_id": job.job_id}
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@router.get("/users/{user_id}/graph/export")
+async def export_graph(user_id: str):
+    try:
+        lines = await GraphIOService.export_graph(user_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(lines, media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{user_id}.ndjson"'})
+
+@router.post("/users/{user_id}/graph/import")
+async def import_graph(user_id: str, request: Request):
+    try:
+        counts = await GraphIOService.import_graph(user_id, request.stream())
+        return {"message": f"Graph imported for user {user_id}", **counts}
+    except GraphImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/users/{user_id}/graph/compact", status_code=202)
+async def compact_graph(user_id: str):
+    try:
+        job = await GraphService.start_compaction(user_id)
+        return {"message": f"Compaction of user {user_id} started", "job_id": job.job_id}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = JobService.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
 @router.post("/ingest/{user_id}")
 async def ingest_data(user_id: str, data: IngestData):
     try:
         await IngestService.ingest_data(user_id, data.content)
         return {"message": "Data ingested successfully"}
+    except LLMSchedulerError as e:
+        raise llm_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.patch("/graph/{user_id}")
+async def patch_graph(user_id: str, graph_update: GraphUpdateModel):
+    try:
+        counts = await GraphService.apply_update(user_id, graph_update)
+        return {"message": f"Graph updated for user {user_id}", **counts}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except LLMSchedulerError as e:
+        raise llm_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/graph/{user_id}/{kind}")
+async def get_graph_page(user_id: str, kind: Literal["nodes", "relationships"], cursor: Optional[str] = None,
+                         limit: int = Query(config.GRAPH.PAGE_SIZE, ge=1, le=1000),
+                         relation: Optional[List[str]] = Query(None, description="Only relationships of these types")):
+    try:
+        return await GraphService.get_page(user_id, kind, cursor, limit, relation)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/graph/{user_id}/{kind}/stream")
+async def stream_graph(user_id: str, kind: Literal["nodes", "relationships"]):
+    try:
+        chunks = await GraphService.stream(user_id, kind)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(chunks, media_type="application/json")
+
 @router.post("/rag/{user_id}/query", response_model=RAGResponse)
 async def rag_query(user_id: str, query: RAGQuery):
     try:
-        result = await RAGService.query(user_id, query.query)
+        result = await RAGService.query(user_id, query.query, bypass_cache=query.bypass_cache,
+                                        relation_types=query.relation_types, decompose=query.decompose)
         return RAGResponse(answer=result)
+    except LLMSchedulerError as e:
+        raise llm_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/rag/{user_id}/query/batch", response_model=RAGBatchResponse)
+async def rag_query_batch(user_id: str, batch: RAGBatchQuery):
+    try:
+        answers = await RAGService.query_many(user_id, batch.queries, bypass_cache=batch.bypass_cache,
+                                              relation_types=batch.relation_types, decompose=batch.decompose)
+        return RAGBatchResponse(answers=answers)
+    except LLMSchedulerError as e:
+        raise llm_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -61,17 +156,17 @@ async def test_constructor_flow():
             context_retriever = GraphContextRetriever(graph_constructor.graph_ops)
 
             # Ensure vector index exists
-            await graph_constructor.graph_ops.neo4j_manager.ensure_vector_index()
+            await graph_constructor.graph_ops.backend.ensure_vector_index()
 
             # Clean up the graph first
-            print("Cleaning graph for user:", user_id)
+            logger.info("Cleaning graph for user: %s", user_id)
             await graph_constructor.clean_graph()
             # Recreate the vector index after cleaning
-            await graph_constructor.graph_ops.neo4j_manager.ensure_vector_index()
+            await graph_constructor.graph_ops.backend.ensure_vector_index()
 
             # # Process each sample statement
             # for statement in sample_statements:
-            #     print(f"Processing text: {statement}")
+            #     logger.info("Processing text: %s", statement)
             #     # Create UnstructuredData object
             #     data = UnstructuredData(title="Sample Statement", content=statement)
                 
@@ -80,7 +175,7 @@ async def test_constructor_flow():
 
             #Process Astronaut Chat
 
-            print(f"Processing text: {SPACE_SCHOOL_CHAT}")
+            logger.info("Processing sample chat (%d characters)", len(SPACE_SCHOOL_CHAT))
             # Create UnstructuredData object
             data = UnstructuredData(title="Sample Statement", content=SPACE_SCHOOL_CHAT)
             
@@ -88,42 +183,46 @@ async def test_constructor_flow():
             await graph_constructor.process_unstructured_data(data)
 
             
-            # Retrieve and print the updated graph context
-            print("Retrieving updated graph context...")
+            # Retrieve and log the updated graph context
+            logger.info("Retrieving updated graph context...")
             context = await graph_constructor.get_graph_context("Technology")
-            print("Updated graph context:", context)
+            logger.debug("Updated graph context: %s", context)
 
             return {"status": "Graph updated successfully", "context": context}
 
     except Exception as e:
-        print(f"Error during constructor test flow: {e}")
+        logger.exception("Error during constructor test flow: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
     finally:
-        print("Closing graph constructor...")
+        logger.debug("Closing graph constructor...")
         await graph_constructor.close()
 
 
 @router.post("/rag-query", status_code=status.HTTP_200_OK)
-async def rag_query(query: str, user_id: str):
+async def rag_query(query: str, user_id: str, bypass_cache: bool = False):
     try:
         rag = RAGInterface(user_id)
-        response = await rag.query(query)
+        response = await rag.query(query, bypass_cache=bypass_cache)
         return {"query": query, "response": response}
+    except LLMSchedulerError as e:
+        raise llm_unavailable(e)
     except Exception as e:
-        print(f"Error during RAG query: {e}")
+        logger.exception("Error during RAG query: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         await rag.close()
 
 @router.post("/rag-query-vector", status_code=status.HTTP_200_OK)
-async def rag_query_vector(query: str, user_id: str):
+async def rag_query_vector(query: str, user_id: str, bypass_cache: bool = False):
     try:
         rag = RAGInterface(user_id)
-        response = await rag.query_vector_only(query)
+        response = await rag.query_vector_only(query, bypass_cache=bypass_cache)
         return {"query": query, "response": response}
+    except LLMSchedulerError as e:
+        raise llm_unavailable(e)
     except Exception as e:
-        print(f"Error during vector-only RAG query: {e}")
+        logger.exception("Error during vector-only RAG query: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         await rag.close()
\ No newline at end of file
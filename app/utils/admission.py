@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, Gauge
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "persona_graph_admission_in_flight",
+    "Requests being served, by route class",
+    ["route_class"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "persona_graph_admission_queue_depth",
+    "Requests waiting for admission, by route class",
+    ["route_class"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "persona_graph_admission_rejections_total",
+    "Requests turned away by admission control, by route class and reason",
+    ["route_class", "reason"],
+)
+
+# (route class, method, path); the user comes from the path, or else the `user_id` query parameter.
+ROUTE_CLASSES = [
+    ("rag", "POST", re.compile(r"/api/v1/rag/(?P<user_id>[^/]+)/query(?:/batch)?")),
+    ("rag", "POST", re.compile(r"/api/v1/rag-query(?:-vector)?")),
+    ("ingest", "POST", re.compile(r"/api/v1/ingest/(?P<user_id>[^/]+)")),
+    ("ingest", "POST", re.compile(r"/api/v1/users/(?P<user_id>[^/]+)/graph/import")),
+    ("ingest", "PATCH", re.compile(r"/api/v1/graph/(?P<user_id>[^/]+)")),
+]
+
+
+class AdmissionRejected(Exception):
+    """A request turned away because its route class or its user is at the limit."""
+
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one route class.
+
+    At most `max_concurrency` requests are served at once and at most
+    `max_queue` wait for a slot; a request that finds the queue full, or
+    waits longer than `queue_timeout`, is rejected with 503. Each user may
+    have at most `max_per_user` requests served or waiting, beyond which
+    their requests are rejected with 429 without taking a queue place.
+
+    Args:
+    - route_class (str): Metrics label, e.g. "rag" or "ingest".
+    - max_concurrency (int): Requests served at once.
+    - max_queue (int): Requests allowed to wait for a slot.
+    - max_per_user (int): Requests of one user served or waiting at once.
+    - queue_timeout (float): Seconds a request may wait for a slot.
+    """
+
+    # Smoothing of the service time estimate behind Retry-After
+    SERVICE_TIME_WEIGHT = 0.2
+
+    def __init__(self, route_class: str, max_concurrency: int, max_queue: int, max_per_user: int,
+                 queue_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.route_class = route_class
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._active = 0
+        self._waiting: Deque[asyncio.Future] = deque()
+        self._per_user: Dict[str, int] = {}
+        self.service_time = 1.0
+
+    def retry_after(self) -> float:
+        """Seconds until the current queue has likely drained, at the recent service time."""
+        return max(1.0, self.service_time * (len(self._waiting) + 1) / max(1, self.max_concurrency))
+
+    def _reject(self, reason: str, status_code: int, message: str) -> None:
+        ADMISSION_REJECTIONS.labels(self.route_class, reason).inc()
+        logger.warning("Rejected %s request (%s): %s", self.route_class, reason, message)
+        raise AdmissionRejected(message, status_code, self.retry_after())
+
+    @asynccontextmanager
+    async def admit(self, user_id: Optional[str] = None):
+        """Hold a slot for the duration of the block; raises `AdmissionRejected` instead of waiting too long."""
+        if user_id is not None and self._per_user.get(user_id, 0) >= self.max_per_user:
+            self._reject("user_limit", 429, f"Too many concurrent {self.route_class} requests for user {user_id}")
+        if self._active >= self.max_concurrency and len(self._waiting) >= self.max_queue:
+            self._reject("queue_full", 503, f"Too many {self.route_class} requests, try again later")
+        if user_id is not None:
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        try:
+            await self._acquire()
+            ADMISSION_IN_FLIGHT.labels(self.route_class).inc()
+            start = self._clock()
+            try:
+                yield
+            finally:
+                elapsed = self._clock() - start
+                self.service_time += self.SERVICE_TIME_WEIGHT * (elapsed - self.service_time)
+                ADMISSION_IN_FLIGHT.labels(self.route_class).dec()
+                self._release()
+        finally:
+            if user_id is not None:
+                remaining = self._per_user.pop(user_id) - 1
+                if remaining:
+                    self._per_user[user_id] = remaining
+
+    async def _acquire(self) -> None:
+        if self._active < self.max_concurrency and not self._waiting:
+            self._active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        ADMISSION_QUEUE_DEPTH.labels(self.route_class).inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._waiting.remove(future)
+                self._reject("queue_timeout", 503, f"Timed out waiting for a {self.route_class} slot, try again later")
+            # The slot was handed over just as the wait ran out
+        except asyncio.CancelledError:
+            if future.done():
+                self._release()
+            else:
+                self._waiting.remove(future)
+            raise
+        finally:
+            ADMISSION_QUEUE_DEPTH.labels(self.route_class).dec()
+
+    def _release(self) -> None:
+        # Hand the slot straight to the oldest waiter so nobody can overtake it
+        while self._waiting:
+            future = self._waiting.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+
+@lru_cache(maxsize=None)
+def get_admission_limiter(route_class: str) -> AdmissionLimiter:
+    """The process-wide limiter of a route class, built from `config.ADMISSION` on first use."""
+    prefix = route_class.upper()
+    settings = config.ADMISSION
+    return AdmissionLimiter(
+        route_class,
+        max_concurrency=getattr(settings, f"{prefix}_MAX_CONCURRENCY"),
+        max_queue=getattr(settings, f"{prefix}_MAX_QUEUE"),
+        max_per_user=getattr(settings, f"{prefix}_MAX_PER_USER"),
+        queue_timeout=getattr(settings, f"{prefix}_QUEUE_TIMEOUT_SECONDS"),
+    )
+
+
+def classify(request: Request) -> Optional[Tuple[str, Optional[str]]]:
+    """The route class and user of a request, or None for routes without admission control."""
+    for route_class, method, pattern in ROUTE_CLASSES:
+        match = pattern.fullmatch(request.url.path) if request.method == method else None
+        if match:
+            return route_class, match.groupdict().get("user_id") or request.query_params.get("user_id")
+    return None
+
+
+async def admission_control(request: Request, call_next):
+    """
+    HTTP middleware: RAG queries and ingestion-type writes are served through
+    separate limiters, so a burst of slow ingests can't take the event loop
+    and Neo4j pool away from interactive queries. Rejections are 429 (the
+    user is over their share) or 503 (the route class is saturated) with a
+    `Retry-After` header.
+    """
+    admission = classify(request) if config.ADMISSION.ENABLED else None
+    if admission is None:
+        return await call_next(request)
+    route_class, user_id = admission
+    limiter = get_admission_limiter(route_class)
+    try:
+        async with limiter.admit(user_id):
+            return await call_next(request)
+    except AdmissionRejected as e:
+        return JSONResponse({"detail": str(e)}, status_code=e.status_code,
+                            headers={"Retry-After": str(math.ceil(e.retry_after))})
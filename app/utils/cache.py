@@ -0,0 +1,241 @@
+"""
+Caches shared by the service.
+
+`TTLCache` is an in-process LRU. `Cache` is a named cache on a pluggable
+`CacheBackend` selected with `CACHE_BACKEND`: `memory` (a `TTLCache` per
+cache, private to the worker), `sqlite` (a database file every worker on the
+host shares) or `redis` (any server speaking the Redis protocol). Keys are
+strings, values anything JSON can encode, and a failing shared backend is
+treated as a miss rather than failing the request.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Protocol, Tuple, runtime_checkable
+
+from prometheus_client import Counter
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "persona_graph_cache_requests_total",
+    "Cache lookups by cache name and result",
+    ["cache", "result"],
+)
+
+
+class TTLCache:
+    """
+    A size-bounded LRU cache whose entries also expire after `ttl_seconds`.
+
+    Lookups and hits are counted in `persona_graph_cache_requests_total`
+    under the cache's `name`, unless `count_requests` is off.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic,
+                 count_requests: bool = True):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.count_requests = count_requests
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                if self.count_requests:
+                    CACHE_REQUESTS.labels(self.name, "miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        if self.count_requests:
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches `predicate`; returns how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@runtime_checkable
+class CacheBackend(Protocol):
+    """Storage for `Cache`; keys arrive already namespaced by the cache name."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        """The value, or None when missing or expired."""
+        ...
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """`get` for several keys in one round trip, in input order."""
+        ...
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None: ...
+
+    async def delete(self, keys: List[str]) -> None: ...
+
+    async def delete_prefix(self, prefix: str) -> int:
+        """Drop every key starting with `prefix`; returns how many were dropped."""
+        ...
+
+    async def close(self) -> None: ...
+
+
+class LRUCacheBackend:
+    """A `TTLCache` behind the `CacheBackend` interface; values are kept as they are, not copied."""
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self._cache = TTLCache("lru", max_entries, 0, clock=clock, count_requests=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        return [self._cache.get(key) for key in keys]
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        self._cache.set(key, value, ttl_seconds)
+
+    async def delete(self, keys: List[str]) -> None:
+        drop = set(keys)
+        self._cache.invalidate(lambda key: key in drop)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        return self._cache.invalidate(lambda key: key.startswith(prefix))
+
+    async def close(self) -> None:
+        self._cache.clear()
+
+
+class Cache:
+    """
+    A named cache: keys are namespaced with `name` on the shared backend and
+    lookups are counted in `persona_graph_cache_requests_total`.
+
+    Args:
+    - name (str): Namespace and metrics label.
+    - max_entries (int): Size bound of the in-process backend; 0 disables the cache on every backend.
+    - ttl_seconds (float): How long entries stay valid.
+    - backend (CacheBackend): Defaults to the one selected by `CACHE_BACKEND`.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float, backend: Optional[CacheBackend] = None):
+        self.name = name
+        self.enabled = max_entries > 0
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend or get_cache_backend(max_entries)
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            value = await self.backend.get(self._key(key))
+        except Exception as e:
+            logger.warning("Cache %s lookup failed: %s", self.name, e)
+            CACHE_REQUESTS.labels(self.name, "error").inc()
+            return None
+        CACHE_REQUESTS.labels(self.name, "miss" if value is None else "hit").inc()
+        return value
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """The cached values of `keys`, leaving out misses, from one lookup."""
+        if not self.enabled or not keys:
+            return {}
+        try:
+            values = await self.backend.get_many([self._key(key) for key in keys])
+        except Exception as e:
+            logger.warning("Cache %s lookup failed: %s", self.name, e)
+            CACHE_REQUESTS.labels(self.name, "error").inc(len(keys))
+            return {}
+        found = {key: value for key, value in zip(keys, values) if value is not None}
+        CACHE_REQUESTS.labels(self.name, "hit").inc(len(found))
+        CACHE_REQUESTS.labels(self.name, "miss").inc(len(keys) - len(found))
+        return found
+
+    async def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(self._key(key), value, self.ttl_seconds)
+        except Exception as e:
+            logger.warning("Cache %s write failed: %s", self.name, e)
+
+    async def delete(self, *keys: str) -> None:
+        try:
+            await self.backend.delete([self._key(key) for key in keys])
+        except Exception as e:
+            logger.warning("Cache %s delete failed: %s", self.name, e)
+
+    async def invalidate_prefix(self, prefix: str) -> int:
+        """Drop every entry whose key starts with `prefix`; returns how many were dropped."""
+        try:
+            return await self.backend.delete_prefix(self._key(prefix))
+        except Exception as e:
+            logger.warning("Cache %s invalidation failed: %s", self.name, e)
+            return 0
+
+    async def clear(self) -> None:
+        await self.invalidate_prefix("")
+
+
+_shared_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend(max_entries: int) -> CacheBackend:
+    """
+    The backend selected by `config.CACHE.BACKEND`. Each in-process cache gets
+    its own LRU of `max_entries`; the shared backends are one client per process.
+    """
+    global _shared_backend
+    backend = config.CACHE.BACKEND.lower()
+    if backend == "memory":
+        return LRUCacheBackend(max_entries)
+    if _shared_backend is None:
+        if backend == "sqlite":
+            from app.utils.sqlite_cache import SQLiteCacheBackend
+            _shared_backend = SQLiteCacheBackend(config.CACHE.SQLITE_PATH, config.CACHE.SQLITE_MAX_ENTRIES)
+        elif backend == "redis":
+            from app.utils.redis_cache import RedisCacheBackend
+            _shared_backend = RedisCacheBackend(config.CACHE.REDIS_URL)
+        else:
+            raise ValueError(f"Unknown cache backend: {config.CACHE.BACKEND}")
+    return _shared_backend
+
+
+async def close_cache_backend() -> None:
+    """Release the shared cache backend's connections; call once on shutdown."""
+    global _shared_backend
+    backend, _shared_backend = _shared_backend, None
+    if backend is not None:
+        await backend.close()
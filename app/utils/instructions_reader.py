@@ -1,5 +1,16 @@
-def read_instructions():
-    with open("INSTRUCTIONS.md", "r") as file:
+from functools import lru_cache
+
+from app.config import config
+
+
+@lru_cache(maxsize=1)
+def read_instructions() -> str:
+    """The app objective from INSTRUCTIONS.md, read once on first use."""
+    with open(config.INFO.instructions_path, "r") as file:
         return file.read()
 
-INSTRUCTIONS = read_instructions()
+
+@lru_cache(maxsize=None)
+def build_system_prompt(task_label: str, task_prompt: str) -> str:
+    """The app objective combined with a task prompt, assembled once per task."""
+    return f"App Objective: {read_instructions()}\n\n{task_label}: {task_prompt}"
@@ -0,0 +1,13 @@
+import logging
+
+from app.config import config
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def configure_logging() -> None:
+    """Configure the root logger once, using the level from the telemetry config."""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    logging.basicConfig(level=config.TELEMETRY.LOG_LEVEL.upper(), format=LOG_FORMAT)
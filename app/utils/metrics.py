@@ -0,0 +1,67 @@
+import functools
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from prometheus_client import Histogram
+
+from app.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Buckets span fast Neo4j lookups (~1 ms) up to slow LLM completions (~1 min).
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+OPERATION_LATENCY = Histogram(
+    "persona_graph_operation_seconds",
+    "Latency of Neo4j queries, embedding calls and LLM calls",
+    ["stage", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def timed(stage: str, operation: str):
+    """
+    Time a block of code and record it in the operation latency histogram,
+    and as a span of the current request trace.
+
+    Args:
+    - stage (str): The subsystem doing the work, e.g. "neo4j" or "openai".
+    - operation (str): The operation name within that stage.
+    """
+    start = time.perf_counter()
+    try:
+        with span(stage, operation):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        OPERATION_LATENCY.labels(stage, operation).observe(elapsed)
+        logger.debug("%s.%s took %.1f ms", stage, operation, elapsed * 1000)
+
+
+def instrumented(stage: str, operation: Optional[str] = None) -> Callable:
+    """
+    Decorator form of `timed` for sync and async functions.
+
+    The operation label defaults to the wrapped function's name.
+    """
+    def decorator(func: Callable) -> Callable:
+        name = operation or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(stage, name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage, name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -42,8 +42,10 @@ class RelationshipModel(BaseModel):
 
 
 class GraphUpdateModel(BaseModel):
-    nodes: List[NodeModel]
-    relationships: List[RelationshipModel]
+    nodes: List[NodeModel] = Field(default_factory=list)
+    relationships: List[RelationshipModel] = Field(default_factory=list)
+    delete_nodes: List[str] = Field(default_factory=list, description="Names of nodes to remove, with their relationships")
+    delete_relationships: List[RelationshipModel] = Field(default_factory=list, description="Relationships to remove")
 
     class Config:
         json_schema_extra = {
@@ -54,6 +56,10 @@ class GraphUpdateModel(BaseModel):
                 ],
                 "relationships": [
                     {"source": "Node1", "target": "Node2", "relation": "CONNECTED_TO"}
+                ],
+                "delete_nodes": ["Node3"],
+                "delete_relationships": [
+                    {"source": "Node1", "target": "Node4", "relation": "CONNECTED_TO"}
                 ]
             }
         }
@@ -87,6 +93,27 @@ class IngestData(BaseModel):
 
 class RAGQuery(BaseModel):
     query: str
+    bypass_cache: bool = False  # Recompute the answer even if a cached one is still valid
+    relation_types: Optional[List[str]] = None  # Only follow relationships of these types when expanding the graph
+    decompose: bool = False  # Split a compound question into sub-queries and retrieve seeds for each
 
 class RAGResponse(BaseModel):
-    answer: str
\ No newline at end of file
+    answer: str
+
+class RAGBatchQuery(BaseModel):
+    queries: List[str] = Field(..., min_length=1)
+    bypass_cache: bool = False
+    relation_types: Optional[List[str]] = None  # Applies to every query of the batch
+    decompose: bool = False  # Split each compound question into sub-queries, as in RAGQuery
+
+class RAGBatchResponse(BaseModel):
+    answers: List[str]  # In the order of the queries
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str = "pending"  # pending, running, completed or failed
+    progress: Dict[str, int] = Field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
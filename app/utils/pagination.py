@@ -0,0 +1,31 @@
+import base64
+import json
+from typing import Any, AsyncIterable, AsyncIterator, List, Optional
+
+
+def encode_cursor(key: List[Any]) -> str:
+    """An opaque cursor for the sort key of the last item on a page."""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """The sort key inside a cursor from `encode_cursor`; raises ValueError if it isn't one with `size` parts."""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError("Invalid cursor")
+    return key
+
+
+async def json_array_stream(items: AsyncIterable[Any]) -> AsyncIterator[str]:
+    """Serialize items as one JSON array, a chunk per item, without holding them all."""
+    yield "["
+    first = True
+    async for item in items:
+        yield ("" if first else ",") + json.dumps(item, default=str)
+        first = False
+    yield "]"
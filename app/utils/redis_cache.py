@@ -0,0 +1,156 @@
+"""
+A `CacheBackend` on any server that speaks the Redis protocol (RESP2).
+
+The client is deliberately small, just the commands the cache needs over
+one asyncio connection, so the app doesn't need a Redis client library. For
+local runs and tests, `python -m benchmarks.mock_redis` is a stand-in server.
+"""
+import asyncio
+import json
+import logging
+import re
+from typing import Any, List, Optional, Union
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+_GLOB_SPECIAL = re.compile(r"([*?\[\]\\])")
+
+
+class RedisError(Exception):
+    """An error reply from the server."""
+
+
+def encode_command(*args: Union[str, bytes, int, float]) -> bytes:
+    """A command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP reply; error replies are returned as `RedisError` instances, not raised."""
+    line = await reader.readuntil(b"\r\n")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RedisError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(payload)
+        return None if length < 0 else [await read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply type {kind!r}")
+
+
+class RESPClient:
+    """
+    One connection, one command at a time, reconnecting on the next command
+    after a connection error.
+
+    Args:
+    - url (str): `redis://[:password@]host[:port][/db]`.
+    - timeout (float): Seconds allowed for connecting and for each command.
+    """
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        if self.password:
+            await self._roundtrip("AUTH", self.password)
+        if self.db:
+            await self._roundtrip("SELECT", self.db)
+
+    async def _roundtrip(self, *args) -> Any:
+        self._writer.write(encode_command(*args))
+        await self._writer.drain()
+        reply = await read_reply(self._reader)
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    async def execute(self, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Connections and locks belong to one event loop
+            self._reader = self._writer = None
+            self._lock, self._loop = asyncio.Lock(), loop
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await asyncio.wait_for(self._roundtrip(*args), self.timeout)
+            except RedisError:
+                raise
+            except BaseException:
+                # Anything else, cancellation included, may leave a reply unread on the connection
+                await self._disconnect()
+                raise
+
+    async def _disconnect(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def close(self) -> None:
+        if self._loop is asyncio.get_running_loop():
+            await self._disconnect()
+        self._reader = self._writer = None
+
+
+class RedisCacheBackend:
+    """Values are stored JSON-encoded with a millisecond expiry (`SET ... PX`)."""
+
+    SCAN_COUNT = 500
+
+    def __init__(self, url: str, client: Optional[RESPClient] = None):
+        self.client = client or RESPClient(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.client.execute("GET", key)
+        return json.loads(value) if value is not None else None
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        values = await self.client.execute("MGET", *keys) if keys else []
+        return [json.loads(value) if value is not None else None for value in values]
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        await self.client.execute("SET", key, json.dumps(value), "PX", max(1, int(ttl_seconds * 1000)))
+
+    async def delete(self, keys: List[str]) -> None:
+        if keys:
+            await self.client.execute("DEL", *keys)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        pattern = _GLOB_SPECIAL.sub(r"\\\1", prefix) + "*"
+        cursor, deleted = b"0", 0
+        while True:
+            cursor, keys = await self.client.execute("SCAN", cursor, "MATCH", pattern, "COUNT", self.SCAN_COUNT)
+            if keys:
+                deleted += await self.client.execute("DEL", *keys)
+            if cursor in (b"0", "0"):
+                return deleted
+
+    async def close(self) -> None:
+        await self.client.close()
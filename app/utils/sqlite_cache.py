@@ -0,0 +1,111 @@
+"""
+A `CacheBackend` on a SQLite database on local disk.
+
+Every worker process on a host opens the same file, so an entry cached by one
+worker is a hit in the others. The database runs in WAL mode, so readers don't
+wait for a writer; calls run in a worker thread so a busy database never
+blocks the event loop.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Highest code point, so every key starting with a prefix sorts below prefix + this.
+_MAX_CHAR = "\U0010ffff"
+
+
+class SQLiteCacheBackend:
+    """
+    Args:
+    - path (str): The database file; created if missing.
+    - max_entries (int): Entries kept across all caches. Expired entries, then
+      those closest to expiry, are evicted every `EVICT_EVERY` writes.
+    - clock (Callable): Wall-clock time, which all processes on the host share.
+    """
+
+    EVICT_EVERY = 256
+
+    def __init__(self, path: str, max_entries: int, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self._clock = clock
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+        return connection
+
+    def _call(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            if self._connection is None:
+                self._connection = self._connect()
+            return work(self._connection)
+
+    async def _run(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await asyncio.to_thread(self._call, work)
+
+    async def get(self, key: str) -> Optional[Any]:
+        now = self._clock()
+        row = await self._run(
+            lambda db: db.execute("SELECT value FROM cache WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        now = self._clock()
+        placeholders = ", ".join("?" * len(keys))
+        rows = dict(await self._run(
+            lambda db: db.execute(f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND expires > ?",
+                                  (*keys, now)).fetchall()
+        )) if keys else {}
+        return [json.loads(rows[key]) if key in rows else None for key in keys]
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        encoded = json.dumps(value)
+        expires = self._clock() + ttl_seconds
+        self._writes += 1
+        evict = self._writes % self.EVICT_EVERY == 0
+
+        def work(db: sqlite3.Connection) -> None:
+            db.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)", (key, encoded, expires))
+            if evict:
+                self._evict(db)
+        await self._run(work)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        db.execute("DELETE FROM cache WHERE expires <= ?", (self._clock(),))
+        excess = db.execute("SELECT count(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            db.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT ?)", (excess,))
+            logger.debug("Evicted %d entries from the sqlite cache", excess)
+
+    async def delete(self, keys: List[str]) -> None:
+        if keys:
+            await self._run(lambda db: db.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in keys]))
+
+    async def delete_prefix(self, prefix: str) -> int:
+        return await self._run(
+            lambda db: db.execute("DELETE FROM cache WHERE key >= ? AND key < ?", (prefix, prefix + _MAX_CHAR)).rowcount
+        )
+
+    async def close(self) -> None:
+        def work() -> None:
+            with self._lock:
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+        await asyncio.to_thread(work)
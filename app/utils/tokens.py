@@ -0,0 +1,22 @@
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken is not installed, estimating tokens as characters / 4")
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in `text` for OpenAI chat models; estimated from its length without tiktoken."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
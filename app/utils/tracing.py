@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger("app.tracing.spans")
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("current_trace", default=None)
+_current_span_id: ContextVar[Optional[str]] = ContextVar("current_span_id", default=None)
+_pending_exports = set()
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "stage", "operation", "start", "end", "attributes")
+
+    def __init__(self, stage: str, operation: str, parent_id: Optional[str]):
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.stage = stage
+        self.operation = operation
+        self.start = time.time_ns()
+        self.end: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time_ns()) - self.start) / 1e6
+
+
+class RequestTrace:
+    """All spans recorded while serving one request, plus per-stage call counts."""
+
+    def __init__(self, request_id: Optional[str] = None, name: str = "request"):
+        self.request_id = request_id or secrets.token_hex(16)
+        self.name = name
+        self.root = Span("http", name, None)
+        self.spans: List[Span] = []
+        self.counts: Counter = Counter()
+
+    @property
+    def trace_id(self) -> str:
+        """A 16-byte hex trace id, derived from the request id when that isn't one already."""
+        try:
+            if len(self.request_id) == 32 and int(self.request_id, 16):
+                return self.request_id.lower()
+        except ValueError:
+            pass
+        return hashlib.md5(self.request_id.encode()).hexdigest()
+
+    def finish(self) -> None:
+        self.root.end = time.time_ns()
+
+    def stage_breakdown(self) -> Dict[str, Dict[str, float]]:
+        """Total time and call count per stage, counting only the outermost span of each stage."""
+        by_id = {span.span_id: span for span in self.spans}
+        totals: Dict[str, float] = defaultdict(float)
+        for span in self.spans:
+            parent = by_id.get(span.parent_id)
+            if parent is not None and parent.stage == span.stage:
+                continue
+            totals[span.stage] += span.duration_ms
+        return {
+            stage: {"duration_ms": round(totals[stage], 2), "count": self.counts[stage]}
+            for stage in sorted(set(totals) | set(self.counts))
+        }
+
+    def debug_timing_header(self) -> str:
+        """Render the stage breakdown in Server-Timing syntax for the X-Debug-Timing header."""
+        parts = [f"total;dur={self.root.duration_ms:.1f}"]
+        for stage, stats in self.stage_breakdown().items():
+            parts.append(f"{stage};dur={stats['duration_ms']:.1f};count={stats['count']}")
+        return ", ".join(parts)
+
+    def to_log_record(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "duration_ms": round(self.root.duration_ms, 2),
+            "stages": self.stage_breakdown(),
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id or self.root.span_id,
+                    "name": f"{span.stage}.{span.operation}",
+                    "duration_ms": round(span.duration_ms, 2),
+                    **({"attributes": span.attributes} if span.attributes else {}),
+                }
+                for span in self.spans
+            ],
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Encode the trace as an OTLP/HTTP JSON `ExportTraceServiceRequest`."""
+        def encode(span: Span, name: str, parent_id: Optional[str]) -> Dict[str, Any]:
+            encoded = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": name,
+                "kind": 2 if span is self.root else 3,
+                "startTimeUnixNano": str(span.start),
+                "endTimeUnixNano": str(span.end or time.time_ns()),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}}
+                    for key, value in span.attributes.items()
+                ],
+            }
+            if parent_id:
+                encoded["parentSpanId"] = parent_id
+            return encoded
+
+        spans = [encode(self.root, self.name, None)]
+        spans += [
+            encode(span, f"{span.stage}.{span.operation}", span.parent_id or self.root.span_id)
+            for span in self.spans
+        ]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": config.TELEMETRY.SERVICE_NAME}}
+                ]},
+                "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": spans}],
+            }]
+        }
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str = "request", request_id: Optional[str] = None):
+    """
+    Open a trace for the duration of the block and export it on exit.
+
+    Spans recorded by `span` (and therefore by `app.utils.metrics.timed`) inside
+    the block, including in tasks spawned from it, are attached to this trace.
+    """
+    trace = RequestTrace(request_id=request_id, name=name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span_id.set(trace.root.span_id)
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        _current_span_id.reset(span_token)
+        _current_trace.reset(trace_token)
+        export_trace(trace)
+
+
+@contextmanager
+def span(stage: str, operation: str, **attributes):
+    """Record a child span of the current trace. A no-op outside of a trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    current = Span(stage, operation, _current_span_id.get())
+    current.attributes.update(attributes)
+    trace.spans.append(current)
+    trace.counts[stage] += 1
+    token = _current_span_id.set(current.span_id)
+    try:
+        yield current
+    finally:
+        current.end = time.time_ns()
+        _current_span_id.reset(token)
+
+
+def export_trace(trace: RequestTrace) -> None:
+    exporter = config.TELEMETRY.TRACE_EXPORTER
+    if exporter == "log":
+        trace_logger.info(json.dumps(trace.to_log_record()))
+    elif exporter == "otlp":
+        try:
+            task = asyncio.get_running_loop().create_task(_post_otlp(trace.to_otlp()))
+            _pending_exports.add(task)
+            task.add_done_callback(_pending_exports.discard)
+        except RuntimeError:
+            logger.debug("No running event loop, skipping OTLP export for %s", trace.request_id)
+
+
+async def _post_otlp(payload: Dict[str, Any]) -> None:
+    # Only needed for OTLP export, so it isn't a dependency of every worker
+    import httpx
+    try:
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            await client.post(config.TELEMETRY.OTLP_ENDPOINT, json=payload)
+    except httpx.HTTPError as e:
+        logger.warning("Failed to export trace to %s: %s", config.TELEMETRY.OTLP_ENDPOINT, e)
@@ -0,0 +1,70 @@
+"""
+Cold-start benchmark: how long a fresh worker takes to import the app, run
+its startup lifespan and answer its first request.
+
+Each run is a new interpreter, so nothing is shared between runs:
+
+    python -m benchmarks.cold_start --runs 10 --backend memory --output cold_start.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+from benchmarks.run import percentile
+
+PROBE = r"""
+import json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    client.get("/api/v1/version")
+    first_request = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "startup_s": started - imported,
+    "first_request_s": first_request - started,
+    "total_s": first_request - start,
+}))
+"""
+
+
+def run_probe(env: Dict[str, str]) -> Dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", choices=["neo4j", "memory"], default="memory")
+    parser.add_argument("--output", default="cold_start.json")
+    args = parser.parse_args(argv)
+
+    env = {**os.environ, "GRAPH_BACKEND": args.backend, "TRACE_EXPORTER": "none", "LOG_LEVEL": "WARNING"}
+    samples: List[Dict[str, float]] = [run_probe(env) for _ in range(args.runs)]
+
+    summary = {
+        key: {
+            "p50_ms": round(percentile([s[key] for s in samples], 50) * 1000, 2),
+            "max_ms": round(max(s[key] for s in samples) * 1000, 2),
+            "mean_ms": round(statistics.fmean(s[key] for s in samples) * 1000, 2),
+        }
+        for key in samples[0]
+    }
+    with open(args.output, "w") as f:
+        json.dump({"backend": args.backend, "runs": args.runs, "results": summary}, f, indent=2)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
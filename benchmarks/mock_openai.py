@@ -0,0 +1,161 @@
+"""
+A local stand-in for the OpenAI chat and embedding endpoints.
+
+Responses are deterministic and shaped like the real API closely enough for
+the `openai` and `instructor` clients used by the app. Every endpoint sleeps
+for a configurable latency first so benchmarks can model network and model time.
+
+Run standalone with:
+    python -m benchmarks.mock_openai --port 8100 --chat-latency 0.5
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+EMBEDDING_DIMENSIONS = 1536
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z\-]{3,}")
+
+
+class MockSettings:
+    def __init__(self, chat_latency: float = 0.0, embedding_latency: float = 0.0, entities_per_call: int = 8):
+        self.chat_latency = chat_latency
+        self.embedding_latency = embedding_latency
+        self.entities_per_call = entities_per_call
+        self.calls: Dict[str, int] = {"chat": 0, "embeddings": 0, "embedded_texts": 0}
+
+
+def deterministic_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """A unit vector derived from the text, so equal texts embed identically."""
+    digest = hashlib.sha256(text.lower().encode()).digest()
+    values = [math.sin((i + 1) * digest[i % len(digest)]) for i in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def extract_terms(text: str, limit: int) -> List[str]:
+    seen = []
+    for word in WORD_PATTERN.findall(text):
+        term = word.capitalize()
+        if term not in seen:
+            seen.append(term)
+        if len(seen) >= limit:
+            break
+    return seen
+
+
+def _completion(message: Dict[str, Any], model: str) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-mock-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def create_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        settings.calls["embeddings"] += 1
+        settings.calls["embedded_texts"] += len(texts)
+        await asyncio.sleep(settings.embedding_latency)
+        dimensions = body.get("dimensions", EMBEDDING_DIMENSIONS)
+        return {
+            "object": "list",
+            "model": body.get("model", "mock-embedding"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": deterministic_embedding(text, dimensions)}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        settings.calls["chat"] += 1
+        await asyncio.sleep(settings.chat_latency)
+        model = body.get("model", "mock-chat")
+        user_text = "\n".join(m["content"] for m in body["messages"] if m["role"] == "user")
+
+        if body.get("tools"):
+            # Structured output through instructor: answer with a tool call for the requested schema.
+            new_entities = user_text.rsplit("New Entities:", 1)[-1]
+            terms = [t.strip() for t in new_entities.split(",") if t.strip()] or extract_terms(user_text, settings.entities_per_call)
+            graph = {
+                "nodes": [{"name": term, "perspective": f"Interested in {term.lower()}"} for term in terms],
+                "relationships": [
+                    {"source": a, "relation": "RELATED_TO", "target": b} for a, b in zip(terms, terms[1:])
+                ],
+            }
+            tool_name = body["tools"][0]["function"]["name"]
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": "call_mock",
+                    "type": "function",
+                    "function": {"name": tool_name, "arguments": json.dumps(graph)},
+                }],
+            }
+            return _completion(message, model)
+
+        if body.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps({"entities": extract_terms(user_text, settings.entities_per_call)})
+            return _completion({"role": "assistant", "content": content}, model)
+
+        return _completion({"role": "assistant", "content": f"Mock answer based on {len(user_text)} characters of context."}, model)
+
+    return app
+
+
+class MockOpenAIServer:
+    """Runs the mock in a background thread; use as a context manager."""
+
+    def __init__(self, settings: MockSettings, host: str = "127.0.0.1", port: int = 8100):
+        self.settings = settings
+        self.host = host
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(create_app(settings), host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Mock OpenAI server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the mock OpenAI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--chat-latency", type=float, default=0.0, help="Seconds to sleep per chat completion")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Seconds to sleep per embeddings call")
+    args = parser.parse_args()
+    uvicorn.run(create_app(MockSettings(args.chat_latency, args.embedding_latency)), host=args.host, port=args.port)
@@ -0,0 +1,166 @@
+"""
+A local stand-in for a Redis server, for the `redis` cache backend.
+
+It speaks RESP2 and implements the commands `app.utils.redis_cache` uses
+(PING, AUTH, SELECT, GET, MGET, SET with EX/PX, DEL, SCAN with MATCH, DBSIZE and
+FLUSHDB), keeping everything in memory.
+
+Run standalone with:
+    python -m benchmarks.mock_redis --port 6379
+"""
+import argparse
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.redis_cache import RedisError, read_reply
+
+
+def encode_reply(value: Any) -> bytes:
+    if isinstance(value, RedisError):
+        return b"-%s\r\n" % str(value).encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool) or isinstance(value, int):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(encode_reply(item) for item in value)
+
+
+def glob_to_regex(pattern: bytes) -> "re.Pattern[bytes]":
+    """Redis glob patterns: `*`, `?` and backslash escapes (enough for prefix matches)."""
+    out, i = b"", 0
+    while i < len(pattern):
+        char = pattern[i:i + 1]
+        if char == b"\\" and i + 1 < len(pattern):
+            out += re.escape(pattern[i + 1:i + 2])
+            i += 2
+            continue
+        out += b".*" if char == b"*" else b"." if char == b"?" else re.escape(char)
+        i += 1
+    return re.compile(out + b"\\Z", re.DOTALL)
+
+
+class MockRedis:
+    def __init__(self, password: Optional[str] = None):
+        self.password = password
+        self.databases: Dict[int, Dict[bytes, Tuple[bytes, Optional[float]]]] = {}
+        self.calls: Dict[str, int] = {}
+
+    def _live(self, db: int) -> Dict[bytes, Tuple[bytes, Optional[float]]]:
+        data = self.databases.setdefault(db, {})
+        now = time.monotonic()
+        for key in [key for key, (_, expires) in data.items() if expires is not None and expires <= now]:
+            del data[key]
+        return data
+
+    def execute(self, session: Dict[str, Any], args: List[bytes]) -> Any:
+        command = args[0].decode().upper()
+        self.calls[command] = self.calls.get(command, 0) + 1
+        if command == "AUTH":
+            session["authenticated"] = args[-1].decode() == self.password
+            return "OK" if session["authenticated"] else RedisError("WRONGPASS invalid password")
+        if self.password and not session.get("authenticated"):
+            return RedisError("NOAUTH Authentication required.")
+        data = self._live(session["db"])
+        if command == "PING":
+            return "PONG"
+        if command == "SELECT":
+            session["db"] = int(args[1])
+            return "OK"
+        if command == "GET":
+            entry = data.get(args[1])
+            return entry[0] if entry else None
+        if command == "MGET":
+            return [data[key][0] if key in data else None for key in args[1:]]
+        if command == "SET":
+            expires = None
+            options = [arg.upper() for arg in args[3:]]
+            for unit, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+                if unit in options:
+                    expires = time.monotonic() + int(args[3 + options.index(unit) + 1]) * scale
+            data[args[1]] = (args[2], expires)
+            return "OK"
+        if command == "DEL":
+            return sum(data.pop(key, None) is not None for key in args[1:])
+        if command == "SCAN":
+            # One pass over everything; real servers page, which clients must handle anyway
+            options = [arg.upper() for arg in args[2:]]
+            pattern = args[2 + options.index(b"MATCH") + 1] if b"MATCH" in options else b"*"
+            regex = glob_to_regex(pattern)
+            return [b"0", [key for key in data if regex.match(key)]]
+        if command == "DBSIZE":
+            return len(data)
+        if command == "FLUSHDB":
+            data.clear()
+            return "OK"
+        return RedisError(f"ERR unknown command '{command}'")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = {"db": 0, "authenticated": False}
+        try:
+            while True:
+                args = await read_reply(reader)
+                writer.write(encode_reply(self.execute(session, args)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class MockRedisServer:
+    """Runs the mock in a background thread; use as a context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, password: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.mock = MockRedis(password)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        auth = f":{self.mock.password}@" if self.mock.password else ""
+        return f"redis://{auth}{self.host}:{self.port}/0"
+
+    def __enter__(self):
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self.mock.handle, self.host, self.port), self._loop
+        ).result(timeout=10)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        async def stop():
+            self._server.close()
+            try:
+                # Newer Pythons also wait for open client connections here
+                await asyncio.wait_for(self._server.wait_closed(), 1)
+            except asyncio.TimeoutError:
+                pass
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+async def serve(host: str, port: int, password: Optional[str]) -> None:
+    server = await asyncio.start_server(MockRedis(password).handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the mock Redis server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--password", default=None)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.password))
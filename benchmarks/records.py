@@ -0,0 +1,105 @@
+"""
+Microbenchmark: per-row cost of the types graph reads are wrapped in.
+
+Compares validated Pydantic models (what `GraphOps` used to build for every
+node and edge), `model_construct` and the NamedTuple records it builds now,
+then times a breadth-first RAG expansion over a synthetic in-memory graph:
+
+    python -m benchmarks.records --rows 20000 --output records.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import timeit
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic import generate_graph
+
+
+def per_row_ns(build: Callable[[Dict[str, Any]], Any], rows: List[Dict[str, Any]], repeat: int) -> float:
+    """Best-of-`repeat` nanoseconds to build one object from a row."""
+    timer = timeit.Timer(lambda: [build(row) for row in rows])
+    return round(min(timer.repeat(repeat=repeat, number=1)) / len(rows) * 1e9, 1)
+
+
+def conversion_results(rows: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    from app.graph.records import EdgeRecord, NodeRecord
+    from app.utils.models import NodeModel, RelationshipModel
+
+    node_rows = [
+        {"name": f"Node {i}", "perspective": "Has been exploring this topic", "properties": {"source": "chat", "era": "90s"}}
+        for i in range(rows)
+    ]
+    edge_rows = [
+        {"source": f"Node {i}", "target": f"Node {i + 1}", "relation": "USES", "value": "uses"}
+        for i in range(rows)
+    ]
+    return {
+        "node": {
+            "pydantic_ns": per_row_ns(lambda r: NodeModel(name=r["name"], perspective=r["perspective"],
+                                                          properties=r["properties"]), node_rows, repeat),
+            "model_construct_ns": per_row_ns(lambda r: NodeModel.model_construct(
+                name=r["name"], perspective=r["perspective"], properties=r["properties"]), node_rows, repeat),
+            "record_ns": per_row_ns(NodeRecord.from_row, node_rows, repeat),
+        },
+        "edge": {
+            "pydantic_ns": per_row_ns(lambda r: RelationshipModel(source=r["source"], target=r["target"],
+                                                                  relation=r["relation"]), edge_rows, repeat),
+            "model_construct_ns": per_row_ns(lambda r: RelationshipModel.model_construct(
+                source=r["source"], target=r["target"], relation=r["relation"]), edge_rows, repeat),
+            "record_ns": per_row_ns(EdgeRecord.from_row, edge_rows, repeat),
+        },
+    }
+
+
+async def expansion_results(nodes: int, degree: float, seeds: int, repeat: int) -> Dict[str, float]:
+    from app.graph.memory_backend import InMemoryGraphBackend
+    from app.graph.rag_interface import RAGInterface
+
+    backend = InMemoryGraphBackend()
+    node_dicts, relationship_dicts = generate_graph(nodes, degree, seed=0)
+    await backend.create_user("bench")
+    await backend.create_nodes([{**node, "properties": {"source": "chat"}} for node in node_dicts], "bench")
+    await backend.create_relationships(relationship_dicts, "bench")
+
+    rag = RAGInterface("bench", backend)
+    start_nodes = [{"nodeName": node["name"], "score": 0.9} for node in node_dicts[:seeds]]
+    best, expanded = float("inf"), 0
+    for _ in range(repeat):
+        assembler = rag.new_assembler()
+        start = time.perf_counter()
+        await rag.expand_context(start_nodes, 2, assembler)
+        best = min(best, time.perf_counter() - start)
+        expanded = len(assembler.nodes)
+    return {"nodes_expanded": expanded, "best_ms": round(best * 1000, 2),
+            "per_node_us": round(best / max(expanded, 1) * 1e6, 1)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="Rows converted per timing")
+    parser.add_argument("--nodes", type=int, default=2000, help="Nodes in the synthetic expansion graph")
+    parser.add_argument("--degree", type=float, default=4.0)
+    parser.add_argument("--seeds", type=int, default=5, help="Similarity search results expansion starts from")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="records.json")
+    args = parser.parse_args(argv)
+
+    import os
+    os.environ.setdefault("TRACE_EXPORTER", "none")
+    # Access tracking would schedule writes that outlive the benchmark's event loop
+    os.environ.setdefault("COMPACTION_ACCESS_FLUSH_SECONDS", "-1")
+    results = {
+        "conversion": conversion_results(args.rows, args.repeat),
+        "expansion": asyncio.run(expansion_results(args.nodes, args.degree, args.seeds, args.repeat)),
+    }
+    with open(args.output, "w") as f:
+        json.dump({"parameters": {k: v for k, v in vars(args).items() if k != "output"}, "results": results}, f, indent=2)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
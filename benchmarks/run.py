@@ -0,0 +1,211 @@
+"""
+Reproducible benchmark suite for GraphOps, RAGInterface and GraphConstructor.
+
+Seeds synthetic per-user graphs, points the app at a local mock OpenAI server
+and records ingest throughput, RAG latency percentiles and per-request query
+counts. Results are written as JSON and can be compared against a baseline:
+
+    python -m benchmarks.run --nodes 500 --degree 4 --output bench.json
+    python -m benchmarks.run --backend memory --nodes 2000
+    python -m benchmarks.run --nodes 500 --degree 4 --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from benchmarks.mock_openai import MockOpenAIServer, MockSettings
+from benchmarks.synthetic import generate_documents, generate_graph, generate_queries
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies: List[float], counts: List[Counter]) -> Dict[str, Any]:
+    stages = sorted({stage for c in counts for stage in c})
+    return {
+        "runs": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "calls_per_request": {
+            stage: round(statistics.fmean(c[stage] for c in counts), 2) for stage in stages
+        },
+    }
+
+
+async def measure(name: str, runs: List, func) -> Dict[str, Any]:
+    from app.utils.tracing import start_trace
+
+    latencies, counts = [], []
+    for arg in runs:
+        with start_trace(name) as trace:
+            start = time.perf_counter()
+            await func(arg)
+            latencies.append(time.perf_counter() - start)
+        counts.append(trace.counts)
+    return summarize(latencies, counts)
+
+
+async def run_benchmarks(args) -> Dict[str, Any]:
+    from app.graph.constructor import GraphConstructor
+    from app.graph.graph_ops import GraphOps
+    from app.graph.rag_interface import RAGInterface
+    from app.utils.models import NodeModel, NodesAndRelationshipsResponse, RelationshipModel
+
+    results: Dict[str, Any] = {}
+    nodes, relationships = generate_graph(args.nodes, args.degree, seed=args.seed)
+    users = [f"bench_user_{i}" for i in range(args.users)]
+
+    # Seed: bulk graph writes through GraphOps, including one embedding per node.
+    seed_latencies = []
+    async with GraphOps() as graph_ops:
+        for user_id in users:
+            await graph_ops.delete_user(user_id)
+            await graph_ops.create_user(user_id)
+            update = NodesAndRelationshipsResponse(
+                nodes=[NodeModel(**node) for node in nodes],
+                relationships=[RelationshipModel(**rel) for rel in relationships],
+            )
+            start = time.perf_counter()
+            await graph_ops.update_graph(update, user_id)
+            seed_latencies.append(time.perf_counter() - start)
+    seed_total = sum(seed_latencies)
+    results["seed"] = {
+        "users": len(users),
+        "nodes_per_user": len(nodes),
+        "relationships_per_user": len(relationships),
+        "seconds": round(seed_total, 3),
+        "nodes_per_second": round(len(nodes) * len(users) / seed_total, 2) if seed_total else 0.0,
+    }
+
+    # GraphOps reads that back the ingest prompt and the similarity search.
+    async with GraphOps() as graph_ops:
+        results["graph_ops.get_all"] = await measure(
+            "graph_ops.get_all", users * args.repeat,
+            lambda user_id: asyncio.gather(graph_ops.get_all_nodes(user_id), graph_ops.get_all_relationships(user_id)),
+        )
+        queries = generate_queries(nodes, args.queries, seed=args.seed)
+        results["graph_ops.similarity_search"] = await measure(
+            "graph_ops.similarity_search", queries,
+            lambda query: graph_ops.perform_similarity_search(query, users[0]),
+        )
+
+    # RAG: graph-expanded and vector-only answers, one RAGInterface per request as the API does.
+    async def rag_query(query: str, vector_only: bool = False):
+        rag = RAGInterface(users[0])
+        try:
+            if vector_only:
+                await rag.query_vector_only(query)
+            else:
+                await rag.query(query)
+        finally:
+            await rag.close()
+
+    results["rag.query"] = await measure("rag.query", queries, rag_query)
+    results["rag.query_vector_only"] = await measure(
+        "rag.query_vector_only", queries, lambda query: rag_query(query, vector_only=True)
+    )
+
+    # Ingest: the full unstructured pipeline, two LLM calls plus graph writes per document.
+    from app.utils.models import UnstructuredData
+
+    documents = generate_documents(args.ingest_docs, seed=args.seed)
+
+    async def ingest(document: str):
+        async with GraphConstructor(users[-1]) as constructor:
+            await constructor.process_unstructured_data(UnstructuredData(title="Benchmark", content=document))
+
+    ingest_start = time.perf_counter()
+    results["constructor.ingest"] = await measure("constructor.ingest", documents, ingest)
+    ingest_elapsed = time.perf_counter() - ingest_start
+    results["constructor.ingest"]["documents_per_second"] = round(len(documents) / ingest_elapsed, 2) if ingest_elapsed else 0.0
+
+    if not args.keep:
+        async with GraphOps() as graph_ops:
+            for user_id in users:
+                await graph_ops.delete_user(user_id)
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> bool:
+    """Print per-metric deltas against a baseline; return False if any latency regressed too far."""
+    ok = True
+    for name, metrics in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if key not in metrics or not base.get(key):
+                continue
+            change = (metrics[key] - base[key]) / base[key]
+            flag = ""
+            if change > max_regression:
+                flag = "  REGRESSION"
+                ok = False
+            print(f"{name:32} {key:7} {base[key]:10.2f} -> {metrics[key]:10.2f} ({change:+.1%}){flag}")
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2, help="Number of synthetic users")
+    parser.add_argument("--nodes", type=int, default=200, help="Nodes per synthetic user graph")
+    parser.add_argument("--degree", type=float, default=3.0, help="Average node degree")
+    parser.add_argument("--queries", type=int, default=30, help="RAG and similarity queries to run")
+    parser.add_argument("--ingest-docs", type=int, default=5, help="Documents to push through the ingest pipeline")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions for whole-graph reads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chat-latency", type=float, default=0.0, help="Mock chat completion latency in seconds")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Mock embedding latency in seconds")
+    parser.add_argument("--mock-port", type=int, default=8100)
+    parser.add_argument("--backend", choices=["neo4j", "memory"], help="Graph backend (defaults to GRAPH_BACKEND)")
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="Allowed relative p50/p95/p99 increase")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic users after the run")
+    args = parser.parse_args(argv)
+
+    settings = MockSettings(chat_latency=args.chat_latency, embedding_latency=args.embedding_latency)
+    with MockOpenAIServer(settings, port=args.mock_port) as server:
+        # The app reads these at import time, so set them before importing anything from `app`.
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_KEY", "mock-key")
+        os.environ.setdefault("TRACE_EXPORTER", "none")
+        if args.backend:
+            os.environ["GRAPH_BACKEND"] = args.backend
+        results = asyncio.run(run_benchmarks(args))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "parameters": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "mock_openai_calls": settings.calls,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 0 if compare(report, baseline, args.max_regression) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
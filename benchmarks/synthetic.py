@@ -0,0 +1,68 @@
+"""Synthetic per-user graphs and documents for benchmarks."""
+import random
+from typing import Dict, List, Tuple
+
+TOPICS = [
+    "Astronomy", "Rocketry", "Photography", "Hiking", "Machine Learning", "Cooking", "Jazz", "Chess",
+    "Blockchain", "Gardening", "Robotics", "Typography", "Cycling", "Poetry", "Architecture", "Yoga",
+    "Sailing", "Pottery", "Economics", "Climbing", "Film", "Linguistics", "Beekeeping", "Running",
+]
+FACETS = ["History", "Tools", "Community", "Theory", "Practice", "Careers", "Events", "Books"]
+RELATIONS = ["RELATED_TO", "PART_OF", "INSPIRED_BY", "USES", "LEADS_TO"]
+
+
+def node_name(index: int) -> str:
+    topic = TOPICS[index % len(TOPICS)]
+    facet = FACETS[(index // len(TOPICS)) % len(FACETS)]
+    suffix = index // (len(TOPICS) * len(FACETS))
+    return f"{topic} {facet}" + (f" {suffix}" if suffix else "")
+
+
+def generate_graph(num_nodes: int, avg_degree: float, seed: int = 0) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """
+    Generate a connected-ish random graph of `num_nodes` nodes with roughly
+    `avg_degree` edges per node, returned as node and relationship dicts in the
+    shape `GraphOps.update_graph` expects.
+    """
+    rng = random.Random(seed)
+    names = [node_name(i) for i in range(num_nodes)]
+    nodes = [{"name": name, "perspective": f"Has been exploring {name.lower()}"} for name in names]
+
+    edges = set()
+    # A random spanning chain keeps the graph connected so expansions have somewhere to go.
+    order = list(range(num_nodes))
+    rng.shuffle(order)
+    for a, b in zip(order, order[1:]):
+        edges.add((a, b))
+    target_edges = int(num_nodes * avg_degree / 2)
+    while len(edges) < target_edges and num_nodes > 1:
+        a, b = rng.sample(range(num_nodes), 2)
+        edges.add((a, b))
+
+    relationships = [
+        {"source": names[a], "target": names[b], "relation": rng.choice(RELATIONS)}
+        for a, b in sorted(edges)
+    ]
+    return nodes, relationships
+
+
+def generate_documents(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(count):
+        picks = rng.sample(TOPICS, 4)
+        documents.append(
+            f"Lately I've been getting into {picks[0].lower()} and {picks[1].lower()}. "
+            f"I also spend weekends on {picks[2].lower()}, and a friend got me curious about {picks[3].lower()}."
+        )
+    return documents
+
+
+def generate_queries(nodes: List[Dict[str, str]], count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    templates = [
+        "What does the user think about {}?",
+        "How is {} connected to the user's other interests?",
+        "Suggest something new related to {}.",
+    ]
+    return [rng.choice(templates).format(rng.choice(nodes)["name"]) for _ in range(count)]
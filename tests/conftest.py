@@ -21,4 +21,31 @@ async def neo4j_manager():
     )
     await manager.wait_for_neo4j()
     yield manager
-    await manager.close()
\ No newline at end of file
+    await manager.close()
+
+def fake_embedding(text: str, dimensions: int = 8):
+    # Deterministic, non-zero vectors; texts sharing a first letter land close together.
+    base = [float((ord(text[0].lower()) + i) % 7 + 1) for i in range(dimensions)]
+    base[len(text) % dimensions] += 0.5
+    return base
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    from app.graph.memory_backend import InMemoryGraphBackend
+    async def fake_generate_embeddings(texts, **kwargs):
+        return [fake_embedding(text) for text in texts]
+
+    monkeypatch.setattr("app.graph.graph_ops.generate_embeddings", fake_generate_embeddings)
+    # Tests that need centrality run the job themselves
+    monkeypatch.setattr(config.GRAPH, "CENTRALITY_DELAY_SECONDS", -1)
+    # The fake embeddings are too coarse for similarity matches; resolve by normalized name only
+    monkeypatch.setattr(config.GRAPH, "ENTITY_RESOLUTION_THRESHOLD", 1.1)
+    monkeypatch.setattr(config.COMPACTION, "ACCESS_FLUSH_SECONDS", -1)
+    # Each test starts with empty caches, since users and queries are reused across tests
+    from app.graph import graph_ops
+    from app.graph.query_decomposition import query_decomposition_cache
+    from app.utils.cache import LRUCacheBackend
+    for cache in (graph_ops.rag_answer_cache, graph_ops.query_embedding_cache, graph_ops.user_exists_cache,
+                  query_decomposition_cache):
+        monkeypatch.setattr(cache, "backend", LRUCacheBackend(1000))
+    return InMemoryGraphBackend()
@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.config import config
+from app.utils.admission import AdmissionLimiter, AdmissionRejected, admission_control, get_admission_limiter
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_in_order_and_sheds_the_excess():
+    limiter = AdmissionLimiter("test", max_concurrency=1, max_queue=1, max_per_user=2, queue_timeout=1.0)
+    release = asyncio.Event()
+    order = []
+
+    async def request(name, user):
+        async with limiter.admit(user):
+            order.append(name)
+            await release.wait()
+
+    first = asyncio.create_task(request("first", "a"))
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(request("queued", "b"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        async with limiter.admit("c"):
+            pass
+    assert rejected.value.status_code == 503 and rejected.value.retry_after >= 1
+
+    # A user at their limit is told to back off even before the queue is checked
+    limiter.max_per_user = 1
+    with pytest.raises(AdmissionRejected) as rejected:
+        async with limiter.admit("a"):
+            pass
+    assert rejected.value.status_code == 429
+
+    release.set()
+    await asyncio.gather(first, queued)
+    assert order == ["first", "queued"]
+    async with limiter.admit("a"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_after_the_queue_timeout():
+    limiter = AdmissionLimiter("test", max_concurrency=1, max_queue=4, max_per_user=4, queue_timeout=0.01)
+    async with limiter.admit("a"):
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with limiter.admit("b"):
+                pass
+    assert rejected.value.status_code == 503
+    async with limiter.admit("b"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_ingest_burst_does_not_block_rag_queries(monkeypatch):
+    monkeypatch.setattr(config.ADMISSION, "INGEST_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(config.ADMISSION, "INGEST_MAX_QUEUE", 0)
+    get_admission_limiter.cache_clear()
+    release = asyncio.Event()
+
+    app = FastAPI()
+    app.middleware("http")(admission_control)
+
+    @app.post("/api/v1/ingest/{user_id}")
+    async def ingest(user_id: str):
+        await release.wait()
+        return {"message": "ok"}
+
+    @app.post("/api/v1/rag/{user_id}/query")
+    async def rag(user_id: str):
+        return {"answer": "ok"}
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            slow = asyncio.create_task(client.post("/api/v1/ingest/u1"))
+            await asyncio.sleep(0.05)
+
+            rejected = await client.post("/api/v1/ingest/u2")
+            assert rejected.status_code == 503 and int(rejected.headers["Retry-After"]) >= 1
+            assert (await client.post("/api/v1/rag/u1/query")).json() == {"answer": "ok"}
+
+            release.set()
+            assert (await slow).status_code == 200
+    finally:
+        get_admission_limiter.cache_clear()
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from app.graph import graph_ops as graph_ops_module
+from app.graph.graph_ops import GraphOps
+from app.graph.rag_interface import RAGInterface
+from app.utils.cache import Cache
+from app.utils.redis_cache import RESPClient, RedisCacheBackend
+from app.utils.sqlite_cache import SQLiteCacheBackend
+from benchmarks.mock_redis import MockRedisServer
+from tests.conftest import fake_embedding
+
+
+@pytest.mark.asyncio
+async def test_sqlite_entries_are_shared_between_workers(tmp_path):
+    now = [100.0]
+    path = str(tmp_path / "cache.sqlite3")
+    workers = [SQLiteCacheBackend(path, max_entries=10, clock=lambda: now[0]) for _ in range(2)]
+    first, second = (Cache("answers", 10, ttl_seconds=5, backend=backend) for backend in workers)
+
+    await first.set("u1\x1fa", {"text": "hi"})
+    await first.set("u1\x1fb", [1, 2])
+    await first.set("u2\x1fa", "other user")
+    assert await second.get("u1\x1fa") == {"text": "hi"}
+    assert await second.get_many(["u1\x1fb", "missing"]) == {"u1\x1fb": [1, 2]}
+
+    assert await second.invalidate_prefix("u1\x1f") == 2
+    assert await first.get("u1\x1fa") is None and await first.get("u2\x1fa") == "other user"
+    now[0] += 6
+    assert await first.get("u2\x1fa") is None
+    for backend in workers:
+        await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_against_the_mock_server():
+    with MockRedisServer(password="secret") as server:
+        backend = RedisCacheBackend(server.url)
+        cache = Cache("answers", 10, ttl_seconds=0.2, backend=backend)
+
+        await cache.set("u1*[x]", "a")
+        await cache.set("u1*other", "b")
+        await cache.set("u10", "c")
+        assert await cache.get_many(["u1*[x]", "u10", "nope"]) == {"u1*[x]": "a", "u10": "c"}
+        # Glob characters in the prefix are matched literally
+        assert await cache.invalidate_prefix("u1*") == 2
+        assert await cache.get("u10") == "c"
+        assert server.mock.calls["MGET"] == 1
+
+        await asyncio.sleep(0.3)
+        assert await cache.get("u10") is None
+        await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_redis_command_does_not_leave_its_reply_behind():
+    with MockRedisServer() as server:
+        execute = server.mock.execute
+
+        def slow_execute(session, args):
+            if args[1:] == [b"slow"]:
+                time.sleep(0.2)
+            return execute(session, args)
+        server.mock.execute = slow_execute
+
+        client = RESPClient(server.url)
+        await client.execute("SET", "slow", "stale")
+        await client.execute("SET", "fast", "fresh")
+        slow = asyncio.create_task(client.execute("GET", "slow"))
+        await asyncio.sleep(0.05)
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+        assert await client.execute("GET", "fast") == b"fresh"
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_redis_is_a_miss():
+    with MockRedisServer() as server:
+        url = server.url
+    cache = Cache("answers", 10, ttl_seconds=5, backend=RedisCacheBackend(url))
+    await cache.set("a", 1)
+    assert await cache.get("a") is None
+    assert await cache.get_many(["a"]) == {}
+
+
+@pytest.mark.asyncio
+async def test_graph_writes_invalidate_shared_entries(memory_backend, monkeypatch, tmp_path):
+    shared = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=100)
+    for name in ("rag_answer_cache", "query_embedding_cache", "user_exists_cache"):
+        monkeypatch.setattr(getattr(graph_ops_module, name), "backend", shared)
+    calls = []
+
+    async def fake_response(query, context):
+        calls.append(query)
+        return f"answer {len(calls)}"
+    monkeypatch.setattr("app.graph.rag_interface.generate_response_with_context", fake_response)
+
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    assert await graph_ops_module.user_exists_cache.get("u1") is True
+    rag = RAGInterface("u1", memory_backend)
+    assert await rag.query("hello") == "answer 1"
+    assert await rag.query("hello") == "answer 1"
+    embedded = []
+
+    async def fake_generate_embeddings(texts, **kwargs):
+        embedded.extend(texts)
+        return [[1.0, 0.0] for _ in texts]
+    monkeypatch.setattr("app.graph.graph_ops.generate_embeddings", fake_generate_embeddings)
+    # "hello" was embedded for the RAG query above; "new" is embedded once for both of its uses
+    new, hello, again = await graph_ops.embed_queries(["new", "hello", "new"])
+    assert embedded == ["new"]
+    assert new == again == [1.0, 0.0] and hello == fake_embedding("hello")
+
+    await graph_ops.delete_user("u1")
+    assert await graph_ops_module.user_exists_cache.get("u1") is None
+    assert not await graph_ops.user_exists("u1")
+    await graph_ops.create_user("u1")
+    assert await rag.query("hello") == "answer 2"
+    await shared.close()
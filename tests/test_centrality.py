@@ -0,0 +1,78 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.config import config
+from app.graph.centrality import CentralityJob, pagerank, update_centrality
+
+
+def test_pagerank_ranks_hub_highest():
+    # Four leaves pointing at a hub, which points back at one of them
+    sources = np.array([1, 2, 3, 4, 0])
+    targets = np.array([0, 0, 0, 0, 1])
+    rank, _ = pagerank(5, sources, targets)
+
+    assert rank.sum() == pytest.approx(1.0)
+    assert rank.argmax() == 0
+    assert rank[1] > rank[2] == pytest.approx(rank[3])
+
+
+def test_pagerank_warm_start_converges_faster():
+    rng = np.random.default_rng(0)
+    sources, targets = rng.integers(0, 200, 800), rng.integers(0, 200, 800)
+    cold, cold_iterations = pagerank(200, sources, targets)
+    warm, warm_iterations = pagerank(200, sources, targets, start=cold)
+
+    assert warm_iterations < cold_iterations
+    assert np.abs(warm - cold).sum() < 1e-5
+
+
+async def seed_star(backend, user_id="alice"):
+    await backend.create_user(user_id)
+    names = ["Hub", "A", "B", "C", "D"]
+    await backend.create_nodes([{"name": n, "perspective": None, "properties": {}} for n in names], user_id)
+    await backend.create_relationships(
+        [{"source": n, "target": "Hub", "relation": "KNOWS"} for n in names[1:]]
+        + [{"source": "A", "target": "B", "relation": "KNOWS"}],
+        user_id,
+    )
+
+
+@pytest.mark.asyncio
+async def test_update_centrality_stores_scores_and_skips_unchanged(memory_backend):
+    await seed_star(memory_backend)
+
+    assert await update_centrality(memory_backend, "alice") == 5
+    scores = await memory_backend.get_node_centrality("alice")
+    assert scores["Hub"]["degree"] == 4
+    assert max(scores, key=lambda n: scores[n]["pagerank"]) == "Hub"
+
+    assert await update_centrality(memory_backend, "alice") == 0
+
+
+@pytest.mark.asyncio
+async def test_expansion_follows_most_central_neighbours(memory_backend):
+    await seed_star(memory_backend)
+    await update_centrality(memory_backend, "alice")
+
+    capped = await memory_backend.get_node_relationships("A", "alice", limit=1)
+    assert [(r["source"], r["target"]) for r in capped] == [("A", "Hub")]
+    assert len(await memory_backend.get_node_relationships("A", "alice")) == 2
+
+
+@pytest.mark.asyncio
+async def test_job_debounces_updates(memory_backend, monkeypatch):
+    monkeypatch.setattr(config.GRAPH, "CENTRALITY_DELAY_SECONDS", 0.01)
+    runs = []
+
+    async def fake_update(backend, user_id):
+        runs.append(user_id)
+
+    monkeypatch.setattr("app.graph.centrality.update_centrality", fake_update)
+    for _ in range(5):
+        CentralityJob.schedule("alice", memory_backend)
+    await asyncio.sleep(0.05)
+
+    assert runs == ["alice"]
+    assert "alice" not in CentralityJob._tasks
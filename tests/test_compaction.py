@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.config import config
+from app.graph.compaction import AccessTracker, compact_user
+from app.graph.graph_ops import GraphOps
+from app.graph.rag_interface import RAGInterface
+from app.openai.llm_graph import Node
+from app.utils.models import NodeModel, NodesAndRelationshipsResponse
+
+DAY_MS = 86_400_000
+
+
+async def seed(backend, user_id="u1"):
+    await backend.create_user(user_id)
+    await backend.create_nodes([{"name": n, "perspective": f"about {n}", "properties": {}}
+                                for n in ("Alice", "Pasta", "Rust", "Old")], user_id)
+    await backend.create_relationships([
+        {"source": "Alice", "target": "Pasta", "relation": "loves"},
+        {"source": "Alice", "target": "Rust", "relation": "STUDIES"},
+    ], user_id)
+    await backend.record_node_access({"Rust": 5}, user_id)
+    return max(node["last_touched"] for node in backend.users[user_id].nodes.values())
+
+
+@pytest.mark.asyncio
+async def test_stale_leaves_are_folded_or_pruned(memory_backend):
+    now = await seed(memory_backend)
+    version = await memory_backend.get_graph_version("u1")
+
+    assert await compact_user(memory_backend, "u1", now_ms=now + DAY_MS) == {
+        "folded": 0, "pruned": 0, "summarized": 0, "summary_nodes": 0
+    }
+    counts = await compact_user(memory_backend, "u1", now_ms=now + 100 * DAY_MS)
+
+    assert counts == {"folded": 1, "pruned": 1, "summarized": 0, "summary_nodes": 0}
+    assert sorted(memory_backend.users["u1"].nodes) == ["Alice", "Rust"]
+    alice = await memory_backend.get_node_data("Alice", "u1")
+    assert alice["perspective"] == "about Alice"
+    assert alice["properties"]["compacted"] == ["Alice loves Pasta"]
+    assert await memory_backend.get_graph_version("u1") > version
+
+
+@pytest.mark.asyncio
+async def test_max_nodes_compacts_least_used_leaves(memory_backend, monkeypatch):
+    now = await seed(memory_backend)
+    monkeypatch.setattr(config.COMPACTION, "MAX_NODES", 2)
+
+    counts = await compact_user(memory_backend, "u1", now_ms=now)
+
+    assert counts["folded"] + counts["pruned"] == 2
+    assert sorted(memory_backend.users["u1"].nodes) == ["Alice", "Rust"]
+
+
+@pytest.mark.asyncio
+async def test_clusters_are_summarized(memory_backend, monkeypatch):
+    await memory_backend.create_user("u1")
+    dishes = ["Pasta", "Pizza", "Risotto"]
+    await memory_backend.create_nodes([{"name": n, "perspective": "", "properties": {}} for n in ["Alice"] + dishes], "u1")
+    await memory_backend.create_relationships([{"source": "Alice", "target": d, "relation": "LIKES"} for d in dishes], "u1")
+    monkeypatch.setattr(config.COMPACTION, "SUMMARIZE_MIN_CLUSTER", 3)
+    clusters = []
+
+    async def fake_summarize(hub, members):
+        clusters.append((hub, [m["name"] for m in members]))
+        return Node(name="Italian Food", perspective="Loves pasta, pizza and risotto")
+
+    async def fake_embeddings(texts, **kwargs):
+        return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr("app.graph.compaction.summarize_cluster", fake_summarize)
+    monkeypatch.setattr("app.graph.compaction.generate_embeddings", fake_embeddings)
+    counts = await compact_user(memory_backend, "u1", now_ms=2 ** 50, summarize=True)
+
+    assert clusters == [("Alice", dishes)]
+    assert counts == {"folded": 0, "pruned": 0, "summarized": 3, "summary_nodes": 1}
+    assert sorted(memory_backend.users["u1"].nodes) == ["Alice", "Italian Food"]
+    assert "Italian Food" in memory_backend.users["u1"].embeddings
+    assert [r["target"] for r in await memory_backend.get_node_relationships("Alice", "u1")] == ["Italian Food"]
+
+
+@pytest.mark.asyncio
+async def test_access_tracker_buffers_counts(memory_backend, monkeypatch):
+    await seed(memory_backend)
+    monkeypatch.setattr(config.COMPACTION, "ACCESS_FLUSH_SECONDS", 0.01)
+
+    AccessTracker.record("u1", ["Pasta", "Old"], memory_backend)
+    AccessTracker.record("u1", ["Pasta"], memory_backend)
+    assert memory_backend.users["u1"].nodes["Pasta"]["access_count"] == 0
+    await asyncio.sleep(0.05)
+
+    assert memory_backend.users["u1"].nodes["Pasta"]["access_count"] == 2
+    assert memory_backend.users["u1"].nodes["Old"]["access_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rag_queries_in_one_flush_window_are_counted(memory_backend, monkeypatch):
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(
+        nodes=[NodeModel(name="Pasta", perspective="favourite food")], relationships=[],
+    ), "u1")
+    monkeypatch.setattr(config.COMPACTION, "ACCESS_FLUSH_SECONDS", 0.01)
+    rag = RAGInterface("u1", memory_backend)
+
+    assert "## Pasta" in await rag.get_context("pasta", max_hops=0)
+    assert "## Pasta" in await rag.get_context("pasta", max_hops=0)
+    assert "Pasta" in await rag.get_vector_context("pasta")
+    await asyncio.sleep(0.05)
+
+    assert memory_backend.users["u1"].nodes["Pasta"]["access_count"] == 3
@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+# Read in a fresh interpreter, since the settings are read from the environment at import
+PRINT_SETTINGS = """
+import json
+from app.config import config
+print(json.dumps({name: getattr(section, name) for section, name in [
+    (config.NEO4J, "DELETE_BATCH_SIZE"), (config.GRAPH, "PAGE_SIZE"), (config.RAG, "CONTEXT_TOKEN_BUDGET"),
+    (config.RAG, "HOP_DECAY"), (config.COMPACTION, "ACCESS_FLUSH_SECONDS"), (config.ADMISSION, "RAG_MAX_QUEUE"),
+    (config.MACHINE_LEARNING, "OPENAI_MAX_RETRIES"), (config.MACHINE_LEARNING, "OPENAI_REQUESTS_PER_MINUTE"),
+    (config.MACHINE_LEARNING, "OPENAI_TOKENS_PER_MINUTE"),
+]}))
+"""
+
+
+def test_numeric_settings_from_the_environment_are_numbers():
+    env = dict(os.environ, NEO4J_DELETE_BATCH_SIZE="50", GRAPH_PAGE_SIZE="20", RAG_CONTEXT_TOKEN_BUDGET="2000",
+               RAG_HOP_DECAY="0.25", COMPACTION_ACCESS_FLUSH_SECONDS="-1", ADMISSION_RAG_MAX_QUEUE="7",
+               OPENAI_MAX_RETRIES="3", OPENAI_REQUESTS_PER_MINUTE="120", OPENAI_TOKENS_PER_MINUTE="9000.5")
+    output = subprocess.run([sys.executable, "-c", PRINT_SETTINGS], env=env, capture_output=True, text=True, check=True)
+    assert json.loads(output.stdout.splitlines()[-1]) == {
+        "DELETE_BATCH_SIZE": 50, "PAGE_SIZE": 20, "CONTEXT_TOKEN_BUDGET": 2000,
+        "HOP_DECAY": 0.25, "ACCESS_FLUSH_SECONDS": -1.0, "RAG_MAX_QUEUE": 7,
+        "OPENAI_MAX_RETRIES": 3, "OPENAI_REQUESTS_PER_MINUTE": 120.0, "OPENAI_TOKENS_PER_MINUTE": 9000.5,
+    }
@@ -0,0 +1,48 @@
+import pytest
+from app.graph.context_assembler import ContextAssembler
+from app.graph.graph_ops import GraphOps
+from app.graph.rag_interface import RAGInterface
+from app.utils.models import NodeModel, RelationshipModel, NodesAndRelationshipsResponse
+
+def test_nodes_are_described_once_with_their_best_relevance():
+    assembler = ContextAssembler(token_budget=1000)
+    assembler.add_node("Python", "loves it", {"years": 5}, score=0.9, hop=2)
+    assembler.add_node("Python", "loves it", {"years": 5}, score=0.8, hop=0)
+    assembler.add_node("Rust", "curious", {}, score=0.9, hop=1)
+    context = assembler.assemble()
+
+    assert context.text.count("## Python") == 1
+    assert context.text.index("## Python") < context.text.index("## Rust")
+    assert context.tokens_dropped == 0
+    assert 0 < context.tokens_used <= 1000
+
+def test_budget_drops_least_relevant_items():
+    assembler = ContextAssembler(token_budget=40)
+    for i in range(10):
+        assembler.add_node(f"Node {i}", "a fairly long perspective sentence " * 2, {}, score=1.0 - i / 10, hop=0)
+    context = assembler.assemble()
+
+    assert context.tokens_used <= 40
+    assert context.nodes_dropped > 0 and context.tokens_dropped > 0
+    assert "## Node 0" in context.text and "## Node 9" not in context.text
+
+@pytest.mark.asyncio
+async def test_rag_context_expands_breadth_first(memory_backend):
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    chain = ["Python", "FastAPI", "Starlette", "AnyIO", "Trio"]
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(
+        nodes=[NodeModel(name=name, perspective=f"about {name}") for name in chain],
+        relationships=[RelationshipModel(source=a, target=b, relation="USES") for a, b in zip(chain, chain[1:])],
+    ), "u1")
+
+    rag = RAGInterface("u1", memory_backend)
+    assembler = rag.new_assembler()
+    await rag.expand_context([{"nodeName": "Python", "score": 0.9}], 1, assembler)
+    context = assembler.assemble()
+
+    # One hop is expanded and its neighbours are described; nothing further
+    assert "## Python" in context.text and "## Starlette" in context.text
+    assert "AnyIO" not in context.text
+    assert "- FastAPI USES Starlette" in context.text
+    assert context.nodes_included == 3
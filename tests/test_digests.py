@@ -0,0 +1,88 @@
+import pytest
+
+from app.config import config
+from app.graph.graph_ops import GraphOps
+from app.graph.neo4j_database import Neo4jConnectionManager
+from app.graph.rag_interface import RAGInterface
+from app.utils.models import GraphUpdateModel, NodeModel, RelationshipModel
+
+
+@pytest.fixture
+def digests(monkeypatch):
+    monkeypatch.setattr(config.GRAPH, "NEIGHBORHOOD_DIGESTS", True)
+    monkeypatch.setattr(config.GRAPH, "DIGEST_MAX_NEIGHBORS", 2)
+    monkeypatch.setattr(config.GRAPH, "DIGEST_PERSPECTIVE_CHARS", 12)
+
+
+async def seed(backend):
+    graph_ops = GraphOps(backend)
+    await graph_ops.create_user("u1")
+    await graph_ops.apply_graph_update(GraphUpdateModel(
+        nodes=[NodeModel(name=name, perspective=f"all about {name}") for name in ("Ann", "Rust", "Go", "Zig")],
+        relationships=[RelationshipModel(source="Ann", target=target, relation="loves") for target in ("Rust", "Go", "Zig")],
+    ), "u1")
+    return graph_ops
+
+
+@pytest.mark.asyncio
+async def test_digests_follow_writes_and_deletes(memory_backend, digests):
+    graph_ops = await seed(memory_backend)
+
+    ann = (await graph_ops.get_node_digests(["Ann"], "u1"))["Ann"]
+    assert [(n.name, n.relation, n.value, n.outgoing) for n in ann.neighbors] == [
+        ("Go", "LIKES", "loves", True), ("Rust", "LIKES", "loves", True)
+    ]
+    assert ann.neighbors[0].perspective == "all about Go"[:12]
+    rust = (await graph_ops.get_node_digests(["Rust"], "u1"))["Rust"]
+    assert [(n.name, n.outgoing) for n in rust.neighbors] == [("Ann", False)]
+
+    # A neighbour's new perspective and a deleted neighbour show up in the digest
+    await graph_ops.apply_graph_update(GraphUpdateModel(
+        nodes=[NodeModel(name="Rust", perspective="new")], delete_nodes=["Go"],
+    ), "u1")
+    ann = (await graph_ops.get_node_digests(["Ann"], "u1"))["Ann"]
+    assert [(n.name, n.perspective) for n in ann.neighbors] == [("Rust", "new"), ("Zig", "all about Zi")]
+
+
+@pytest.mark.asyncio
+async def test_rag_context_is_built_from_seed_digests(memory_backend, digests, monkeypatch):
+    await seed(memory_backend)
+    reads = []
+    for name in ("get_node_digests", "get_nodes_data", "get_nodes_relationships"):
+        method = getattr(memory_backend, name)
+
+        async def counted(*args, _name=name, _method=method, **kwargs):
+            reads.append(_name)
+            return await _method(*args, **kwargs)
+        monkeypatch.setattr(memory_backend, name, counted)
+
+    rag = RAGInterface("u1", memory_backend)
+    assembler = rag.new_assembler()
+    assert await rag.digest_contexts([[{"nodeName": "Ann", "score": 0.9}]], [assembler]) == []
+    context = assembler.assemble()
+
+    assert reads == ["get_node_digests"]
+    assert "## Ann\nPerspective: all about Ann" in context.text
+    assert "## Rust\nPerspective: all about Ru\n" in context.text
+    assert "- Ann LIKES Go" in context.text and "Zig" not in context.text
+
+
+@pytest.mark.asyncio
+async def test_nodes_without_digests_are_expanded(memory_backend, monkeypatch):
+    await seed(memory_backend)
+    monkeypatch.setattr(config.GRAPH, "NEIGHBORHOOD_DIGESTS", True)
+
+    rag = RAGInterface("u1", memory_backend)
+    assert await rag.digest_contexts([[{"nodeName": "Ann", "score": 0.9}]], [rag.new_assembler()]) == [0]
+    assert "## Zig" in (await rag.assemble_context("anything", max_hops=0)).text
+
+
+def test_neo4j_writes_rebuild_digests_in_the_same_transaction(monkeypatch):
+    rels = [{"source": "Ann", "target": "Rust", "relation": "loves"}]
+    assert Neo4jConnectionManager._digest_statements("u1", ["Ann"], rels) == []
+
+    monkeypatch.setattr(config.GRAPH, "NEIGHBORHOOD_DIGESTS", True)
+    statements = Neo4jConnectionManager._digest_statements("u1", ["Ann"], rels)
+    assert [params.get("names") for _, params in statements] == [["Ann"], ["Ann", "Rust"], None]
+    assert [params.get("with_neighbours") for _, params in statements[:2]] == [True, False]
+    assert statements[-1][0] == Neo4jConnectionManager.REFRESH_DIGESTS_QUERY
@@ -0,0 +1,58 @@
+import pytest
+
+from app.graph.entity_resolution import EntityResolver, normalize_name
+from app.graph.graph_ops import GraphOps
+from app.utils.models import NodeModel, NodesAndRelationshipsResponse, RelationshipModel
+
+
+def test_normalize_name():
+    assert normalize_name("  Artificial   Intelligence ") == "artificial intelligence"
+    assert normalize_name("A.I.") == normalize_name("ai") == "ai"
+    assert normalize_name("Café-Society") == "cafe society"
+
+
+@pytest.mark.asyncio
+async def test_update_graph_folds_name_variants_into_existing_node(memory_backend):
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(
+        nodes=[NodeModel(name="AI", perspective="interested")], relationships=[],
+    ), "u1")
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(
+        nodes=[NodeModel(name="A.I.", perspective="works in"), NodeModel(name="Rust", perspective="learning")],
+        relationships=[
+            RelationshipModel(source="rust", target="ai", relation="USED_FOR"),
+            RelationshipModel(source="AI", target="a.i", relation="SAME"),
+        ],
+    ), "u1")
+
+    assert sorted(memory_backend.users["u1"].nodes) == ["AI", "Rust"]
+    node = memory_backend.users["u1"].nodes["AI"]
+    assert node["perspective"] == "works in" and node["aliases"] == ["A.I."]
+    assert await memory_backend.get_node_relationships("AI", "u1") == [
+        {"source": "Rust", "target": "AI", "relation": "USED_FOR", "value": "USED_FOR"}
+    ]
+    assert await memory_backend.find_nodes_by_keys(["a i", "ai"], "u1") == {"ai": "AI"}
+
+
+@pytest.mark.asyncio
+async def test_embedding_neighbours_merge_above_threshold(memory_backend):
+    vectors = {"Artificial Intelligence": [1.0, 0.0, 0.0], "AI": [0.99, 0.1, 0.0],
+               "Machine Intelligence": [0.98, 0.15, 0.0], "Gardening": [0.0, 1.0, 0.0]}
+
+    async def embed(names):
+        return {name: vectors[name] for name in names}
+
+    await memory_backend.create_user("u1")
+    await memory_backend.create_nodes([{"name": "Artificial Intelligence", "perspective": "", "properties": {}}], "u1")
+    await memory_backend.add_embeddings_to_vector_index({"Artificial Intelligence": vectors["Artificial Intelligence"]}, "u1")
+
+    resolver = EntityResolver(memory_backend, embed, threshold=0.99)
+    resolution = await resolver.resolve(
+        [{"name": name, "perspective": "", "properties": {}} for name in ("AI", "Gardening", "Machine Intelligence")], "u1"
+    )
+
+    assert resolution.renames == {"AI": "Artificial Intelligence", "Machine Intelligence": "Artificial Intelligence"}
+    assert [node["name"] for node in resolution.nodes] == ["Artificial Intelligence", "Gardening"]
+    assert resolution.nodes[0]["aliases"] == ["AI", "Machine Intelligence"]
+    assert list(resolution.embeddings) == ["Gardening"]
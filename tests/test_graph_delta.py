@@ -0,0 +1,73 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.config import config
+from app.graph.graph_ops import GraphOps
+from app.utils.models import GraphUpdateModel, NodeModel, RelationshipModel
+from tests.conftest import fake_embedding
+
+@pytest.fixture
+def embedded_names(memory_backend, monkeypatch):
+    names = []
+
+    async def recording_embeddings(texts, **kwargs):
+        names.extend(texts)
+        return [fake_embedding(text) for text in texts]
+
+    monkeypatch.setattr("app.graph.graph_ops.generate_embeddings", recording_embeddings)
+    return names
+
+@pytest.mark.asyncio
+async def test_delta_embeds_only_new_nodes_and_applies_deletes(memory_backend, embedded_names):
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    await graph_ops.apply_graph_update(GraphUpdateModel(
+        nodes=[NodeModel(name="Python"), NodeModel(name="Rust"), NodeModel(name="Go")],
+        relationships=[RelationshipModel(source="Python", target="Rust", relation="LEADS_TO"),
+                       RelationshipModel(source="Python", target="Go", relation="LEADS_TO")],
+    ), "u1")
+    embedded_names.clear()
+    version = await memory_backend.get_graph_version("u1")
+
+    counts = await graph_ops.apply_graph_update(GraphUpdateModel(
+        nodes=[NodeModel(name="Python", perspective="updated"), NodeModel(name="Zig"),
+               NodeModel(name="C", embedding=fake_embedding("C"))],
+        relationships=[RelationshipModel(source="Zig", target="C", relation="INSPIRED_BY")],
+        delete_nodes=["Go"],
+        delete_relationships=[RelationshipModel(source="Python", target="Rust", relation="LEADS_TO")],
+    ), "u1")
+
+    assert embedded_names == ["Zig"]
+    assert counts["embeddings_generated"] == 1 and counts["nodes_deleted"] == 1
+    assert (await memory_backend.get_node_data("Python", "u1"))["perspective"] == "updated"
+    assert await memory_backend.get_node_data("Go", "u1") is None
+    assert await memory_backend.get_all_relationships("u1") == [{"source": "Zig", "relation": "INSPIRED_BY", "target": "C"}]
+    assert await memory_backend.nodes_missing_embeddings(["Python", "Zig", "C"], "u1") == []
+    assert await memory_backend.get_graph_version("u1") == version + 1
+
+def test_patch_endpoint(memory_backend, embedded_names, monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(config.GRAPH, "BACKEND", "memory")
+    monkeypatch.setattr("app.graph.backend._memory_backend", memory_backend)
+
+    with TestClient(app) as client:
+        body = {"nodes": [{"name": "Python"}], "relationships": []}
+        assert client.patch("/api/v1/graph/nobody", json=body).status_code == 404
+        client.post("/api/v1/users", json={"user_id": "u1"})
+        response = client.patch("/api/v1/graph/u1", json=body)
+        assert response.status_code == 200
+        assert response.json()["nodes_upserted"] == 1
+
+@pytest.mark.asyncio
+async def test_deleting_a_relationship_leaves_other_types_with_the_same_value(memory_backend):
+    await memory_backend.create_user("u1")
+    await memory_backend.create_nodes([{"name": "Python"}, {"name": "Rust"}], "u1")
+    await memory_backend.create_relationships([
+        {"source": "Python", "target": "Rust", "relation": "LEADS_TO", "value": "shared"},
+        {"source": "Python", "target": "Rust", "relation": "INSPIRED_BY", "value": "shared"},
+    ], "u1")
+
+    await memory_backend.apply_graph_delta({"delete_relationships": [
+        {"source": "Python", "target": "Rust", "relation": "INSPIRED_BY", "value": "other"},
+        {"source": "Python", "target": "Rust", "relation": "LEADS_TO"},
+    ]}, "u1")
+    assert await memory_backend.get_all_relationships("u1") == [{"source": "Python", "relation": "INSPIRED_BY", "target": "Rust"}]
@@ -0,0 +1,64 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.config import config
+from app.graph.graph_io import GraphImportError, export_graph, import_graph, iter_lines
+from tests.conftest import fake_embedding
+
+async def seed(backend, user_id="u1"):
+    await backend.create_user(user_id)
+    await backend.create_nodes([
+        {"name": "Python", "perspective": "daily driver", "properties": {"years": 5, "tags": ["web"]}},
+        {"name": "Rust", "perspective": "learning"},
+    ], user_id)
+    await backend.create_relationships([{"source": "Python", "target": "Rust", "relation": "LEADS_TO"}], user_id)
+    await backend.add_embeddings_to_vector_index({"Python": fake_embedding("Python")}, user_id)
+
+async def collect(lines):
+    return [line async for line in lines]
+
+async def from_list(lines):
+    for line in lines:
+        yield line
+
+@pytest.mark.asyncio
+async def test_export_then_import_round_trips(memory_backend):
+    await seed(memory_backend)
+    exported = await collect(export_graph(memory_backend, "u1"))
+    assert [json.loads(line)["type"] for line in exported] == ["header", "node", "node", "relationship"]
+
+    counts = await import_graph(memory_backend, "u2", from_list(exported), batch_size=1)
+    assert counts == {"nodes": 2, "embeddings": 1, "relationships": 1}
+    assert await memory_backend.get_node_data("Python", "u2") == await memory_backend.get_node_data("Python", "u1")
+    assert await memory_backend.get_all_relationships("u2") == await memory_backend.get_all_relationships("u1")
+    copied = [node async for node in memory_backend.iter_nodes("u2") if node["name"] == "Python"][0]
+    assert copied["embedding"] == pytest.approx(fake_embedding("Python"))
+
+@pytest.mark.asyncio
+async def test_import_rejects_missing_header(memory_backend):
+    with pytest.raises(GraphImportError, match="Line 1"):
+        await import_graph(memory_backend, "u1", from_list(['{"type": "node", "name": "x"}']))
+
+@pytest.mark.asyncio
+async def test_iter_lines_keeps_characters_split_across_chunks():
+    body = '{"name": "Café"}\n{"name": "Zürich"}'.encode("utf-8")
+    split = body.index("é".encode("utf-8")) + 1
+    assert await collect(iter_lines(from_list([body[:split], body[split:]]))) == ['{"name": "Café"}', '{"name": "Zürich"}']
+    with pytest.raises(GraphImportError, match="UTF-8"):
+        await collect(iter_lines(from_list([body[:split]])))
+
+def test_export_and_import_endpoints(memory_backend, monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(config.GRAPH, "BACKEND", "memory")
+    monkeypatch.setattr("app.graph.backend._memory_backend", memory_backend)
+
+    with TestClient(app) as client:
+        assert client.get("/api/v1/users/nobody/graph/export").status_code == 404
+        client.portal.call(seed, memory_backend)
+        response = client.get("/api/v1/users/u1/graph/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        imported = client.post("/api/v1/users/u3/graph/import", content=response.content)
+        assert imported.json()["relationships"] == 1
+        assert client.post("/api/v1/users/u4/graph/import", content=b"not json\n").status_code == 400
@@ -0,0 +1,56 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.config import config
+from app.graph.graph_ops import GraphOps
+
+async def seed(backend, user_id="u1", count=7):
+    await backend.create_user(user_id)
+    names = [f"Node {i}" for i in range(count)]
+    await backend.create_nodes([{"name": name, "perspective": name.lower()} for name in names], user_id)
+    await backend.create_relationships([
+        {"source": a, "target": b, "relation": relation}
+        for a in names[:3] for b in names[3:5] for relation in ("LIKES", "USES")
+    ], user_id)
+
+async def walk(page_fn, limit):
+    items, cursor, pages = [], None, 0
+    while True:
+        page = await page_fn("u1", cursor=cursor, limit=limit)
+        items += page["items"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_everything_once(memory_backend):
+    await seed(memory_backend)
+    graph_ops = GraphOps(memory_backend)
+
+    nodes, pages = await walk(graph_ops.get_nodes_page, 3)
+    assert [node["name"] for node in nodes] == sorted(f"Node {i}" for i in range(7))
+    assert pages == 3
+
+    relationships, _ = await walk(graph_ops.get_relationships_page, 5)
+    keys = [(r["source"], r["target"], r["relation"]) for r in relationships]
+    assert keys == sorted(keys) and len(set(keys)) == 12
+
+    with pytest.raises(ValueError):
+        await graph_ops.get_nodes_page("u1", cursor="not-a-cursor")
+
+def test_page_and_stream_endpoints(memory_backend, monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(config.GRAPH, "BACKEND", "memory")
+    monkeypatch.setattr("app.graph.backend._memory_backend", memory_backend)
+
+    with TestClient(app) as client:
+        client.portal.call(seed, memory_backend)
+        page = client.get("/api/v1/graph/u1/nodes", params={"limit": 5}).json()
+        assert len(page["items"]) == 5 and page["next_cursor"]
+        assert client.get("/api/v1/graph/u1/nodes", params={"cursor": "bad"}).status_code == 400
+        assert client.get("/api/v1/graph/nobody/relationships").status_code == 404
+
+        streamed = client.get("/api/v1/graph/u1/relationships/stream")
+        assert len(json.loads(streamed.content)) == 12
+        assert "embedding" not in json.loads(client.get("/api/v1/graph/u1/nodes/stream").content)[0]
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from app.api.ingest_queue import UserIngestQueue
+from app.utils.models import UnstructuredData
+
+@pytest.mark.asyncio
+async def test_queued_documents_for_one_user_are_coalesced(monkeypatch):
+    processed = []
+    release = asyncio.Event()
+
+    async def fake_process(user_id, documents):
+        processed.append((user_id, [d.content for d in documents]))
+        await release.wait()
+
+    monkeypatch.setattr(UserIngestQueue, "_process", classmethod(lambda cls, u, d: fake_process(u, d)))
+
+    submits = [
+        asyncio.create_task(UserIngestQueue.submit("u1", UnstructuredData(title="t", content=f"doc {i}")))
+        for i in range(4)
+    ]
+    other = asyncio.create_task(UserIngestQueue.submit("u2", UnstructuredData(title="t", content="other")))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*submits, other)
+
+    u1_batches = [docs for user_id, docs in processed if user_id == "u1"]
+    assert len(u1_batches) < 4
+    assert [doc for docs in u1_batches for doc in docs] == ["doc 0", "doc 1", "doc 2", "doc 3"]
+    assert ("u2", ["other"]) in processed
+    assert UserIngestQueue.queue_depth("u1") == 0
+
+@pytest.mark.asyncio
+async def test_batch_failure_is_raised_to_every_caller(monkeypatch):
+    async def failing_process(user_id, documents):
+        raise RuntimeError("llm down")
+
+    monkeypatch.setattr(UserIngestQueue, "_process", classmethod(lambda cls, u, d: failing_process(u, d)))
+
+    with pytest.raises(RuntimeError, match="llm down"):
+        await UserIngestQueue.submit("u1", UnstructuredData(title="t", content="doc"))
+
+@pytest.mark.asyncio
+async def test_worker_errors_outside_a_batch_do_not_leave_callers_waiting(monkeypatch):
+    from app.config import config
+    monkeypatch.setattr(config.INGEST, "MAX_BATCH_DOCUMENTS", "4")
+
+    with pytest.raises(TypeError):
+        await asyncio.wait_for(UserIngestQueue.submit("u1", UnstructuredData(title="t", content="doc")), 1)
+    assert UserIngestQueue.queue_depth("u1") == 0
+
+@pytest.mark.asyncio
+async def test_stopped_worker_fails_queued_documents(monkeypatch):
+    started = asyncio.Event()
+
+    async def slow_process(user_id, documents):
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(UserIngestQueue, "_process", classmethod(lambda cls, u, d: slow_process(u, d)))
+    submits = [asyncio.create_task(UserIngestQueue.submit("u1", UnstructuredData(title="t", content=f"doc {i}")))
+               for i in range(2)]
+    await started.wait()
+    submits.append(asyncio.create_task(UserIngestQueue.submit("u1", UnstructuredData(title="t", content="late"))))
+    await asyncio.sleep(0)
+    UserIngestQueue._workers["u1"].cancel()
+
+    results = await asyncio.wait_for(asyncio.gather(*submits, return_exceptions=True), 1)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert "u1" not in UserIngestQueue._workers
+
+def test_merge_joins_content_and_metadata():
+    merged = UserIngestQueue.merge([
+        UnstructuredData(title="a", content="one", metadata={"k": "1"}),
+        UnstructuredData(title="a", content="two", metadata={"j": "2"}),
+    ])
+    assert merged.title == "a"
+    assert "one" in merged.content and "two" in merged.content
+    assert merged.metadata == {"k": "1", "j": "2"}
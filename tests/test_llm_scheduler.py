@@ -0,0 +1,75 @@
+import asyncio
+import httpx
+import openai
+import pytest
+from app.openai.scheduler import LLMRateLimitError, LLMScheduler, LLMUnavailableError, Priority, TokenBucket, llm_priority
+
+def make_scheduler(**overrides):
+    settings = dict(max_concurrency=1, requests_per_minute=60000, tokens_per_minute=10**9,
+                    timeout=1.0, max_retries=2, backoff_base=0.001, backoff_max=0.01)
+    settings.update(overrides)
+    return LLMScheduler(**settings)
+
+def rate_limit_error(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "http://openai.test"))
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+@pytest.mark.asyncio
+async def test_interactive_calls_overtake_background_ones():
+    scheduler = make_scheduler()
+    release = asyncio.Event()
+    order = []
+
+    async def call(name):
+        if name == "first":
+            await release.wait()
+        order.append(name)
+
+    first = asyncio.create_task(scheduler.run(lambda: call("first")))
+    await asyncio.sleep(0)
+    with llm_priority(Priority.BACKGROUND):
+        background = asyncio.create_task(scheduler.run(lambda: call("background")))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(scheduler.run(lambda: call("interactive")))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, background, interactive)
+
+    assert order == ["first", "interactive", "background"]
+
+@pytest.mark.asyncio
+async def test_rate_limits_are_retried_then_surfaced():
+    scheduler = make_scheduler()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise rate_limit_error()
+        return "ok"
+
+    assert await scheduler.run(flaky) == "ok"
+
+    async def always_limited():
+        raise rate_limit_error(retry_after="0.01")
+
+    with pytest.raises(LLMRateLimitError) as excinfo:
+        await make_scheduler(backoff_max=0.001).run(always_limited, priority=Priority.INTERACTIVE)
+    assert excinfo.value.status_code == 429
+
+@pytest.mark.asyncio
+async def test_timeouts_become_unavailable_errors():
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(LLMUnavailableError):
+        await make_scheduler(max_retries=1).run(slow, timeout=0.01)
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])
+    assert bucket.wait_time(60) == 0
+    assert bucket.wait_time(30) == pytest.approx(30.0)
+    now[0] = 30.0
+    assert bucket.wait_time(30) == 0
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from app.graph.graph_ops import GraphOps
+from app.utils.models import NodeModel, RelationshipModel, NodesAndRelationshipsResponse
+from tests.conftest import fake_embedding
+
+@pytest.mark.asyncio
+async def test_writes_require_existing_user(memory_backend):
+    await memory_backend.create_nodes([{"name": "Python"}], "ghost")
+    assert not await memory_backend.user_exists("ghost")
+    assert await memory_backend.get_all_nodes("ghost") == []
+
+@pytest.mark.asyncio
+async def test_nodes_and_relationships_merge(memory_backend):
+    await memory_backend.create_user("u1")
+    await memory_backend.create_nodes([{"name": "Python", "perspective": "old"}, {"name": "FastAPI"}], "u1")
+    await memory_backend.create_nodes([{"name": "Python", "perspective": "new", "properties": {"k": "v"}}], "u1")
+    rel = {"source": "FastAPI", "target": "Python", "relation": "BUILT_WITH"}
+    await memory_backend.create_relationships([rel, rel], "u1")
+
+    assert len(await memory_backend.get_all_nodes("u1")) == 2
+    assert await memory_backend.get_node_data("Python", "u1") == {"name": "Python", "perspective": "new", "properties": {"k": "v"}}
+    assert await memory_backend.get_all_relationships("u1") == [{"source": "FastAPI", "relation": "BUILT_WITH", "target": "Python"}]
+    assert await memory_backend.get_node_relationships("Python", "u1") == [
+        {"source": "FastAPI", "target": "Python", "relation": "BUILT_WITH", "value": "BUILT_WITH"}
+    ]
+    assert await memory_backend.get_node_data("Missing", "u1") is None
+
+@pytest.mark.asyncio
+async def test_similarity_is_scoped_to_user(memory_backend):
+    for user_id in ("u1", "u2"):
+        await memory_backend.create_user(user_id)
+    await memory_backend.create_nodes([{"name": "Python"}, {"name": "Zebra"}], "u1")
+    await memory_backend.create_nodes([{"name": "Pythons"}], "u2")
+    for name in ("Python", "Zebra"):
+        await memory_backend.add_embedding_to_vector_index(name, fake_embedding(name), "u1")
+    await memory_backend.add_embedding_to_vector_index("Pythons", fake_embedding("Pythons"), "u2")
+
+    results = await memory_backend.query_text_similarity(fake_embedding("Python"), "u1")
+    assert [r["nodeName"] for r in results] == ["Python", "Zebra"]
+    assert results[0]["score"] == pytest.approx(1.0)
+
+@pytest.mark.asyncio
+async def test_graph_ops_round_trip(memory_backend):
+    async with GraphOps(memory_backend) as graph_ops:
+        await graph_ops.create_user("u1")
+        await graph_ops.update_graph(NodesAndRelationshipsResponse(
+            nodes=[NodeModel(name="Python", perspective="Favourite language"), NodeModel(name="FastAPI")],
+            relationships=[RelationshipModel(source="FastAPI", target="Python", relation="BUILT_WITH")],
+        ), "u1")
+
+        search = await graph_ops.perform_similarity_search("Python", "u1")
+        assert search["results"][0]["nodeName"] == "Python"
+        assert (await graph_ops.get_node_data("Python", "u1")).perspective == "Favourite language"
+        assert len(await graph_ops.get_node_relationships("Python", "u1")) == 1
+
+        await graph_ops.delete_user("u1")
+        assert not await graph_ops.user_exists("u1")
+
+@pytest.mark.asyncio
+async def test_delete_user_job_reports_progress(memory_backend, monkeypatch):
+    from app.api.job_service import JobService
+    from app.api.user_service import UserService
+    monkeypatch.setattr("app.graph.graph_ops.get_graph_backend", lambda: memory_backend)
+
+    await memory_backend.create_user("u1")
+    await memory_backend.create_nodes([{"name": "A"}, {"name": "B"}], "u1")
+
+    job = UserService.start_delete_user("u1")
+    await asyncio.wait_for(JobService._tasks[job.job_id], timeout=1)
+
+    assert JobService.get(job.job_id).status == "completed"
+    assert job.progress == {"deleted": 2, "total": 2}
+    assert not await memory_backend.user_exists("u1")
+
+@pytest.mark.asyncio
+async def test_properties_are_flattened_merged_and_filterable(memory_backend):
+    await memory_backend.create_user("u1")
+    await memory_backend.create_nodes([{"name": "Jacket", "properties": {"style": {"era": "90s"}, "material": "denim"}}], "u1")
+    await memory_backend.create_nodes([{"name": "Jacket", "properties": {"material": "leather"}}, {"name": "Jeans"}], "u1")
+    for name in ("Jacket", "Jeans"):
+        await memory_backend.add_embedding_to_vector_index(name, fake_embedding(name), "u1")
+
+    node = await memory_backend.get_node_data("Jacket", "u1")
+    assert node["properties"] == {"style.era": "90s", "material": "leather"}
+
+    results = await memory_backend.query_text_similarity(fake_embedding("Jeans"), "u1", property_filters={"material": "leather"})
+    assert [r["nodeName"] for r in results] == ["Jacket"]
+    results = await memory_backend.query_text_similarity(fake_embedding("Jeans"), "u1", property_filters={"style": {"era": "90s"}})
+    assert [r["nodeName"] for r in results] == ["Jacket"]
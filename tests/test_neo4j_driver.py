@@ -0,0 +1,33 @@
+import asyncio
+
+from app.graph import neo4j_database
+
+
+class FakeDriver:
+    def __init__(self, *args, **kwargs):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_driver_of_a_previous_event_loop_is_closed(monkeypatch):
+    monkeypatch.setattr(neo4j_database.AsyncGraphDatabase, "driver", FakeDriver)
+    monkeypatch.setattr(neo4j_database, "_driver", None)
+    monkeypatch.setattr(neo4j_database, "_driver_loop", None)
+    monkeypatch.setattr(neo4j_database, "_schema_ready", neo4j_database._schema_ready)
+    monkeypatch.setattr(neo4j_database, "_bookmark_manager", neo4j_database._bookmark_manager)
+
+    async def get():
+        return neo4j_database.get_driver()
+
+    async def get_and_settle():
+        driver = neo4j_database.get_driver()
+        await asyncio.sleep(0)
+        return driver
+
+    first = asyncio.run(get())
+    second = asyncio.run(get_and_settle())
+    assert second is not first and first.closed and not second.closed
+    asyncio.run(neo4j_database.close_driver())
+    assert second.closed
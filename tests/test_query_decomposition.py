@@ -0,0 +1,111 @@
+import pytest
+
+from app.config import config
+from app.graph.graph_ops import GraphOps
+from app.graph.query_decomposition import decompose_query, merge_seeds, split_query
+from app.graph.rag_interface import RAGInterface
+from app.utils.models import NodeModel, NodesAndRelationshipsResponse
+
+
+def test_split_query_at_connectives():
+    assert split_query("How do my space interests relate to my teaching?", 3) == ["How do my space interests", "my teaching"]
+    assert split_query("What is the link between rockets and teaching?", 3) == ["What is the link between rockets", "teaching"]
+    assert split_query("rockets, stars, kids, maps", 2) == ["rockets", "stars"]
+    assert split_query("What is Python?", 3) == []
+
+
+def test_merge_seeds_takes_every_list_best_first():
+    first = [{"nodeName": "A", "score": 0.9}, {"nodeName": "B", "score": 0.8}, {"nodeName": "C", "score": 0.7}]
+    second = [{"nodeName": "X", "score": 0.6}, {"nodeName": "A", "score": 0.95}]
+    merged = merge_seeds([first, second], max_seeds=3)
+    assert [(seed["nodeName"], seed["score"]) for seed in merged] == [("A", 0.95), ("X", 0.6), ("B", 0.8)]
+    assert first[0]["score"] == 0.9
+
+
+@pytest.mark.asyncio
+async def test_llm_decomposition_is_cached_and_falls_back(monkeypatch, memory_backend):
+    monkeypatch.setattr(config.RAG, "DECOMPOSITION_METHOD", "llm")
+    calls = []
+
+    async def fake_sub_queries(query, max_queries):
+        calls.append(query)
+        return [] if "fail" in query else ["my interest in space", "my teaching"]
+    monkeypatch.setattr("app.graph.query_decomposition.generate_sub_queries", fake_sub_queries)
+
+    question = "How does space connect with what I teach?"
+    assert await decompose_query(question) == [question, "my interest in space", "my teaching"]
+    assert await decompose_query(" how does SPACE connect with what I teach? ") == [
+        " how does SPACE connect with what I teach? ", "my interest in space", "my teaching"
+    ]
+    assert len(calls) == 1
+    assert await decompose_query("fail on rockets and teaching") == ["fail on rockets and teaching", "fail on rockets", "teaching"]
+
+
+@pytest.mark.asyncio
+async def test_decomposed_query_seeds_every_topic(memory_backend, monkeypatch):
+    calls = {"embeddings": 0, "searches": 0}
+
+    async def topic_embeddings(texts, **kwargs):
+        calls["embeddings"] += 1
+        return [[float("space" in t.lower() or "astronomy" in t.lower()),
+                 float("teach" in t.lower() or "classroom" in t.lower()), 0.1] for t in texts]
+    monkeypatch.setattr("app.graph.graph_ops.generate_embeddings", topic_embeddings)
+    search = memory_backend.query_text_similarity_many
+
+    async def counted_search(*args, **kwargs):
+        calls["searches"] += 1
+        return await search(*args, **kwargs)
+    monkeypatch.setattr(memory_backend, "query_text_similarity_many", counted_search)
+
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(
+        nodes=[NodeModel(name="Astronomy", perspective="stargazing"), NodeModel(name="Classroom", perspective="teaching kids")],
+        relationships=[],
+    ), "u1")
+    memory_backend.top_k = 1
+    rag = RAGInterface("u1", memory_backend)
+    question = "How do my space interests relate to my teaching?"
+
+    plain = await rag.get_context(question, max_hops=0)
+    assert ("## Astronomy" in plain) != ("## Classroom" in plain)
+
+    calls.update(embeddings=0, searches=0)
+    decomposed = await rag.get_context(question, max_hops=0, decompose=True)
+    assert "## Astronomy" in decomposed and "## Classroom" in decomposed
+    assert calls == {"embeddings": 1, "searches": 1}
+
+
+@pytest.mark.asyncio
+async def test_batch_decomposes_every_query_in_one_search(memory_backend, monkeypatch):
+    calls = {"embeddings": 0, "searches": 0}
+
+    async def topic_embeddings(texts, **kwargs):
+        calls["embeddings"] += 1
+        return [[float("space" in t.lower() or "astronomy" in t.lower()),
+                 float("teach" in t.lower() or "classroom" in t.lower()),
+                 float("cook" in t.lower() or "pasta" in t.lower()), 0.1] for t in texts]
+    monkeypatch.setattr("app.graph.graph_ops.generate_embeddings", topic_embeddings)
+    search = memory_backend.query_text_similarity_many
+
+    async def counted_search(*args, **kwargs):
+        calls["searches"] += 1
+        return await search(*args, **kwargs)
+    monkeypatch.setattr(memory_backend, "query_text_similarity_many", counted_search)
+
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(
+        nodes=[NodeModel(name="Astronomy", perspective="stargazing"), NodeModel(name="Classroom", perspective="teaching kids"),
+               NodeModel(name="Pasta", perspective="cooking")],
+        relationships=[],
+    ), "u1")
+    memory_backend.top_k = 1
+    rag = RAGInterface("u1", memory_backend)
+
+    calls.update(embeddings=0, searches=0)
+    first, second = await rag.assemble_contexts(["How do my space interests relate to my teaching?", "What do I cook?"],
+                                                max_hops=0, decompose=True)
+    assert "## Astronomy" in first.text and "## Classroom" in first.text and "## Pasta" not in first.text
+    assert "## Pasta" in second.text
+    assert calls == {"embeddings": 1, "searches": 1}
@@ -0,0 +1,83 @@
+import pytest
+
+from app.graph.graph_ops import GraphOps
+from app.graph.rag_interface import RAGInterface
+from app.utils.models import NodeModel, NodesAndRelationshipsResponse, RelationshipModel
+from tests.conftest import fake_embedding
+
+
+@pytest.fixture
+def calls(monkeypatch, memory_backend):
+    calls = {"embeddings": 0, "contexts": {}}
+
+    async def fake_generate_embeddings(texts, **kwargs):
+        calls["embeddings"] += 1
+        return [fake_embedding(text) for text in texts]
+
+    async def fake_response(query, context):
+        calls["contexts"][query] = context
+        return f"answer to {query}"
+
+    def counted(name):
+        method = getattr(memory_backend, name)
+
+        async def wrapper(*args, **kwargs):
+            calls[name] = calls.get(name, 0) + 1
+            return await method(*args, **kwargs)
+        monkeypatch.setattr(memory_backend, name, wrapper)
+
+    for name in ("query_text_similarity", "query_text_similarity_many", "get_nodes_data", "get_nodes_relationships"):
+        counted(name)
+    monkeypatch.setattr("app.graph.graph_ops.generate_embeddings", fake_generate_embeddings)
+    monkeypatch.setattr("app.graph.rag_interface.generate_response_with_context", fake_response)
+    return calls
+
+
+async def seed(backend):
+    graph_ops = GraphOps(backend)
+    await graph_ops.create_user("u1")
+    chain = ["Python", "FastAPI", "Starlette", "Rust", "Tokio"]
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(
+        nodes=[NodeModel(name=name, perspective=f"about {name}") for name in chain],
+        relationships=[RelationshipModel(source=a, target=b, relation="USES") for a, b in zip(chain, chain[1:])],
+    ), "u1")
+
+
+@pytest.mark.asyncio
+async def test_batch_shares_embedding_search_and_expansion(memory_backend, calls):
+    await seed(memory_backend)
+    calls.update(embeddings=0, contexts={})
+    rag = RAGInterface("u1", memory_backend)
+    queries = ["python web", "rust async", "fast apis", "Python  Web"]
+
+    answers = await rag.query_many(queries)
+
+    assert answers == ["answer to python web", "answer to rust async", "answer to fast apis", "answer to python web"]
+    assert calls["embeddings"] == 1
+    assert calls["query_text_similarity_many"] == 1 and "query_text_similarity" not in calls
+    # One node read and one neighbour read per hop, however many queries share it
+    assert calls["get_nodes_data"] <= 4 and calls["get_nodes_relationships"] <= 3
+    assert len(calls["contexts"]) == 3
+
+    # The same context as answering the query on its own
+    batched = calls["contexts"]["rust async"]
+    assert await rag.query("rust async", bypass_cache=True) == "answer to rust async"
+    assert calls["contexts"]["rust async"] == batched
+
+
+@pytest.mark.asyncio
+async def test_batch_reuses_cached_answers(memory_backend, calls):
+    await seed(memory_backend)
+    rag = RAGInterface("u1", memory_backend)
+    await rag.query("python web")
+    calls.update(embeddings=0, contexts={})
+
+    assert await rag.query_many(["python web", "rust async"]) == ["answer to python web", "answer to rust async"]
+    assert list(calls["contexts"]) == ["rust async"]
+    assert calls["embeddings"] == 1
+
+    # Decomposed answers share cache entries with decomposed single queries only
+    await rag.query("python web", decompose=True)
+    calls.update(embeddings=0, contexts={})
+    assert await rag.query_many(["python web", "rust async"], decompose=True) == ["answer to python web", "answer to rust async"]
+    assert list(calls["contexts"]) == ["rust async"]
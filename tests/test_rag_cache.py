@@ -0,0 +1,58 @@
+import pytest
+from app.graph.graph_ops import GraphOps
+from app.graph.rag_interface import RAGInterface
+from app.utils.cache import TTLCache
+from app.utils.models import NodeModel, NodesAndRelationshipsResponse
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    async def fake_response(query, context):
+        calls.append(query)
+        return f"answer {len(calls)}"
+
+    monkeypatch.setattr("app.graph.rag_interface.generate_response_with_context", fake_response)
+    return calls
+
+@pytest.mark.asyncio
+async def test_repeated_query_is_served_until_graph_changes(memory_backend, llm_calls):
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(nodes=[NodeModel(name="Python")], relationships=[]), "u1")
+    rag = RAGInterface("u1", memory_backend)
+
+    first = await rag.query("What about Python?")
+    assert await rag.query("  what about   python? ") == first
+    assert len(llm_calls) == 1
+
+    # Modes are cached separately, and bypassing recomputes
+    await rag.query_vector_only("What about Python?")
+    await rag.query("What about Python?", bypass_cache=True)
+    assert len(llm_calls) == 3
+
+    await graph_ops.update_graph(NodesAndRelationshipsResponse(nodes=[NodeModel(name="Rust")], relationships=[]), "u1")
+    assert await rag.query("What about Python?") == "answer 4"
+
+@pytest.mark.asyncio
+async def test_deleted_user_answers_are_not_reused(memory_backend, llm_calls):
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    rag = RAGInterface("u1", memory_backend)
+    await rag.query("hello")
+    await graph_ops.delete_user("u1")
+    await graph_ops.create_user("u1")
+    await rag.query("hello")
+    assert len(llm_calls) == 2
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache("test", max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None and cache.get("c") is None
+    assert len(cache) == 0
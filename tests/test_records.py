@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from app.graph.graph_ops import GraphOps
+from app.graph.records import EdgeRecord, NodeRecord
+from benchmarks import records as records_benchmark
+
+
+@pytest.mark.asyncio
+async def test_graph_reads_return_records(memory_backend):
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    await memory_backend.create_nodes([
+        {"name": "Ann", "perspective": "the user", "properties": {"age": 30}},
+        {"name": "Rust", "perspective": "", "properties": {}},
+    ], "u1")
+    await memory_backend.create_relationships([{"source": "Ann", "target": "Rust", "relation": "loves"}], "u1")
+
+    ann = await graph_ops.get_node_data("Ann", "u1")
+    assert isinstance(ann, NodeRecord)
+    # Non-string properties pass through; they are only validated at the HTTP boundary
+    assert ann.perspective == "the user" and ann.properties["age"] == 30
+    assert await graph_ops.get_node_data("Missing", "u1") is None
+    assert await graph_ops.get_node_data("Ann", "nobody") is None
+
+    assert await graph_ops.get_node_relationships("Ann", "u1") == [EdgeRecord("Ann", "Rust", "LIKES", "loves")]
+    assert (await graph_ops.get_node_relationships("Ann", "u1"))[0].to_model().relation == "LIKES"
+    assert {node.name for node in await graph_ops.get_all_nodes("u1")} == {"Ann", "Rust"}
+
+
+def test_records_benchmark_runs(tmp_path, capsys):
+    output = tmp_path / "records.json"
+    assert records_benchmark.main(["--rows", "50", "--nodes", "30", "--repeat", "1", "--output", str(output)]) == 0
+
+    results = json.loads(output.read_text())["results"]
+    assert set(results["conversion"]["node"]) == {"pydantic_ns", "model_construct_ns", "record_ns"}
+    assert results["expansion"]["nodes_expanded"] > 0
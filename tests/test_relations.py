@@ -0,0 +1,48 @@
+import pytest
+
+from app.graph.graph_ops import GraphOps
+from app.graph.neo4j_database import Neo4jConnectionManager
+from app.graph.relations import canonical_relation, canonical_relations
+
+
+def test_canonical_relation():
+    assert canonical_relation("is a type of") == "IS_A"
+    assert canonical_relation("Utilizes") == "USES"
+    assert canonical_relation("PROMOTES") == "PROMOTES"
+    assert canonical_relation("`) DETACH DELETE n //") == "DETACH_DELETE_N"
+    assert canonical_relation("3d prints") == "R_3D_PRINTS"
+    assert canonical_relation("") == canonical_relation(None) == "RELATED_TO"
+    assert canonical_relations(["loves", "LIKES", "uses"]) == ["LIKES", "USES"]
+
+
+def test_neo4j_writes_one_typed_statement_per_relation_type():
+    statements = Neo4jConnectionManager._relationship_statements([
+        {"source": "Ann", "target": "Rust", "relation": "loves"},
+        {"source": "Ann", "target": "Go", "relation": "LIKES"},
+        {"source": "Ann", "target": "Zig", "relation": "utilizes"},
+    ], "u1")
+
+    assert [query.split("MERGE ")[1].split(" SET")[0] for query, _ in statements] == [
+        "(source)-[r:`LIKES`]->(target)", "(source)-[r:`USES`]->(target)"
+    ]
+    assert [row["value"] for row in statements[0][1]["relationships"]] == ["LIKES", "loves"]
+    assert Neo4jConnectionManager._type_filter(["uses", "loves"]) == ":`LIKES`|`USES`"
+    assert Neo4jConnectionManager._type_filter(None) == ""
+
+
+@pytest.mark.asyncio
+async def test_relation_filters_push_down_into_reads(memory_backend):
+    graph_ops = GraphOps(memory_backend)
+    await graph_ops.create_user("u1")
+    await memory_backend.create_nodes([{"name": n, "perspective": "", "properties": {}} for n in ("Ann", "Rust", "Go")], "u1")
+    await memory_backend.create_relationships([
+        {"source": "Ann", "target": "Rust", "relation": "loves"},
+        {"source": "Ann", "target": "Go", "relation": "works on"},
+    ], "u1")
+
+    assert await memory_backend.get_node_relationships("Ann", "u1", relation_types=["likes"]) == [
+        {"source": "Ann", "target": "Rust", "relation": "LIKES", "value": "loves"}
+    ]
+    page = await graph_ops.get_relationships_page("u1", limit=10, relation_types=["WORKS_ON"])
+    assert [rel["target"] for rel in page["items"]] == ["Go"]
+    assert len((await graph_ops.get_relationships_page("u1", limit=10))["items"]) == 2
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.utils.metrics import instrumented
+from app.utils.tracing import start_trace, span
+
+@instrumented("neo4j", "fake_query")
+async def fake_query():
+    await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_spans_attach_to_current_trace():
+    with start_trace("test") as trace:
+        await fake_query()
+        await asyncio.gather(fake_query(), fake_query())
+
+    assert trace.counts["neo4j"] == 3
+    assert all(s.parent_id == trace.root.span_id for s in trace.spans)
+    assert "neo4j;dur=" in trace.debug_timing_header()
+
+def test_nested_spans_count_once_in_breakdown():
+    with start_trace("test") as trace:
+        with span("openai", "outer"):
+            with span("openai", "inner"):
+                pass
+
+    outer, inner = trace.spans
+    assert inner.parent_id == outer.span_id
+    assert trace.stage_breakdown()["openai"]["count"] == 2
+    assert trace.stage_breakdown()["openai"]["duration_ms"] == round(outer.duration_ms, 2)
+
+def test_span_is_noop_outside_trace():
+    with span("neo4j", "query") as current:
+        assert current is None
+
+def test_debug_timing_header_is_only_honoured_when_allowed(monkeypatch):
+    from app.main import app, config
+    client = TestClient(app)
+    assert "X-Debug-Timing" not in client.get("/metrics", headers={"X-Debug-Timing": "1"}).headers
+
+    monkeypatch.setattr(config.TELEMETRY, "ALLOW_DEBUG_TIMING_HEADER", True)
+    assert "X-Debug-Timing" not in client.get("/metrics").headers
+    assert "X-Debug-Timing" in client.get("/metrics", headers={"X-Debug-Timing": "1"}).headers